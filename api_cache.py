@@ -0,0 +1,211 @@
+# This file defines a persistent on-disk cache for responses from https://statsapi.mlb.com
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlencode
+
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'pitch_simulation', 'responses.sqlite3')
+MAX_CACHE_BYTES = 512 * 1024 * 1024 # 512 MB.
+CURRENT_SEASON_TTL = 60 * 60 # Schedules and teams for the current season expire after an hour.
+LIVE_GAME_TTL = 30 # Game feeds that are not final expire after 30 seconds.
+TOUCH_INTERVAL = 10 * 60 # A hit only rewrites a response's last access once it is this many seconds old.
+
+
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_CACHE_BYTES):
+        """ A class to store JSON responses on disk, keyed by URL plus params and evicted by size with LRU.
+
+        Args:
+            path (str, optional): The SQLite file to store responses in. Defaults to CACHE_PATH.
+            max_bytes (int, optional): The maximum total size of the stored responses. Defaults to MAX_CACHE_BYTES.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+
+        # The connection is shared between threads, so every access goes through the lock.
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory != '':
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, '
+            'body BLOB NOT NULL, '
+            'size INTEGER NOT NULL, '
+            'expires REAL, ' # NULL means the response never changes.
+            'last_access REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(url, params=None):
+        """ Build a cache key from a URL and its GET request parameters.
+
+        Args:
+            url (str)
+            params (dict, optional): Defaults to None.
+
+        Returns:
+            str: The URL followed by the parameters in sorted order.
+        """
+
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted((str(key), str(value)) for (key, value) in params.items()))}"
+
+    def get(self, url, params=None):
+        """ Get a stored response.
+
+        Args:
+            url (str)
+            params (dict, optional): Defaults to None.
+
+        Returns:
+            dict | None: The JSON response or None if it is not stored or has expired.
+        """
+
+        body = self.get_raw(url, params)
+        return json.loads(body) if body is not None else None
+
+    def get_raw(self, url, params=None):
+        """ Get a stored response without decoding it, e.g. to decode it in another process.
+
+        Args:
+            url (str)
+            params (dict, optional): Defaults to None.
+
+        Returns:
+            bytes | None: The JSON text or None if it is not stored or has expired.
+        """
+
+        key = self.make_key(url, params)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute('SELECT body, expires, last_access FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+
+            body, expires, last_access = row
+
+            # Drop the response if it has expired.
+            if expires is not None and expires <= now:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                self._conn.commit()
+                return None
+
+            # Mark the response as recently used. Eviction only needs the order to within TOUCH_INTERVAL, so most hits
+            # are served without writing to disk.
+            if now - last_access >= TOUCH_INTERVAL:
+                self._conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (now, key))
+                self._conn.commit()
+
+        return zlib.decompress(body)
+
+    def put(self, url, params, data, ttl=None):
+        """ Store a response.
+
+        Args:
+            url (str)
+            params (dict | None)
+            data (dict): The JSON response.
+            ttl (float, optional): Seconds until the response expires. Defaults to None, meaning it never expires.
+        """
+
+        self.put_raw(url, params, json.dumps(data, separators=(',', ':')).encode('utf-8'), ttl)
+
+    def put_raw(self, url, params, body, ttl=None):
+        """ Store a response that is already JSON text, e.g. the content of an HTTP response.
+
+        Args:
+            url (str)
+            params (dict | None)
+            body (bytes): The JSON text.
+            ttl (float, optional): Seconds until the response expires. Defaults to None, meaning it never expires.
+        """
+
+        key = self.make_key(url, params)
+        body = zlib.compress(body)
+        now = time.time()
+        expires = now + ttl if ttl is not None else None
+
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, body, size, expires, last_access) VALUES (?, ?, ?, ?, ?)',
+                (key, body, len(body), expires, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def clear(self):
+        """ Remove every stored response. """
+
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+            self._conn.commit()
+
+    def _evict(self):
+        """ Remove the least recently used responses until the total size is at most max_bytes. Lock must be held. """
+
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Walk from the least recently used response and collect keys until enough space is freed.
+        keys = []
+        for key, size in self._conn.execute('SELECT key, size FROM responses ORDER BY last_access'):
+            if total <= self.max_bytes:
+                break
+            keys.append((key,))
+            total -= size
+
+        self._conn.executemany('DELETE FROM responses WHERE key = ?', keys)
+
+
+# The cache shared by api_methods. Created on first use.
+_cache = None
+_cache_disabled = False
+_cache_lock = threading.Lock() # So threads using it for the first time at once share one connection.
+
+
+def get_cache():
+    """ Get the shared response cache, creating it on first use.
+
+    Returns:
+        ResponseCache | None: None if caching has been disabled or the cache file cannot be opened.
+    """
+
+    global _cache, _cache_disabled
+
+    if _cache is None and not _cache_disabled:
+        with _cache_lock:
+            if _cache is None and not _cache_disabled:
+                try:
+                    _cache = ResponseCache()
+                except (OSError, sqlite3.Error) as e:
+                    print(f"Response cache unavailable: {e}")
+                    _cache_disabled = True
+
+    return _cache if not _cache_disabled else None
+
+
+def set_cache(cache):
+    """ Replace the shared response cache.
+
+    Args:
+        cache (ResponseCache | None): The new cache, or None to disable caching.
+    """
+
+    global _cache, _cache_disabled
+
+    with _cache_lock:
+        _cache = cache
+        _cache_disabled = cache is None
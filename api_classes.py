@@ -1,5 +1,35 @@
 # This file defines a list of classes that represent data from https://statsapi.mlb.com
 
+# The numeric fields of the API's pitchData kept for each pitch, and the path to each one.
+PITCH_DATA_FIELDS = {
+    'start_speed': ('startSpeed',),
+    'strike_zone_top': ('strikeZoneTop',),
+    'strike_zone_bottom': ('strikeZoneBottom',),
+    'extension': ('extension',),
+    'x0': ('coordinates', 'x0'),
+    'y0': ('coordinates', 'y0'),
+    'z0': ('coordinates', 'z0'),
+    'vX0': ('coordinates', 'vX0'),
+    'vY0': ('coordinates', 'vY0'),
+    'vZ0': ('coordinates', 'vZ0'),
+    'aX': ('coordinates', 'aX'),
+    'aY': ('coordinates', 'aY'),
+    'aZ': ('coordinates', 'aZ'),
+    'pX': ('coordinates', 'pX'),
+    'pZ': ('coordinates', 'pZ'),
+    'spin_rate': ('breaks', 'spinRate'),
+    'spin_direction': ('breaks', 'spinDirection'),
+}
+
+# Detailed states of games that have no pitches to download, yet or ever.
+NO_PITCH_STATUSES = ('Scheduled', 'Pre-Game', 'Warmup', 'Postponed', 'Cancelled')
+
+# Detailed states of games that are over. Variants such as 'Final: Tied' or 'Completed Early: Rain' start with these.
+FINAL_STATUSES = ('Final', 'Game Over', 'Completed Early')
+
+# The fields the simulation needs. A pitch missing any of them cannot be simulated.
+SIMULATION_FIELDS = ('strike_zone_top', 'strike_zone_bottom', 'extension', 'x0', 'y0', 'z0', 'vX0', 'vY0', 'vZ0', 'aX', 'aY', 'aZ', 'pX', 'pZ', 'spin_direction')
+
 class Team:
     def __init__(self, name, id, franchise_name, club_name, abbreviation):
         """ A class to store information about a team.
@@ -18,7 +48,7 @@ class Team:
 
 
 class Game:
-    def __init__(self, home_team, away_team, link, date, score):
+    def __init__(self, home_team, away_team, link, date, score, status=None):
         """ A class to store information about a game.
 
         Args:
@@ -27,16 +57,122 @@ class Game:
             link (str): A link to API information about the game, not including base of "https://statsapi.mlb.com".
             date (str): A date in YYYY-MM-DD format.
             score (str): A score in "X-Y" format, X is the home team's score and Y is the away team's score.
+            status (str, optional): The API's detailed state, e.g. 'Final', 'In Progress', 'Postponed'. Defaults to None.
         """
         self.home_team = home_team
         self.away_team = away_team
         self.link = link
         self.date = date
         self.score = score
+        self.status = status
+
+    @property
+    def game_pk(self):
+        """ int | None: The game's id in the API, parsed from its link. """
+        parts = self.link.split('/')
+        return int(parts[4]) if len(parts) > 4 and parts[4].isdigit() else None
+
+
+class PitchData:
+    __slots__ = (*PITCH_DATA_FIELDS, 'missing')
+
+    def __init__(self, values):
+        """ A class to store the numeric fields of a pitch's pitchData as floats, with a flag for each missing one.
+
+        Every name in PITCH_DATA_FIELDS is an attribute, NaN when missing. Use get to have None instead.
+
+        Args:
+            values (dict[str, float | None]): Keyed by names in PITCH_DATA_FIELDS. Missing or None values are flagged.
+        """
+        missing = 0
+        for bit, name in enumerate(PITCH_DATA_FIELDS):
+            value = values.get(name)
+            if value is None or value != value: # value != value for NaN.
+                missing |= 1 << bit
+                value = float('nan')
+            setattr(self, name, float(value))
+        self.missing = missing # Bit i is set if the i-th field of PITCH_DATA_FIELDS is missing.
+
+    @classmethod
+    def from_api(cls, pitch_data):
+        """ Extract the fields from the API's pitchData, reading each nested dict once.
+
+        Args:
+            pitch_data (dict | None): e.g. {'startSpeed': 95.1, 'coordinates': {'x0': -1.2, ...}, 'breaks': {...}}
+
+        Returns:
+            PitchData
+        """
+
+        pitch_data = pitch_data or {}
+        parents = {(): pitch_data}
+        values = {}
+        for name, path in PITCH_DATA_FIELDS.items():
+            parent = parents.get(path[:-1])
+            if parent is None:
+                parent = pitch_data.get(path[0])
+                parent = parents[path[:-1]] = parent if isinstance(parent, dict) else {}
+            values[name] = parent.get(path[-1])
+        return cls(values)
+
+    def get(self, name):
+        """ Get a field, or None if it is missing.
+
+        Args:
+            name (str): A name in PITCH_DATA_FIELDS, e.g. 'start_speed'.
+
+        Returns:
+            float | None
+        """
+
+        return None if self.is_missing(name) else getattr(self, name)
+
+    def is_missing(self, name):
+        """ Check whether a field is missing. """
+
+        return bool(self.missing & _FIELD_BITS[name])
+
+    @property
+    def complete(self):
+        """ bool: Whether every field in SIMULATION_FIELDS is present. """
+
+        return self.missing & _SIMULATION_MASK == 0
+
+    def to_dict(self):
+        """ Get the present fields in the nested layout of the API's pitchData.
+
+        Returns:
+            dict
+        """
+
+        pitch_data = {}
+        for name, path in PITCH_DATA_FIELDS.items():
+            if self.is_missing(name):
+                continue
+
+            # Create the nested 'coordinates' and 'breaks' dicts as needed.
+            parent = pitch_data
+            for key in path[:-1]:
+                parent = parent.setdefault(key, {})
+            parent[path[-1]] = getattr(self, name)
+        return pitch_data
+
+
+_FIELD_BITS = {name: 1 << bit for (bit, name) in enumerate(PITCH_DATA_FIELDS)}
+_SIMULATION_MASK = sum(_FIELD_BITS[name] for name in SIMULATION_FIELDS)
 
 
 class Pitch:
+    __slots__ = ('pitcher_name', 'pitcher_hand', 'batter_name', 'batter_hand', 'result', 'pitch_type', 'balls_before', 'strikes_before', 'outs_before', 'data', 'half_inning', 'inning', 'home_score_before', 'away_score_before', 'home_abbreviation', 'away_abbreviation')
+
     def __init__(self, pitcher_name, pitcher_hand, batter_name, batter_hand, result, pitch_type, balls_before, strikes_before, outs_before, pitch_data, half_inning, inning, home_score_before, away_score_before, home_abbreviation, away_abbreviation):
+        """ A class to store information about a pitch.
+
+        Args:
+            pitch_data (PitchData | dict | None): The pitch's numeric fields, or the API's pitchData to extract them from.
+                Stored as a PitchData in data.
+            All others are the pitch's attributes of the same name.
+        """
         self.pitcher_name = pitcher_name
         self.pitcher_hand = pitcher_hand
         self.batter_name = batter_name
@@ -46,7 +182,7 @@ class Pitch:
         self.balls_before = balls_before
         self.strikes_before = strikes_before
         self.outs_before = outs_before
-        self.pitch_data = pitch_data
+        self.data = pitch_data if isinstance(pitch_data, PitchData) else PitchData.from_api(pitch_data)
         self.half_inning = half_inning
         self.inning = inning
         self.home_score_before = home_score_before
@@ -54,11 +190,21 @@ class Pitch:
         self.home_abbreviation = home_abbreviation
         self.away_abbreviation = away_abbreviation
     
+    @property
+    def pitch_data(self):
+        """ dict: The present fields of data in the nested layout of the API's pitchData. Built on each access. """
+        return self.data.to_dict()
+
+    @property
+    def complete(self):
+        """ bool: Whether the pitch has every field the simulation needs. """
+        return self.data.complete
+    
     def __str__(self):
-        speed = self.pitch_data.get('startSpeed')
+        speed = self.data.get('start_speed')
         return f"{self.half_inning.title()[:3]} {self.inning} | " \
             f"{self.home_abbreviation} {self.home_score_before} - {self.away_abbreviation} {self.away_score_before} | " \
             f"{self.outs_before} Outs | " \
             f"{self.balls_before}-{self.strikes_before} Count | " \
-            f"{self.pitch_type} ({round(speed)} MPH) | {self.result} | " \
+            f"{self.pitch_type} ({round(speed) if speed is not None else '?'} MPH) | {self.result} | " \
             f"{self.pitcher_name} ({self.pitcher_hand}HP) vs {self.batter_name} ({self.batter_hand}HB)"
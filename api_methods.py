@@ -1,7 +1,121 @@
 # This file defines a list of methods used to get data from https://statsapi.mlb.com
 
-import requests
-from api_classes import Team, Game, Pitch
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from api_classes import Team, Game, Pitch, PitchData
+from pitch_table import PitchTable
+from team_registry import TeamRegistry
+from api_cache import get_cache, CURRENT_SEASON_TTL, LIVE_GAME_TTL
+from api_transport import get_transport, HostRateLimiter, BASE_URL
+from instrumentation import span, count
+from snapshot import get_snapshot, day_before, day_after
+
+MAX_CONCURRENT_FEEDS = 8 # Default number of game feeds downloaded at once by fetch_pitch_details_bulk.
+MAX_REQUESTS_PER_SECOND = 10 # Default rate of requests to statsapi.mlb.com by fetch_pitch_details_bulk.
+MAX_CONCURRENT_SCHEDULES = 4 # Default number of schedule windows downloaded at once by iter_games.
+
+# Detailed states of a game's listing that is replaced by a later listing of the same game once it is played, e.g.
+# 'Postponed' on the original date and 'Final' on the new one. Variants such as 'Suspended: Rain' start with these.
+RELISTED_STATUSES = ('Postponed', 'Suspended')
+
+# Every field of the game feed that iter_pitch_details uses, passed to the API's "fields" filter.
+# The filter matches names at any depth, so pitchData keeps only the keys listed here.
+FEED_FIELDS = ','.join([
+    'gameData', 'status', 'abstractGameState',
+    'liveData', 'plays', 'allPlays',
+    'result', 'type', 'homeScore', 'awayScore',
+    'about', 'halfInning', 'inning',
+    'matchup', 'pitcher', 'batter', 'fullName', 'pitchHand', 'batSide', 'code',
+    'playEvents', 'isPitch', 'details', 'call', 'description', 'count', 'balls', 'strikes', 'outs',
+    'pitchData', 'startSpeed', 'endSpeed', 'strikeZoneTop', 'strikeZoneBottom', 'extension', 'plateTime', 'zone',
+    'coordinates', 'aX', 'aY', 'aZ', 'vX0', 'vY0', 'vZ0', 'x0', 'y0', 'z0', 'pX', 'pZ', 'pfxX', 'pfxZ',
+    'breaks', 'spinRate', 'spinDirection', 'breakAngle', 'breakLength', 'breakY',
+])
+
+
+def _get_json(url, params=None, ttl=None, rate_limiter=None, refresh=False, cancelled=None):
+    """ Get JSON data with a GET request, reading from and writing to the response cache.
+
+    Args:
+        url (str): The target URL.
+        params (dict, optional): The GET request parameters. Defaults to None.
+        ttl (float | Callable[[dict], float | None], optional): Seconds until the cached response expires, or a function
+            of the response returning it. Defaults to None, meaning the response never changes.
+        rate_limiter (HostRateLimiter, optional): Wait for it before sending the request. Defaults to None.
+        refresh (bool, optional): Ignore any stored response and replace it. Defaults to False.
+        cancelled (Callable[[], bool], optional): Checked once the response has arrived. If it returns True the
+            response is not decoded. Defaults to None.
+
+    Returns:
+        dict | None: The JSON data or None if the request failed or was cancelled.
+    """
+    
+    # Return the stored response if there is one.
+    cache = get_cache()
+    if cache is not None and not refresh:
+        with span('cache.read'):
+            data = cache.get(url, params)
+        if data is not None:
+            count('cache.hits')
+            return data
+        count('cache.misses')
+    
+    # Get data with GET request through the shared transport, by convention named 'r'. 
+    r = get_transport().get(url, params=params, rate_limiter=rate_limiter)
+    
+    if r is None:
+        count('http.failures')
+        return None
+    
+    if r.status_code != 200:
+        count('http.failures')
+        print(f"Request failed with status code {r.status_code} for {url}")
+        return None
+    
+    # Do not decode a response nobody will read.
+    if cancelled is not None and cancelled():
+        return None
+        
+    # Convert the data to JSON.
+    with span('json.decode', bytes=len(r.content)):
+        data = r.json()
+    
+    # Store the response.
+    if cache is not None:
+        cache.put(url, params, data, ttl(data) if callable(ttl) else ttl)
+    
+    return data
+
+
+def season_ttl(season):
+    """ Get how long a response about a season can be cached.
+
+    Args:
+        season (str | int | None): In the form YYYY. None means the current season.
+
+    Returns:
+        float | None: CURRENT_SEASON_TTL for the current or a future season, None for a past season which never changes.
+    """
+    
+    if season is not None and int(season) < datetime.now().year:
+        return None
+    return CURRENT_SEASON_TTL
+
+
+def _game_feed_ttl(data):
+    """ Get how long a game feed can be cached.
+
+    Args:
+        data (dict): The game feed JSON.
+
+    Returns:
+        float | None: None for a final game which never changes, otherwise LIVE_GAME_TTL.
+    """
+    
+    status = (data.get('gameData') or {}).get('status') or {}
+    return None if status.get('abstractGameState') == 'Final' else LIVE_GAME_TTL
 
 
 def fetch_teams(season=None):
@@ -14,8 +128,16 @@ def fetch_teams(season=None):
         list[Team] | None: Returns a list of Teams or None.
     """
     
+    # Past seasons are answered from the snapshot if it has them.
+    snapshot = get_snapshot()
+    if snapshot is not None and season is not None:
+        teams = snapshot.teams(season)
+        if teams is not None:
+            count('snapshot.hits')
+            return teams
+    
     # The target URL for the GET request.
-    url = 'https://statsapi.mlb.com/api/v1/teams'
+    url = BASE_URL + '/api/v1/teams'
     
     # The default GET request parameters, named "payload" by convention.
     payload = {
@@ -26,15 +148,11 @@ def fetch_teams(season=None):
     if season is not None:
         payload.update({'season': str(season)})
     
-    # Get data with GET request, by convention named 'r'. 
-    r = requests.get(url, params=payload)
+    # Get data with GET request.
+    data = _get_json(url, payload, ttl=season_ttl(season))
     
-    if r.status_code != 200:
-        print(f"Request failed with status code {r.status_code}")
+    if data is None:
         return None
-        
-    # Convert the data to JSON.
-    data = r.json()
     
     # Get an array of teams.
     data_teams = data.get('teams')
@@ -47,31 +165,83 @@ def fetch_teams(season=None):
     team_objs = []
     
     # Convert each JSON team to a Team instance.
-    for team in data_teams:
-        name = str(team.get('name'))
-        id = str(team.get('id'))
-        franchise_name = str(team.get('franchiseName'))
-        club_name = str(team.get('clubName'))
-        abbreviation = str(team.get('abbreviation'))
-        team_objs.append(Team(name, id, franchise_name, club_name, abbreviation))
+    with span('build.teams', teams=len(data_teams)):
+        for team in data_teams:
+            team_objs.append(_parse_team(team))
         
     return team_objs if len(team_objs) != 0 else None
 
 
+def _parse_team(team):
+    """ Convert a JSON team to a Team.
+
+    Args:
+        team (dict)
+
+    Returns:
+        Team
+    """
+    
+    name = str(team.get('name'))
+    id = str(team.get('id'))
+    franchise_name = str(team.get('franchiseName'))
+    club_name = str(team.get('clubName'))
+    abbreviation = str(team.get('abbreviation'))
+    return Team(name, id, franchise_name, club_name, abbreviation)
+
+
+# The TeamRegistry of each season, keyed by season in YYYY.
+_team_registries = {}
+_team_registries_lock = threading.Lock()
+
+
+def _season_key(season):
+    """ Get the key of a season in _team_registries. None means the current season. """
+    
+    return str(season) if season is not None else str(datetime.now().year)
+
+
+def get_team_registry(season=None):
+    """ Get the TeamRegistry of a season, fetching every team in the season the first time it is needed.
+
+    Args:
+        season (str, optional): In the form YYYY. Defaults to None, meaning the current season.
+
+    Returns:
+        TeamRegistry: May be empty if the teams could not be fetched.
+    """
+    
+    with _team_registries_lock:
+        registry = _team_registries.setdefault(_season_key(season), TeamRegistry(_season_key(season)))
+        if registry.complete:
+            return registry
+    
+    # Fill in any teams not already added from a schedule. The request is sent without the lock so a slow season does
+    # not hold up lookups of every other. add keeps a team already added, so threads that both fetched agree.
+    teams = fetch_teams(registry.season)
+    if teams is not None:
+        with _team_registries_lock:
+            for team in teams:
+                registry.add(team)
+            registry.complete = True
+            
+    return registry
+
+
 def fetch_team_by_name(name: str, season=None):
-    """Get a team's by its name, franchise name, or club name.
+    """Get a team's by its name, franchise name, club name, abbreviation or nickname, forgiving prefixes and typos.
 
     Args:
-        name (str): A name representing the team, e.g. 'Oakland Athletics' or 'Oakland' or 'Athletics'
+        name (str): A name representing the team, e.g. 'Oakland Athletics' or 'Oakland' or 'Athletics' or 'OAK' or "A's"
         season (str, optional): The season in YYYY. Defaults to None
     Returns:
-        Team | None: The Team or None if not found
+        Team | None: The Team or None if not found or the name fits more than one team
     """
     
-    return next((team for team in fetch_teams(season) if name.title() in [team.name, team.franchise_name, team.club_name]), None)
+    return get_team_registry(season).resolve(name)
 
 
-def fetch_games(start_date=None, end_date=None, team_id=None, opponent_id=None):
+def fetch_games(start_date=None, end_date=None, team_id=None, opponent_id=None, refresh=False, game_pk=None, keep_empty=False):
     """ Get a list of games. Defaults to all games this season.
 
     Args:
@@ -79,19 +249,40 @@ def fetch_games(start_date=None, end_date=None, team_id=None, opponent_id=None):
         end_date (str, optional): In the form YYYY-MM-DD. Defaults to None. Error if end_date and not start_date or if end_date is before start_date.
         team_id (str, optional): A team's id. Defaults to None. 
         opponent_id (str, optional): An opponent's id. Defaults to None. Error if opponent_id and not team_id.
+        refresh (bool, optional): Download the schedule even if it is cached or in the snapshot. Defaults to False.
+        game_pk (str | int, optional): Only the game with this gamePk, of any game type. Defaults to None.
+        keep_empty (bool, optional): Return an empty list for dates without games, so None only means the schedule
+            could not be downloaded. Defaults to False.
     
     Returns:
         list[Game] | None: A list of Games or None.
     """
     
+    # Answer the dates the snapshot covers from it, and only the dates before or after it from the network.
+    snapshot = get_snapshot() if game_pk is None and not refresh and start_date is not None and end_date is not None else None
+    covered = snapshot.covered(start_date, end_date) if snapshot is not None else None
+    if covered is not None:
+        count('snapshot.hits')
+        parts = []
+        if start_date < covered[0]:
+            parts.append(fetch_games(start_date, day_before(covered[0]), team_id, opponent_id, keep_empty=keep_empty))
+        parts.append(snapshot.games(covered[0], covered[1], team_id, opponent_id))
+        if covered[1] < end_date:
+            parts.append(fetch_games(day_after(covered[1]), end_date, team_id, opponent_id, keep_empty=keep_empty))
+        if keep_empty and None in parts:
+            return None
+        game_objs = [game for part in parts for game in part or []]
+        return game_objs if len(game_objs) != 0 or keep_empty else None
+    
     # The target URL for the GET request.
-    url = 'https://statsapi.mlb.com/api/v1/schedule'
+    url = BASE_URL + '/api/v1/schedule'
     
     # The default GET request parameters, named "payload" by convention.
     payload = {
         'sportId': 1, # Baseball.
         'leagueId': 103, # MLB league.
-        'gameType': 'R' # Regular season.
+        'gameType': 'R', # Regular season.
+        'hydrate': 'team' # Embed the full team data so teams do not need a separate request.
     }
     
     # Add extra parameters if passed to function.
@@ -106,93 +297,247 @@ def fetch_games(start_date=None, end_date=None, team_id=None, opponent_id=None):
         
     if opponent_id is not None:
         payload.update({'opponentId': opponent_id})
+        
+    if game_pk is not None:
+        payload.update({'gamePk': game_pk})
+        del payload['gameType']
 
-    # Get data with GET request, by convention named 'r'. 
-    r = requests.get(url, params=payload)
+    # Get data with GET request. A schedule ending in a past season never changes.
+    end_season = end_date[:4] if end_date is not None else None
+    data = _get_json(url, payload, ttl=season_ttl(end_season), refresh=refresh)
     
-    if r.status_code != 200:
-        print(f"Request failed with status code {r.status_code}")
+    if data is None:
         return None
-        
-    # Convert the data to JSON.
-    data = r.json()
     
     # Get a list of "dates".
     data_dates = data.get('dates')
         
-    # If data_dates is empty or not found return None.
+    # If data_dates is empty or not found return None, or an empty list if asked.
     if data_dates is None or len(data_dates) == 0:
-        return None
-    
-    # Get all teams.
-    teams = fetch_teams()
+        return [] if keep_empty else None
     
     # Initialize a list of Games.
     game_objs = []
     
     # Iterate through each date.
-    for date in data_dates:
-        data_games = date.get('games')
+    with span('build.games') as attributes:
+        for date in data_dates:
+            data_games = date.get('games')
         
-        # Iterate through each game.
-        for game in data_games:
+            # Iterate through each game.
+            for game in data_games:
             
-            # Get a variety of data.
-            data_home_team = game.get('teams').get('home')
-            data_away_team = game.get('teams').get('away')
-            home_team_id = str(data_home_team.get('team').get('id'))
-            away_team_id = str(data_away_team.get('team').get('id'))
+                # Get a variety of data.
+                data_home_team = game.get('teams').get('home')
+                data_away_team = game.get('teams').get('away')
             
-            # Get the Team representing the home team and away team.
-            home_team = None
-            away_team = None
-            for team in teams:
-                if home_team_id == team.id:
-                    home_team = team
-                if away_team_id == team.id:
-                    away_team = team
-                if home_team is not None and away_team is not None:
-                    break
+                # Get the Team representing the home team and away team.
+                season = game.get('season') or str(game.get('officialDate'))[:4]
+                home_team = _schedule_team(data_home_team.get('team'), season)
+                away_team = _schedule_team(data_away_team.get('team'), season)
                 
-            # If either Team is not found, do not add the game
-            if home_team is None or away_team is None:
-                continue
+                # If either Team is not found, do not add the game
+                if home_team is None or away_team is None:
+                    continue
             
-            # Get a variety of data.
-            link = str(game.get('link'))
-            date = str(game.get('officialDate'))
-            home_score = data_home_team.get('score')
-            away_score = data_away_team.get('score')
-            score = f"{home_score} - {away_score}" if home_score is not None and away_score is not None else "Unknown"
+                # Get a variety of data.
+                link = str(game.get('link'))
+                date = str(game.get('officialDate'))
+                home_score = data_home_team.get('score')
+                away_score = data_away_team.get('score')
+                score = f"{home_score} - {away_score}" if home_score is not None and away_score is not None else "Unknown"
+                status = (game.get('status') or {}).get('detailedState')
             
-            # Add a new Game object to the list.
-            game_objs.append(Game(home_team, away_team, link, date, score))
+                # Add a new Game object to the list.
+                game_objs.append(Game(home_team, away_team, link, date, score, status))
         
+        attributes['games'] = len(game_objs)
+    
     # If game_objs is empty return None, otherwise return game_objs
-    return game_objs if len(game_objs) != 0 else None
+    return game_objs if len(game_objs) != 0 or keep_empty else None
+
+
+def fetch_game_changes(updated_since):
+    """ Get the gamePks of every game whose data the API has changed since a time, e.g. a corrected pitch or score.
+
+    Args:
+        updated_since (datetime): An aware datetime, or a naive one in local time.
+
+    Returns:
+        set[int] | None: The gamePks, or None if the request failed.
+    """
+    
+    # The target URL for the GET request.
+    url = BASE_URL + '/api/v1/game/changes'
+    
+    # The default GET request parameters, named "payload" by convention.
+    payload = {
+        'sportId': 1,
+        'updatedSince': updated_since.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'fields': 'dates,games,gamePk' # Only the gamePks, not the full schedule entries.
+    }
+    
+    # Get data with GET request. The changes keep growing, so always ask again.
+    data = _get_json(url, payload, ttl=CURRENT_SEASON_TTL, refresh=True)
+    
+    if data is None:
+        return None
+    
+    return {game.get('gamePk') for date in data.get('dates') or [] for game in date.get('games') or []}
+
 
+def iter_games(start_date, end_date, team_id=None, opponent_id=None, window='month', max_workers=MAX_CONCURRENT_SCHEDULES, strict=False):
+    """ Get the games in a date range of any length, downloading it in windows at once and handing back games as they arrive.
 
-def fetch_pitch_details(game):
+    Args:
+        start_date (str): In the form YYYY-MM-DD.
+        end_date (str): In the form YYYY-MM-DD.
+        team_id (str, optional): A team's id. Defaults to None.
+        opponent_id (str, optional): An opponent's id. Defaults to None.
+        window (str, optional): 'month' or 'week', the size of each schedule request. Defaults to 'month'.
+        max_workers (int, optional): The most windows downloaded at once. Defaults to MAX_CONCURRENT_SCHEDULES.
+        strict (bool, optional): Raise if a window cannot be downloaded, instead of skipping it as if it had no games.
+            Defaults to False.
+
+    Yields:
+        Game: In date order, each game once even if it is listed on several dates. The latest listing of each game is
+            kept, e.g. the 'Final' one on the date a postponed game was played. A game postponed past end_date comes
+            last, with its latest listing in the range.
+
+    Raises:
+        ConnectionError: If strict and a window's schedule could not be downloaded.
+    """
+    
+    windows = _date_windows(start_date, end_date, window)
+    seen_links = set()
+    relisted = {} # link: the latest listing of a game postponed or suspended, until it is listed again.
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        # Download every window at once, but hand them back in order so games stay in date order.
+        futures = [executor.submit(fetch_games, window_start, window_end, team_id, opponent_id, keep_empty=strict) for (window_start, window_end) in windows]
+        for (window_start, window_end), future in zip(windows, futures):
+            games = future.result()
+            if games is None and strict:
+                raise ConnectionError(f"The schedule from {window_start} to {window_end} could not be downloaded")
+            
+            for game in games or []:
+                if game.link in seen_links:
+                    continue
+                
+                # Hold back a listing that a later one may replace rather than hand back the wrong one.
+                if game.status is not None and game.status.startswith(RELISTED_STATUSES):
+                    relisted[game.link] = game
+                    continue
+                
+                relisted.pop(game.link, None)
+                seen_links.add(game.link)
+                yield game
+        
+        # Games not listed again within the range.
+        yield from relisted.values()
+    finally:
+        # If the caller stops early, do not start the remaining downloads.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_range_games(start_date, end_date, team_id=None, opponent_id=None):
+    """ Get the games in a date range one season at a time, so only one season's schedule is held at once.
+
+    Args:
+        start_date (str): In the form YYYY-MM-DD.
+        end_date (str): In the form YYYY-MM-DD.
+        team_id (str, optional): Defaults to None.
+        opponent_id (str, optional): Defaults to None.
+
+    Yields:
+        Game: In date order.
+    """
+
+    for year in range(int(start_date[:4]), int(end_date[:4]) + 1):
+        yield from iter_games(max(start_date, f"{year}-01-01"), min(end_date, f"{year}-12-31"), team_id, opponent_id)
+
+
+def _date_windows(start_date, end_date, window='month'):
+    """ Split a date range into calendar months or weeks.
+
+    Args:
+        start_date (str): In the form YYYY-MM-DD.
+        end_date (str): In the form YYYY-MM-DD.
+        window (str, optional): 'month' or 'week'. Defaults to 'month'.
+
+    Returns:
+        list[tuple[str, str]]: The first and last date of each window, in order.
+    """
+    
+    start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    
+    windows = []
+    while start <= end:
+        if window == 'week':
+            window_end = start + timedelta(days=6 - start.weekday()) # The following Sunday.
+        else:
+            next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+            window_end = next_month - timedelta(days=1)
+        
+        window_end = min(window_end, end)
+        windows.append((start.isoformat(), window_end.isoformat()))
+        start = window_end + timedelta(days=1)
+    
+    return windows
+
+
+def _schedule_team(data_team, season):
+    """ Get the Team for a team embedded in a schedule, adding it to the season's TeamRegistry.
+
+    Args:
+        data_team (dict): The JSON team, hydrated with its full data when available.
+        season (str): In the form YYYY.
+
+    Returns:
+        Team | None: None if the team is not found.
+    """
+    
+    with _team_registries_lock:
+        registry = _team_registries.setdefault(_season_key(season), TeamRegistry(_season_key(season)))
+        
+        team = registry.get(data_team.get('id'))
+        if team is not None:
+            return team
+        
+        # Add the embedded team if it has the full data.
+        if data_team.get('abbreviation') is not None:
+            return registry.add(_parse_team(data_team))
+    
+    # Otherwise fetch every team in the season.
+    return get_team_registry(season).get(data_team.get('id'))
+
+
+def fetch_pitch_details(game, rate_limiter=None, as_table=False, refresh=False, drop_incomplete=False, keep_empty=False):
     """ Get a list of pitches based on a Game.
 
     Args:
         game (Game)
+        rate_limiter (HostRateLimiter, optional): Wait for it before sending the request. Defaults to None.
+        as_table (bool, optional): Return a PitchTable instead of a list. Defaults to False.
+        refresh (bool, optional): Download the feed even if it is cached, e.g. after a correction. Defaults to False.
+        drop_incomplete (bool, optional): Leave out pitches missing a field the simulation needs. Positions then no
+            longer match the feed's. Defaults to False.
+        keep_empty (bool, optional): Return an empty list or PitchTable for a feed without pitches, so None only
+            means the feed could not be downloaded or read. Defaults to False.
 
     Returns:
-        list[Pitch] | None: A list of Pitch objects or None.
+        list[Pitch] | PitchTable | None: A list of Pitch objects, a PitchTable, or None.
     """
     
-    url = "http://statsapi.mlb.com" + game.link
+    url = BASE_URL + game.link
     
-    # Get data with GET request, by convention named 'r'. 
-    r = requests.get(url)
+    # Get data with GET request. A final game never changes.
+    data = _get_json(url, ttl=_game_feed_ttl, rate_limiter=rate_limiter, refresh=refresh)
     
-    if r.status_code != 200:
-        print(f"Request failed with status code {r.status_code}")
+    if data is None:
         return None
-        
-    # Convert the data to JSON.
-    data = r.json()
     
     # Get a list of plays.
     try:
@@ -202,8 +547,72 @@ def fetch_pitch_details(game):
         print("Error: list of plays in game not found!")
         return None
     
-    # Initialize a list of pitch objects.
-    pitch_objs = []
+    # Store the pitches column by column without keeping a Pitch object for each one.
+    if as_table:
+        with span('build.pitch_table') as attributes:
+            table = PitchTable.from_pitches(_iter_pitches(plays, game, drop_incomplete))
+            attributes['pitches'] = len(table)
+        return table if len(table) != 0 or keep_empty else None
+    
+    # Convert each pitch to a Pitch object.
+    with span('build.pitches') as attributes:
+        pitch_objs = list(_iter_pitches(plays, game, drop_incomplete))
+        attributes['pitches'] = len(pitch_objs)
+            
+    return pitch_objs if len(pitch_objs) != 0 or keep_empty else None
+
+
+def iter_pitch_details(game, rate_limiter=None, drop_incomplete=False, cancelled=None):
+    """ Get the pitches of a Game one at a time, downloading only the fields of the feed that a Pitch uses.
+
+    Args:
+        game (Game)
+        rate_limiter (HostRateLimiter, optional): Wait for it before sending the request. Defaults to None.
+        drop_incomplete (bool, optional): Leave out pitches missing a field the simulation needs. Defaults to False.
+        cancelled (Callable[[], bool], optional): Checked before the request is sent and again before the response
+            is decoded. Nothing is yielded if it returns True. Defaults to None.
+
+    Yields:
+        Pitch: Each pitch in the order it was thrown. Nothing is yielded if the request fails.
+    """
+    
+    if cancelled is not None and cancelled():
+        return
+    
+    url = BASE_URL + game.link
+    
+    # Ask the API to drop the boxscore, linescore and most of gameData, which are the bulk of the feed.
+    payload = {
+        'fields': FEED_FIELDS
+    }
+    
+    # Get data with GET request. A final game never changes.
+    data = _get_json(url, payload, ttl=_game_feed_ttl, rate_limiter=rate_limiter, cancelled=cancelled)
+    
+    if data is None:
+        return
+    
+    # Get a list of plays.
+    try:
+        plays = data.get('liveData').get('plays').get('allPlays')
+    except AttributeError:
+        print("Error: list of plays in game not found!")
+        return
+    
+    yield from _iter_pitches(plays, game, drop_incomplete)
+
+
+def _iter_pitches(plays, game, drop_incomplete=False):
+    """ Convert the plays of a game feed to Pitch objects.
+
+    Args:
+        plays (list[dict]): The feed's liveData.plays.allPlays.
+        game (Game)
+        drop_incomplete (bool, optional): Leave out pitches missing a field the simulation needs. Defaults to False.
+
+    Yields:
+        Pitch
+    """
     
     # Initialize helper variables
     home_score_before = 0
@@ -243,14 +652,87 @@ def fetch_pitch_details(game):
             balls_before = event.get('count').get('balls')
             strikes_before = event.get('count').get('strikes')
             outs_before = event.get('count').get('outs')
-            pitch_data = event.get('pitchData')
             
-            # Add a new Pitch object to the list.
-            pitch_objs.append(Pitch(pitcher_name=pitcher_name, pitcher_hand=pitcher_hand, batter_name=batter_name, batter_hand=batter_hand, result=result, pitch_type=pitch_type, balls_before=balls_before, strikes_before=strikes_before, outs_before=outs_before, pitch_data=pitch_data, half_inning=half_inning, inning=inning, home_score_before=home_score_before, away_score_before=away_score_before, home_abbreviation=game.home_team.abbreviation, away_abbreviation=game.away_team.abbreviation))
+            # Extract the numeric fields once here, so nothing reads the nested pitchData dicts again.
+            pitch_data = PitchData.from_api(event.get('pitchData'))
+            
+            # Hand back a new Pitch object, unless it cannot be simulated and is not wanted.
+            if not drop_incomplete or pitch_data.complete:
+                yield Pitch(pitcher_name=pitcher_name, pitcher_hand=pitcher_hand, batter_name=batter_name, batter_hand=batter_hand, result=result, pitch_type=pitch_type, balls_before=balls_before, strikes_before=strikes_before, outs_before=outs_before, pitch_data=pitch_data, half_inning=half_inning, inning=inning, home_score_before=home_score_before, away_score_before=away_score_before, home_abbreviation=game.home_team.abbreviation, away_abbreviation=game.away_team.abbreviation)
     
             # Update the home and away score before.
             home_score_before = home_score_after
             away_score_before = away_score_after
-            
-    return pitch_objs if len(pitch_objs) != 0 else None
-    
\ No newline at end of file
+
+
+def fetch_pitch_details_bulk(games, max_workers=MAX_CONCURRENT_FEEDS, requests_per_second=MAX_REQUESTS_PER_SECOND, refresh=False, processes=None, keep_empty=False):
+    """ Get the pitches of many Games, downloading and parsing their feeds concurrently.
+
+    Args:
+        games (list[Game]): e.g. the result of fetch_games.
+        max_workers (int, optional): The most feeds downloaded at once. Defaults to MAX_CONCURRENT_FEEDS.
+        requests_per_second (float | None, optional): The most requests sent to each host per second, or None for
+            no limit. Cached feeds do not count. Defaults to MAX_REQUESTS_PER_SECOND.
+        refresh (bool, optional): Download every feed even if it is cached. Defaults to False.
+        processes (int, optional): Parse the feeds in this many worker processes, or 0 for one per CPU, and hand back
+            PitchTables. See parallel_parse.py. Defaults to None, parsing on the download threads.
+        keep_empty (bool, optional): Hand back an empty list or PitchTable for a feed without pitches, so None only
+            means the feed failed. Defaults to False.
+
+    Yields:
+        tuple[Game, list[Pitch] | PitchTable | None]: Each Game with the result of fetch_pitch_details, or of
+            fetch_pitch_details(as_table=True) if processes is set, in order of completion.
+    """
+    
+    if processes is not None:
+        # Imported here since parallel_parse imports this module.
+        from parallel_parse import fetch_pitch_tables_parallel
+        yield from fetch_pitch_tables_parallel(games, processes or None, max_workers, requests_per_second, refresh, keep_empty)
+        return
+    
+    rate_limiter = HostRateLimiter(requests_per_second) if requests_per_second is not None else None
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        # Submit every game, then hand back each one as soon as it is parsed.
+        futures = {executor.submit(fetch_pitch_details, game, rate_limiter, refresh=refresh, keep_empty=keep_empty): game for game in games}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # If the caller stops early, do not start the remaining downloads.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_game_tables(games, max_workers=MAX_CONCURRENT_FEEDS, requests_per_second=MAX_REQUESTS_PER_SECOND):
+    """ Download the pitches of each game as a PitchTable, several at once, handing them back in the order of games.
+
+    At most max_workers feeds are downloaded or waiting to be read at any time, however many games there are.
+
+    Args:
+        games (Iterable[Game]): e.g. iter_range_games. Read only as far as the downloads in flight.
+        max_workers (int, optional): Defaults to MAX_CONCURRENT_FEEDS.
+        requests_per_second (float | None, optional): Defaults to MAX_REQUESTS_PER_SECOND.
+
+    Yields:
+        tuple[Game, PitchTable | None]: None if the feed could not be downloaded, an empty PitchTable if it has no pitches.
+    """
+
+    rate_limiter = HostRateLimiter(requests_per_second) if requests_per_second is not None else None
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque()
+    try:
+        for game in games:
+            pending.append((game, executor.submit(fetch_pitch_details, game, rate_limiter, as_table=True, keep_empty=True)))
+
+            # Wait for the oldest download before starting another, so the buffer stays bounded and in order.
+            if len(pending) >= max_workers:
+                game, future = pending.popleft()
+                yield game, future.result()
+
+        while len(pending) != 0:
+            game, future = pending.popleft()
+            yield game, future.result()
+    finally:
+        # If the caller stops early, do not start the remaining downloads.
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,216 @@
+# This file defines the HTTP transport used to make requests to https://statsapi.mlb.com
+
+import random
+import threading
+import time
+import requests
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from instrumentation import span, count
+
+BASE_URL = 'https://statsapi.mlb.com'
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class Transport:
+    def __init__(self, pool_size=10, connect_timeout=3.05, read_timeout=30, max_retries=3, backoff_factor=0.5, backoff_max=10):
+        """ A class to send GET requests over a pooled keep-alive session, retrying transient failures.
+
+        Args:
+            pool_size (int, optional): The number of connections kept open per host. Defaults to 10.
+            connect_timeout (float, optional): Seconds to wait for a connection. Defaults to 3.05.
+            read_timeout (float, optional): Seconds to wait between bytes of the response. Defaults to 30.
+            max_retries (int, optional): Retries after the first attempt on a 429/5xx or connection error. Defaults to 3.
+            backoff_factor (float, optional): The base of the exponential backoff in seconds. Defaults to 0.5.
+            backoff_max (float, optional): The longest backoff between attempts in seconds. Defaults to 10.
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+
+        # Retries are handled here rather than by urllib3 so the backoff can be jittered and logged.
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+        })
+
+    def get(self, url, params=None, stream=False, rate_limiter=None):
+        """ Send a GET request, retrying with jittered exponential backoff on a 429/5xx or connection error.
+
+        Args:
+            url (str): The target URL.
+            params (dict, optional): The GET request parameters. Defaults to None.
+            stream (bool, optional): Do not download the body until it is read. Defaults to False.
+            rate_limiter (HostRateLimiter, optional): Wait for it before every attempt. Defaults to None.
+
+        Returns:
+            requests.Response | None: The last response, or None if no response was received.
+        """
+
+        r = None
+        for attempt in range(self.max_retries + 1):
+            if rate_limiter is not None:
+                rate_limiter.acquire(url)
+
+            # Time each attempt. 'headers_seconds' is the time until the response headers arrived (connection, DNS
+            # and server time); the rest of the span is downloading the body, unless streaming.
+            parsed = urlparse(url)
+            with span('http.request', host=parsed.netloc, path=parsed.path, attempt=str(attempt)) as attributes:
+                try:
+                    r = self.session.get(url, params=params, timeout=self.timeout, stream=stream)
+                # A ChunkedEncodingError is a body cut off part way, e.g. a truncated feed, and is worth retrying too.
+                except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                    r = None
+                    attributes['error'] = type(e).__name__
+                    print(f"Request to {url} failed: {e}")
+                else:
+                    attributes['status'] = str(r.status_code)
+                    attributes['headers_seconds'] = r.elapsed.total_seconds()
+                    attributes['bytes'] = int(r.headers.get('Content-Length', 0)) if stream else len(r.content)
+
+            if r is not None and r.status_code not in RETRY_STATUS_CODES:
+                return r
+
+            if attempt == self.max_retries:
+                break
+            count('http.retries')
+
+            # Release the connection back to the pool before waiting.
+            if r is not None:
+                r.close()
+            time.sleep(self._backoff(attempt, r))
+
+        return r
+
+    def close(self):
+        """ Close every pooled connection. """
+
+        self.session.close()
+
+    def _backoff(self, attempt, r):
+        """ Get how long to wait before the next attempt.
+
+        Args:
+            attempt (int): The attempt that just failed, starting at 0.
+            r (requests.Response | None): Its response, if any.
+
+        Returns:
+            float: Seconds to wait. Honours a Retry-After header, otherwise a random value up to the exponential backoff.
+        """
+
+        if r is not None:
+            retry_after = r.headers.get('Retry-After')
+            if retry_after is not None and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+
+        # "Full jitter" spreads out retries from many clients that failed at the same time.
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * 2 ** attempt))
+
+
+class HostRateLimiter:
+    def __init__(self, requests_per_second):
+        """ A class to space out requests to each host so no host gets more than requests_per_second.
+
+        Args:
+            requests_per_second (float)
+        """
+        self.interval = 1 / requests_per_second
+        self._lock = threading.Lock()
+        self._next_allowed = {} # The earliest time the next request to each host may start.
+
+    def acquire(self, url):
+        """ Wait until a request to the host of url is allowed. Safe to call from many threads.
+
+        Args:
+            url (str)
+        """
+
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = start + self.interval
+
+        if start > now:
+            time.sleep(start - now)
+
+
+async def read_request(reader, max_header_lines=100):
+    """ Read the request line and headers of one HTTP/1.1 request, skipping any body, for the local servers.
+
+    Args:
+        reader (asyncio.StreamReader)
+        max_header_lines (int, optional): Header lines read before the rest are treated as the body. Defaults to 100.
+
+    Returns:
+        tuple[str, str, str, dict[str, str]] | None: The method, target and version, and the headers by lower case
+            name. None if the client closed the connection.
+
+    Raises:
+        ValueError: If Content-Length is not a number. The body cannot be skipped, so the connection must be closed.
+    """
+
+    request_line = await reader.readline()
+    if request_line == b'':
+        return None
+
+    method, target, version = (request_line.decode('latin-1').split() + ['', '', ''])[:3]
+    headers = {}
+    for _ in range(max_header_lines):
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    # A GET has no body, but skip one if it was sent so the next request is read correctly.
+    length = headers.get('content-length', '0') or '0'
+    if not length.isdigit():
+        raise ValueError(f"Content-Length '{length}' is not a number")
+    if int(length) > 0:
+        await reader.readexactly(int(length))
+
+    return method, target, version, headers
+
+
+# The transport shared by api_methods. Created on first use.
+_transport = None
+_transport_lock = threading.Lock() # So threads using it for the first time at once share one Session.
+
+
+def get_transport():
+    """ Get the shared transport, creating it on first use.
+
+    Returns:
+        Transport
+    """
+
+    global _transport
+
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = Transport()
+
+    return _transport
+
+
+def set_transport(transport):
+    """ Replace the shared transport, e.g. to change its timeouts or pool size.
+
+    Args:
+        transport (Transport | None): The new transport, or None to create a default one on next use.
+    """
+
+    global _transport
+
+    with _transport_lock:
+        if _transport is not None and _transport is not transport:
+            _transport.close()
+        _transport = transport
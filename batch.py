@@ -0,0 +1,435 @@
+# This file selects pitches without prompts and writes the simulation args or corrected trajectory of each one,
+# for preparing many pitches at once.
+#
+# Run from the repository root, e.g.
+#   python3 batch.py 2023-04-01 2023-04-30 --team Athletics --type Slider --min-speed 85 -o sliders.jsonl
+#   python3 batch.py --selectors review.jsonl --mode trajectory --format csv -o review.csv
+#
+# A selectors file has one JSON object per line, with any of the keys:
+#   start_date, end_date, team, opponent   Games in a date range, as in main.py.
+#   game                                   One game by gamePk or feed link, instead of a date range.
+#   pitch_type, pitcher_name, batter_name, pitcher_hand, batter_hand, result, half_inning,
+#   inning, balls_before, strikes_before, outs_before
+#                                          Keep pitches with this value, or any value in a list.
+#   min_speed, max_speed                   Keep pitches in this range of start speed in MPH.
+#   name                                   A label copied to every row. Defaults to the selector's line number.
+# e.g. {"start_date": "2023-04-01", "end_date": "2023-04-30", "team": "OAK", "pitch_type": ["Slider", "Sweeper"], "strikes_before": 2}
+
+import argparse
+import csv
+import json
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from api_methods import fetch_games, fetch_pitch_details_bulk, fetch_team_by_name, iter_games, MAX_CONCURRENT_FEEDS
+from helper_methods import build_pitch_args, str_to_datetime
+from pitch_search import PitchIndex
+from pitch_solver import pitch_arrays, solve_accelerations
+from pitch_table import PitchTable
+from trajectory_export import sample_trajectories, DEFAULT_DT
+
+# Selector keys that filter pitches by a PitchTable column of the same name.
+PITCH_FILTERS = ('pitch_type', 'pitcher_name', 'batter_name', 'pitcher_hand', 'batter_hand', 'result', 'half_inning', 'inning', 'balls_before', 'strikes_before', 'outs_before')
+
+# The pitch filters whose values are whole numbers, and the ones in MPH.
+INT_FILTERS = ('inning', 'balls_before', 'strikes_before', 'outs_before')
+SPEED_FILTERS = ('min_speed', 'max_speed')
+
+# The Pitch attributes written with every row, to tell the pitches apart.
+PITCH_FIELDS = ('pitch_type', 'result', 'pitcher_name', 'batter_name', 'inning', 'half_inning', 'balls_before', 'strikes_before', 'outs_before')
+
+# A game by gamePk, e.g. '717465', or by its feed link, e.g. '/api/v1.1/game/717465/feed/live'.
+GAME_PATTERN = re.compile(r'(\d+)|/api/v[\d.]+/game/(\d+)/feed/live/?')
+
+MODES = ('args', 'trajectory')
+FORMATS = ('jsonl', 'csv')
+
+
+def load_selectors(path):
+    """ Read selectors from a JSON lines file. Blank lines and lines starting with '#' are skipped, and so are lines
+    that are not a JSON object, each with a message.
+
+    Args:
+        path (str): '-' for standard input.
+
+    Returns:
+        list[dict]
+    """
+
+    f = sys.stdin if path == '-' else open(path)
+    selectors = []
+    try:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if line == '' or line.startswith('#'):
+                continue
+            try:
+                selector = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Line {line_number}: not valid JSON ({e}). Skipped.", file=sys.stderr)
+                continue
+            if not isinstance(selector, dict):
+                print(f"Line {line_number}: not a JSON object. Skipped.", file=sys.stderr)
+                continue
+            selector.setdefault('name', str(line_number))
+            selectors.append(selector)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    return selectors
+
+
+def resolve_games(selector):
+    """ Get the games a selector refers to.
+
+    Args:
+        selector (dict)
+
+    Returns:
+        list[Game] | None: None if a team is not found or no games are found.
+    """
+
+    # A single game, by gamePk or by its feed link.
+    if selector.get('game') is not None:
+        match = GAME_PATTERN.fullmatch(str(selector['game']).strip())
+        if match is None:
+            print(f"Selector {selector.get('name')}: '{selector['game']}' is not a gamePk or a game feed link.", file=sys.stderr)
+            return None
+        return fetch_games(game_pk=match.group(1) or match.group(2))
+
+    start_date = selector.get('start_date')
+    end_date = selector.get('end_date') or start_date
+    if start_date is None:
+        print(f"Selector {selector.get('name')} needs a game or a start_date.", file=sys.stderr)
+        return None
+
+    # Checked here, since a bad date would otherwise fail deep in iter_games and stop every other selector.
+    for key, value in (('start_date', start_date), ('end_date', end_date)):
+        date_obj = str_to_datetime(value) if isinstance(value, str) else None
+        if date_obj is None or date_obj.strftime('%Y-%m-%d') != value:
+            print(f"Selector {selector.get('name')}: {key} '{value}' is not in the form YYYY-MM-DD.", file=sys.stderr)
+            return None
+    if end_date < start_date:
+        print(f"Selector {selector.get('name')}: end_date is before start_date.", file=sys.stderr)
+        return None
+
+    # Team names are looked up in the season the range starts in.
+    season = start_date[:4]
+    team_id = opponent_id = None
+    for key in ('team', 'opponent'):
+        if selector.get(key) is None:
+            continue
+        team = fetch_team_by_name(selector[key], season)
+        if team is None:
+            print(f"Selector {selector.get('name')}: no team found for '{selector[key]}'.", file=sys.stderr)
+            return None
+        if key == 'team':
+            team_id = team.id
+        else:
+            opponent_id = team.id
+
+    return list(iter_games(start_date, end_date, team_id, opponent_id)) or None
+
+
+def pitch_criteria(selector):
+    """ Convert the pitch filters of a selector to criteria for PitchIndex.search. Whole numbers and speeds given as
+    strings, e.g. "3" or "90.5", are converted.
+
+    Args:
+        selector (dict)
+
+    Returns:
+        dict | None: None if a filter has a value of the wrong type.
+    """
+
+    criteria = {}
+    for name in PITCH_FILTERS:
+        value = selector.get(name)
+        if value is None:
+            continue
+
+        values = value if isinstance(value, list) else [value]
+        if name in INT_FILTERS:
+            values = [_to_number(item, int) for item in values]
+        elif not all(isinstance(item, str) for item in values):
+            values = [None]
+        if None in values:
+            print(f"Selector {selector.get('name')}: {name} '{value}' is not a valid value.", file=sys.stderr)
+            return None
+        criteria[name] = values[0] if not isinstance(value, list) else set(values)
+
+    speeds = []
+    for name in SPEED_FILTERS:
+        value = selector.get(name)
+        speed = _to_number(value, float) if value is not None else None
+        if value is not None and speed is None:
+            print(f"Selector {selector.get('name')}: {name} '{value}' is not a number.", file=sys.stderr)
+            return None
+        speeds.append(speed)
+
+    if speeds != [None, None]:
+        criteria['start_speed'] = tuple(speeds)
+    return criteria
+
+
+def _to_number(value, number_type):
+    """ Convert a number, or a string of one, to int or float. Returns None for anything else, e.g. 2.5 as an int. """
+
+    if isinstance(value, bool):
+        return None
+    try:
+        number = number_type(value) if isinstance(value, (str, int, float)) else None
+    except ValueError:
+        return None
+    if number is not None and number_type is int and isinstance(value, float) and value != number:
+        return None
+    return number
+
+
+def select_pitches(pitches, criteria):
+    """ Get the positions of the pitches of a game that match every criterion.
+
+    Args:
+        pitches (list[Pitch])
+        criteria (dict): The result of pitch_criteria.
+
+    Returns:
+        list[int]
+    """
+
+    if len(criteria) == 0:
+        return list(range(len(pitches)))
+    return [int(row) for row in PitchIndex(pitches).search(**criteria)]
+
+
+def args_records(selector, game, pitches, rows):
+    """ Build a row of simulation args for each selected pitch. Pitches missing a field the simulation needs are left out.
+
+    Args:
+        selector (dict)
+        game (Game)
+        pitches (list[Pitch])
+        rows (list[int]): The positions of the selected pitches.
+
+    Yields:
+        dict: The pitch's identity followed by the args of build_pitch_args.
+    """
+
+    for row in rows:
+        pitch = pitches[row]
+        if not pitch.complete:
+            continue
+        yield {**_identity(selector, game, pitch, row), **build_pitch_args(pitch)}
+
+
+def trajectory_records(selector, game, pitches, rows, dt=DEFAULT_DT, per_sample=False):
+    """ Build the corrected accelerations and sampled path of each selected pitch, as the simulation would draw it.
+
+    Args:
+        selector (dict)
+        game (Game)
+        pitches (list[Pitch])
+        rows (list[int]): The positions of the selected pitches.
+        dt (float, optional): Seconds between samples. Defaults to DEFAULT_DT.
+        per_sample (bool, optional): One row per sample, e.g. for CSV, instead of one row per pitch with its path
+            as a list. Defaults to False.
+
+    Yields:
+        dict
+    """
+
+    table = PitchTable.from_pitches([pitches[row] for row in rows])
+    if len(table) == 0:
+        return
+
+    solved = solve_accelerations(pitch_arrays(table))
+    samples, counts, t_start, t_end = sample_trajectories(table, dt)
+
+    offset = 0
+    for i, row in enumerate(rows):
+        count = int(counts[i])
+        path = samples[offset:offset + count]
+        offset += count
+
+        # Pitches missing coordinates have no samples.
+        if count == 0:
+            continue
+
+        record = {
+            **_identity(selector, game, pitches[row], row),
+            'aX': float(solved.aX[i]),
+            'aY': float(solved.aY[i]),
+            'aZ': float(solved.aZ[i]),
+            'start_time': float(t_start[i]),
+            'end_time': float(t_end[i]),
+            'dt': dt,
+        }
+        if not per_sample:
+            yield {**record, 'path': path.round(4).tolist()}
+            continue
+
+        for step, (x, y, z) in enumerate(path.tolist()):
+            yield {**record, 'sample': step, 't': min(float(t_start[i]) + step * dt, float(t_end[i])), 'x': x, 'y': y, 'z': z}
+
+
+def _identity(selector, game, pitch, row):
+    """ Get the fields that identify a pitch in the output. """
+
+    identity = {
+        'selector': selector.get('name'),
+        'game_pk': game.game_pk,
+        'date': game.date,
+        'home': game.home_team.abbreviation,
+        'away': game.away_team.abbreviation,
+        'pitch_index': row,
+    }
+    for name in PITCH_FIELDS:
+        identity[name] = getattr(pitch, name)
+    return identity
+
+
+class RecordWriter:
+    def __init__(self, f, output_format='jsonl'):
+        """ A class to write dict rows as JSON lines or as CSV. The CSV header is taken from the first row.
+
+        Args:
+            f (file): An open text file.
+            output_format (str, optional): 'jsonl' or 'csv'. Defaults to 'jsonl'.
+        """
+        self.f = f
+        self.output_format = output_format
+        self.rows = 0
+        self._csv = None
+
+    def write(self, record):
+        if self.output_format == 'jsonl':
+            self.f.write(json.dumps(record) + '\n')
+        else:
+            if self._csv is None:
+                self._csv = csv.DictWriter(self.f, fieldnames=list(record), extrasaction='ignore')
+                self._csv.writeheader()
+            self._csv.writerow(record)
+        self.rows += 1
+
+
+def run_batch(selectors, f, mode='args', output_format='jsonl', max_workers=MAX_CONCURRENT_FEEDS, dt=DEFAULT_DT):
+    """ Find the games of every selector, download their feeds concurrently and write a row for each selected pitch.
+
+    Rows are written as each feed arrives, so they are grouped by game in order of completion. Sort by game_pk and
+    pitch_index for a stable order. A game wanted by several selectors is downloaded once.
+
+    Args:
+        selectors (list[dict])
+        f (file): An open text file to write to.
+        mode (str, optional): 'args' for the simulation args, 'trajectory' for corrected trajectories. Defaults to 'args'.
+        output_format (str, optional): 'jsonl' or 'csv'. Defaults to 'jsonl'.
+        max_workers (int, optional): The most feeds downloaded at once. Defaults to MAX_CONCURRENT_FEEDS.
+        dt (float, optional): Seconds between trajectory samples. Defaults to DEFAULT_DT.
+
+    Returns:
+        tuple[int, int]: The number of pitches written and the number of games.
+    """
+
+    # Selectors with a bad pitch filter are reported and skipped.
+    criteria_of = {id(selector): pitch_criteria(selector) for selector in selectors}
+    selectors = [selector for selector in selectors if criteria_of[id(selector)] is not None]
+
+    # Find every game and which selectors want it, looking selectors up concurrently. map keeps their order.
+    games = {}
+    wanted_by = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for selector, selector_games in zip(selectors, executor.map(resolve_games, selectors)):
+            for game in selector_games or []:
+                games.setdefault(game.link, game)
+                wanted_by.setdefault(game.link, []).append(selector)
+
+    writer = RecordWriter(f, output_format)
+    pitches_written = 0
+    for game, pitches in fetch_pitch_details_bulk(list(games.values()), max_workers):
+        if pitches is None:
+            continue
+
+        for selector in wanted_by[game.link]:
+            rows = select_pitches(pitches, criteria_of[id(selector)])
+            if mode == 'args':
+                records = args_records(selector, game, pitches, rows)
+            else:
+                records = trajectory_records(selector, game, pitches, rows, dt, per_sample=output_format == 'csv')
+
+            # Count pitches rather than rows, since a trajectory in CSV takes one row per sample.
+            written = set()
+            for record in records:
+                writer.write(record)
+                written.add(record['pitch_index'])
+            pitches_written += len(written)
+
+    return pitches_written, len(games)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write the simulation args or trajectories of many pitches without prompts.')
+    parser.add_argument('start_date', nargs='?', help='YYYY-MM-DD')
+    parser.add_argument('end_date', nargs='?', help='YYYY-MM-DD (default start_date).')
+    parser.add_argument('--selectors', help="A JSON lines file of selectors, or '-' for standard input. Replaces the selector options.")
+    parser.add_argument('--team', help='Only games with this team.')
+    parser.add_argument('--opponent', help='Only games against this team. Requires --team.')
+    parser.add_argument('--game', help='One game by gamePk or feed link instead of dates.')
+    parser.add_argument('--type', action='append', help='Pitch type, e.g. Slider. May be repeated.')
+    parser.add_argument('--pitcher', action='append', help='Pitcher full name. May be repeated.')
+    parser.add_argument('--batter', action='append', help='Batter full name. May be repeated.')
+    parser.add_argument('--pitcher-hand', choices=['L', 'R'])
+    parser.add_argument('--batter-hand', choices=['L', 'R'])
+    parser.add_argument('--result', action='append', help='e.g. "Swinging Strike". May be repeated.')
+    parser.add_argument('--inning', type=int, action='append', help='May be repeated.')
+    parser.add_argument('--count', help='Balls and strikes before the pitch, e.g. 3-2.')
+    parser.add_argument('--min-speed', type=float)
+    parser.add_argument('--max-speed', type=float)
+    parser.add_argument('--mode', choices=MODES, default='args', help='args: the simulation args (default). trajectory: corrected accelerations and sampled path.')
+    parser.add_argument('--format', choices=FORMATS, default='jsonl', help='jsonl (default) or csv. Trajectories in CSV take one row per sample.')
+    parser.add_argument('--dt', type=float, default=DEFAULT_DT, help=f'Seconds between trajectory samples (default {DEFAULT_DT:.5f}).')
+    parser.add_argument('--workers', type=int, default=MAX_CONCURRENT_FEEDS, help=f'Game feeds downloaded at once (default {MAX_CONCURRENT_FEEDS}).')
+    parser.add_argument('-o', '--output', default='-', help="The file to write (default standard output).")
+    args = parser.parse_args()
+
+    if args.opponent and not args.team:
+        parser.error('--opponent requires --team')
+
+    if args.selectors is not None:
+        selectors = load_selectors(args.selectors)
+    elif args.start_date is not None or args.game is not None:
+        selector = {
+            'name': 'args',
+            'start_date': args.start_date,
+            'end_date': args.end_date,
+            'team': args.team,
+            'opponent': args.opponent,
+            'game': args.game,
+            'pitch_type': args.type,
+            'pitcher_name': args.pitcher,
+            'batter_name': args.batter,
+            'pitcher_hand': args.pitcher_hand,
+            'batter_hand': args.batter_hand,
+            'result': args.result,
+            'inning': args.inning,
+            'min_speed': args.min_speed,
+            'max_speed': args.max_speed,
+        }
+        if args.count is not None:
+            try:
+                balls, strikes = (int(value) for value in args.count.split('-'))
+            except ValueError:
+                parser.error('--count must be in the form BALLS-STRIKES, e.g. 3-2')
+            selector.update({'balls_before': balls, 'strikes_before': strikes})
+        selectors = [selector]
+    else:
+        parser.error('pass a start_date, --game or --selectors')
+
+    f = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        pitches_written, games_found = run_batch(selectors, f, args.mode, args.format, args.workers, args.dt)
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+    # Report on standard error so it does not mix with rows written to standard output.
+    print(f"Wrote {pitches_written} pitches from {games_found} games.", file=sys.stderr)
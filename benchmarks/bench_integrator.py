@@ -0,0 +1,147 @@
+# This file benchmarks the drag + Magnus integrator against the constant-acceleration correction used by the simulation.
+#
+# Run from the repository root, e.g.
+#   python3 -m benchmarks.bench_integrator --game /api/v1.1/game/717465/feed/live
+#   python3 -m benchmarks.bench_integrator --feed saved_feed.json
+
+import argparse
+import json
+import time
+import numpy as np
+from tabulate import tabulate
+from api_classes import Game, Team
+from api_methods import fetch_pitch_details, _iter_pitches
+from pitch_integrator import simulate_pitches, INTEGRATOR_COLUMNS
+from pitch_solver import pitch_arrays, plate_time, solve_accelerations, MAX_ITERATIONS, PLATE_Y
+from pitch_table import PitchTable
+
+
+def load_pitches(game_links, feed_paths):
+    """ Load the pitches of live games and saved game feeds into one PitchTable.
+
+    Args:
+        game_links (list[str]): Links to game feeds, not including base of "https://statsapi.mlb.com".
+        feed_paths (list[str]): Paths to saved game feed JSON files.
+
+    Returns:
+        PitchTable
+    """
+
+    # Placeholder teams, since only the pitch coordinates are benchmarked.
+    home_team = Team('Home', '0', 'Home', 'Home', 'HOM')
+    away_team = Team('Away', '1', 'Away', 'Away', 'AWY')
+
+    tables = []
+    for link in game_links:
+        table = fetch_pitch_details(Game(home_team, away_team, link, '', ''), as_table=True)
+        if table is not None:
+            tables.append(table)
+
+    for path in feed_paths:
+        with open(path) as f:
+            data = json.load(f)
+        plays = data.get('liveData').get('plays').get('allPlays')
+        tables.append(PitchTable.from_pitches(_iter_pitches(plays, Game(home_team, away_team, '', '', ''))))
+
+    return PitchTable.concat(tables)
+
+
+def correct_one_pitch(c, i, iterations=MAX_ITERATIONS):
+    """ Correct the acceleration of one pitch the way the simulation does, one iteration at a time in Python.
+
+    Args:
+        c (dict[str, np.ndarray]): The result of pitch_arrays.
+        i (int): The pitch to correct.
+        iterations (int, optional): Defaults to MAX_ITERATIONS.
+
+    Returns:
+        tuple[float, float]: The corrected aX and aZ, NaN if the ball never reaches the plate.
+    """
+
+    x0, y0, z0 = float(c['x0'][i]), float(c['y0'][i]), float(c['z0'][i])
+    vX0, vY0, vZ0 = float(c['vX0'][i]), float(c['vY0'][i]), float(c['vZ0'][i])
+    aX, aY, aZ = float(c['aX'][i]), float(c['aY'][i]), float(c['aZ'][i])
+    pX, pZ = float(c['pX'][i]), float(c['pZ'][i])
+
+    # The same root as pitch_solver.plate_time, in a form that does not divide by aY, which may be 0.
+    discriminant = vY0 ** 2 - 2 * aY * (y0 - PLATE_Y)
+    q = 0.5 * (discriminant ** 0.5 - vY0) if discriminant >= 0 else 0.0
+    t = (y0 - PLATE_Y) / q if q != 0 else float('nan')
+    if not t > 0:
+        return float('nan'), float('nan')
+
+    for _ in range(iterations):
+        aX += pX - (x0 + vX0 * t + 0.5 * aX * t ** 2)
+        aZ += pZ - (z0 + vZ0 * t + 0.5 * aZ * t ** 2)
+    return aX, aZ
+
+
+def error_stats(dx, dz):
+    """ Summarize plate location errors in inches.
+
+    Returns:
+        list[float]: Mean, 95th percentile and max.
+    """
+
+    error = np.hypot(dx, dz) * 12
+    error = error[np.isfinite(error)]
+    if len(error) == 0:
+        return [float('nan')] * 3
+    return [float(np.mean(error)), float(np.percentile(error, 95)), float(np.max(error))]
+
+
+def timed(function, repeat):
+    """ Get the best wall-clock time of several calls, and the last result. """
+
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the drag + Magnus integrator against pX/pZ.')
+    parser.add_argument('--game', action='append', default=[], help='A game feed link, may be repeated.')
+    parser.add_argument('--feed', action='append', default=[], help='A saved game feed JSON file, may be repeated.')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing runs per method (default 3).')
+    parser.add_argument('--per-pitch-sample', type=int, default=200, help='Pitches timed with the per-pitch loop (default 200).')
+    args = parser.parse_args()
+
+    if len(args.game) == 0 and len(args.feed) == 0:
+        parser.error('pass at least one --game or --feed')
+
+    table = load_pitches(args.game, args.feed)
+    c = pitch_arrays(table, tuple(dict.fromkeys(INTEGRATOR_COLUMNS + ('aX', 'aY', 'aZ'))))
+    n = len(table)
+    print(f"Benchmarking {n} pitches...")
+    print('')
+
+    # Constant acceleration straight from the API.
+    t = plate_time(c['y0'], c['vY0'], c['aY'])
+    raw_x = c['x0'] + c['vX0'] * t + 0.5 * c['aX'] * t ** 2
+    raw_z = c['z0'] + c['vZ0'] * t + 0.5 * c['aZ'] * t ** 2
+
+    rk4_seconds, rk4 = timed(lambda: simulate_pitches(c), args.repeat)
+    solver_seconds, solved = timed(lambda: solve_accelerations(c), args.repeat)
+
+    # The per-pitch loop is slow, so only time a sample of it and scale up.
+    sample = min(args.per_pitch_sample, n)
+    loop_seconds, _ = timed(lambda: [correct_one_pitch(c, i) for i in range(sample)], 1)
+
+    headers = ['Method', 'Mean err (in)', 'P95 err (in)', 'Max err (in)', 'Pitches/s']
+    rows = [
+        ['Constant accel (API)', *error_stats(raw_x - c['pX'], raw_z - c['pZ']), ''],
+        ['Drag + Magnus RK4 (batch)', *error_stats(rk4.x - c['pX'], rk4.z - c['pZ']), n / rk4_seconds],
+        ['Closed-form correction (batch)', *error_stats(solved.residual_x, solved.residual_z), n / solver_seconds],
+        [f'{MAX_ITERATIONS}-iteration correction (per pitch)', '', '', '', sample / loop_seconds if sample else ''],
+    ]
+    print(tabulate(rows, headers=headers, floatfmt='.3f'))
+    print('')
+    print(f"RK4 steps per pitch: mean {np.mean(rk4.steps):.1f}, max {np.max(rk4.steps) if n else 0}")
+
+
+if __name__ == '__main__':
+    main()
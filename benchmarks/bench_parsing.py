@@ -0,0 +1,230 @@
+# This file benchmarks parsing statsapi responses in api_methods and rendering them in helper_methods, against fixtures
+# served by the stand-in for statsapi.mlb.com on this machine. See benchmarks/fixtures.py and benchmarks/stand_in_server.py.
+#
+# Run from the repository root, e.g.
+#   python3 -m benchmarks.bench_parsing --save-baseline
+#   python3 -m benchmarks.bench_parsing
+# The second run exits with status 1 if any measurement is more than --threshold worse than the baseline, or if there is
+# no baseline. The baseline is not committed, since timings depend on the machine that measured them.
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from tabulate import tabulate
+import api_methods
+from api_cache import get_cache, set_cache
+from api_classes import Game, Team
+from api_methods import fetch_games, fetch_pitch_details
+from api_transport import get_transport, set_transport
+from helper_methods import print_games, print_pitches
+from replay import ReplayTransport
+from snapshot import get_snapshot, set_snapshot
+from benchmarks.fixtures import FEED_FIXTURES, FIXTURE_NAMES, SCHEDULE_FIXTURE, SEASON, fixture_responses, load_fixture
+from benchmarks.stand_in_server import StandInServer
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_THRESHOLD = 0.25 # The fraction a measurement may grow over the baseline before the run fails.
+METRICS = ('parse_seconds', 'peak_bytes', 'objects_allocated', 'render_seconds')
+
+
+def measure(parse, render, repeat):
+    """ Measure one parse function and the rendering of its result.
+
+    Args:
+        parse (Callable[[], list]): Parses a fixture, e.g. fetch_games through the stand-in.
+        render (Callable[[list], None]): Prints the result, e.g. print_games.
+        repeat (int): Timing runs. The best one is kept.
+
+    Returns:
+        tuple[dict[str, float], int]: Every metric in METRICS, and the number of items parsed.
+    """
+
+    # Time without tracemalloc, which slows allocation down.
+    parse_seconds = float('inf')
+    for _ in range(repeat):
+        _reset()
+        start = time.perf_counter()
+        result = parse()
+        parse_seconds = min(parse_seconds, time.perf_counter() - start)
+
+    # Peak memory during one parse, and the objects (Pitches, dicts, strings, ...) tracemalloc saw allocated during it
+    # that are still alive when it returns. tracemalloc does not count the ones freed along the way, so those only show
+    # in the peak.
+    _reset()
+    result = None
+    gc.collect()
+    tracemalloc.start()
+    result = parse()
+    gc.collect()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+    tracemalloc.stop()
+    objects_allocated = sum(stat.count for stat in snapshot.statistics('filename'))
+    del snapshot
+
+    # Render to memory so the terminal's speed is not measured.
+    render_seconds = float('inf')
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            render(result)
+            render_seconds = min(render_seconds, time.perf_counter() - start)
+
+    metrics = {
+        'parse_seconds': parse_seconds,
+        'peak_bytes': peak_bytes,
+        'objects_allocated': objects_allocated,
+        'render_seconds': render_seconds,
+    }
+    return metrics, len(result or [])
+
+
+def _reset():
+    """ Forget the teams parsed by a previous run so every run does the same work. """
+
+    with api_methods._team_registries_lock:
+        api_methods._team_registries.clear()
+
+
+def run_benchmarks(repeat):
+    """ Run every benchmark against the stand-in.
+
+    Args:
+        repeat (int): Timing runs per measurement.
+
+    Returns:
+        tuple[dict[str, dict[str, float]], dict[str, int], dict[str, bool]]: The metrics and number of items of
+            each case, and whether each fixture was recorded rather than generated.
+    """
+
+    fixtures = {}
+    recorded = {}
+    for name in FIXTURE_NAMES:
+        fixtures[name], recorded[name] = load_fixture(name)
+
+    # Send every request to the stand-in and parse every response, bypassing the response cache and the snapshot. Only
+    # the fixtures are served, without latency.
+    previous_transport, previous_cache, previous_snapshot = get_transport(), get_cache(), get_snapshot()
+    server = StandInServer(generate=False, responses=fixture_responses(fixtures))
+    transport = ReplayTransport(server.start(), max_retries=0)
+    set_transport(transport)
+    set_cache(None)
+    set_snapshot(None)
+
+    results = {}
+    counts = {}
+    try:
+        # Placeholder teams, since the feed does not carry the abbreviations the schedule does.
+        home_team = Team('Home', '0', 'Home', 'Home', 'HOM')
+        away_team = Team('Away', '1', 'Away', 'Away', 'AWY')
+        for name in FEED_FIXTURES:
+            game = Game(home_team, away_team, f"/api/v1.1/game/{fixtures[name].get('gamePk')}/feed/live", '', '')
+            results[name], counts[name] = measure(lambda: fetch_pitch_details(game), print_pitches, repeat)
+
+        results[SCHEDULE_FIXTURE], counts[SCHEDULE_FIXTURE] = measure(lambda: fetch_games(f"{SEASON}-01-01", f"{SEASON}-12-31"), print_games, repeat)
+    finally:
+        transport.close()
+        server.stop()
+        set_transport(previous_transport)
+        set_cache(previous_cache)
+        set_snapshot(previous_snapshot)
+
+    return results, counts, recorded
+
+
+def compare(results, baseline, threshold):
+    """ Compare results to a baseline.
+
+    Args:
+        results (dict[str, dict[str, float]])
+        baseline (dict[str, dict[str, float]])
+        threshold (float): The fraction a measurement may grow over the baseline.
+
+    Returns:
+        tuple[dict[str, str], list[str]]: A summary of each case, and a description of every regression.
+    """
+
+    summaries = {}
+    regressions = []
+    for name, metrics in results.items():
+        old = baseline.get(name)
+        if old is None:
+            summaries[name] = 'no baseline'
+            continue
+
+        changes = []
+        for metric in METRICS:
+            if not old.get(metric):
+                continue
+            ratio = metrics[metric] / old[metric]
+            changes.append(f"{metric.split('_')[0]} {ratio - 1:+.0%}")
+            if ratio > 1 + threshold:
+                regressions.append(f"{name} {metric}: {metrics[metric]:.6g} vs baseline {old[metric]:.6g} ({ratio - 1:+.0%})")
+        summaries[name] = ', '.join(changes)
+
+    return summaries, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parsing and rendering statsapi fixtures.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing runs per measurement (default 5).')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='The baseline JSON file (default benchmarks/baseline.json).')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help=f'Fail if a measurement grows more than this fraction (default {DEFAULT_THRESHOLD}).')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline instead of comparing.')
+    args = parser.parse_args()
+
+    results, counts, recorded = run_benchmarks(args.repeat)
+
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    summaries, regressions = compare(results, baseline.get('results', {}), args.threshold)
+
+    headers = ['Case', 'Fixture', 'Items', 'Parse (ms)', 'Peak (KiB)', 'Objects allocated', 'Render (ms)', 'vs baseline']
+    rows = []
+    for name, metrics in results.items():
+        rows.append([
+            name,
+            'recorded' if recorded[name] else 'generated',
+            counts[name],
+            metrics['parse_seconds'] * 1000,
+            metrics['peak_bytes'] / 1024,
+            metrics['objects_allocated'],
+            metrics['render_seconds'] * 1000,
+            summaries[name],
+        ])
+    print(tabulate(rows, headers=headers, floatfmt='.2f'))
+    print('')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'recorded': recorded, 'results': results}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}.")
+        return
+
+    if len(baseline) == 0:
+        print(f"No baseline at {args.baseline}. Run with --save-baseline to store one.")
+        sys.exit(1)
+
+    # Measurements of recorded and generated fixtures cannot be compared.
+    if baseline.get('recorded') != recorded:
+        print("Warning: the baseline was measured with different fixtures. Run with --save-baseline to replace it.")
+
+    if len(regressions) != 0:
+        print(f"{len(regressions)} measurements are more than {args.threshold:.0%} worse than the baseline:")
+        for regression in regressions:
+            print(f"   {regression}")
+        sys.exit(1)
+
+    print(f"Every measurement is within {args.threshold:.0%} of the baseline.")
+
+
+if __name__ == '__main__':
+    main()
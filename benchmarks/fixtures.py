@@ -0,0 +1,273 @@
+# This file defines the statsapi JSON fixtures the benchmarks run against. benchmarks/stand_in_server.py serves them.
+#
+# Recorded fixtures are stored gzipped in benchmarks/fixtures/. Record them from the repository root with
+#   python3 -m benchmarks.fixtures --small 717401 --typical 717465 --extra-innings 717530 --season 2023
+# Any fixture not recorded is generated instead: a deterministic feed or schedule with the same layout and field
+# names as the API, so the benchmarks always run without a network.
+
+import argparse
+import gzip
+import json
+import os
+import random
+import re
+from datetime import date, timedelta
+from api_transport import get_transport, BASE_URL
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# The game feeds benchmarked, and the number of innings of the one generated when it is not recorded.
+FEED_FIXTURES = {
+    'feed_small': 5, # e.g. a game called for rain.
+    'feed_typical': 9,
+    'feed_extra_innings': 13,
+}
+SCHEDULE_FIXTURE = 'schedule_season'
+FIXTURE_NAMES = (*FEED_FIXTURES, SCHEDULE_FIXTURE)
+
+SEASON = 2023 # The season of the generated fixtures.
+FEED_PATTERN = re.compile(r'/game/(\d+)/feed/live')
+
+
+def fixture_path(name):
+    """ Get the path of a recorded fixture. """
+
+    return os.path.join(FIXTURE_DIR, f"{name}.json.gz")
+
+
+def load_fixture(name):
+    """ Get the JSON of a fixture, generating it if it has not been recorded.
+
+    Args:
+        name (str): A name in FIXTURE_NAMES.
+
+    Returns:
+        tuple[dict, bool]: The JSON and whether it was recorded.
+    """
+
+    path = fixture_path(name)
+    if os.path.exists(path):
+        with gzip.open(path, 'rt') as f:
+            return json.load(f), True
+
+    if name == SCHEDULE_FIXTURE:
+        return generate_schedule(SEASON), False
+    return generate_feed(FIXTURE_NAMES.index(name) + 1, FEED_FIXTURES[name]), False
+
+
+def record_fixture(name, url, params=None):
+    """ Download a response from statsapi.mlb.com and store it as a fixture.
+
+    Args:
+        name (str): A name in FIXTURE_NAMES.
+        url (str): The target URL.
+        params (dict, optional): The GET request parameters. Defaults to None.
+
+    Returns:
+        bool: Whether the fixture was recorded.
+    """
+
+    r = get_transport().get(url, params=params)
+    if r is None or r.status_code != 200:
+        print(f"Could not record {name} from {url}")
+        return False
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    with gzip.open(fixture_path(name), 'wb') as f:
+        f.write(r.content)
+    print(f"Recorded {name} ({len(r.content)} bytes).")
+    return True
+
+
+def fixture_responses(fixtures):
+    """ Map the path each fixture answers to its JSON, for a StandInServer to serve whatever the parameters.
+
+    Every schedule request gets the schedule fixture and every game feed request gets the feed with the same gamePk.
+
+    Args:
+        fixtures (dict[str, dict]): The JSON of each fixture, keyed by name.
+
+    Returns:
+        dict[str, dict]: e.g. {'/api/v1/schedule': {...}, '/api/v1.1/game/717465/feed/live': {...}}.
+    """
+
+    responses = {f"/api/v1.1/game/{data.get('gamePk')}/feed/live": data for (name, data) in fixtures.items() if name in FEED_FIXTURES}
+    if SCHEDULE_FIXTURE in fixtures:
+        responses['/api/v1/schedule'] = fixtures[SCHEDULE_FIXTURE]
+    return responses
+
+
+def generate_feed(game_pk, innings, seed=None):
+    """ Generate a game feed with the layout of /api/v1.1/game/{pk}/feed/live, including the fields a Pitch does not use.
+
+    Args:
+        game_pk (int)
+        innings (int)
+        seed (int, optional): Defaults to game_pk.
+
+    Returns:
+        dict
+    """
+
+    rnd = random.Random(game_pk if seed is None else seed)
+    pitch_types = [('FF', 'Four-Seam Fastball'), ('SL', 'Slider'), ('CH', 'Changeup'), ('CU', 'Curveball'), ('SI', 'Sinker'), ('FC', 'Cutter')]
+    calls = [('B', 'Ball'), ('C', 'Called Strike'), ('S', 'Swinging Strike'), ('F', 'Foul'), ('X', 'In play, out(s)')]
+    pitchers = [{'id': 600000 + i, 'fullName': f"Pitcher{i} Arm{i}", 'link': f"/api/v1/people/{600000 + i}"} for i in range(8)]
+    batters = [{'id': 500000 + i, 'fullName': f"Batter{i} Bat{i}", 'link': f"/api/v1/people/{500000 + i}"} for i in range(18)]
+
+    plays = []
+    home_score = away_score = 0
+    for inning in range(1, innings + 1):
+        for half_inning in ('top', 'bottom'):
+            for out in range(3):
+                pitcher = pitchers[(inning * 2 + (half_inning == 'bottom')) % len(pitchers)]
+                batter = batters[(len(plays) + (9 if half_inning == 'bottom' else 0)) % len(batters)]
+                events = []
+                balls = strikes = 0
+                for index in range(rnd.randint(1, 7)):
+                    pitch_code, pitch_name = rnd.choice(pitch_types)
+                    call_code, call_name = rnd.choice(calls)
+                    speed = rnd.uniform(78, 100)
+                    events.append({
+                        'details': {
+                            'call': {'code': call_code, 'description': call_name},
+                            'description': call_name, 'code': call_code, 'ballColor': 'rgba(39, 161, 39, 1.0)', 'trailColor': 'rgba(188, 0, 33, 1.0)',
+                            'isInPlay': call_code == 'X', 'isStrike': call_code != 'B', 'isBall': call_code == 'B',
+                            'type': {'code': pitch_code, 'description': pitch_name}, 'hasReview': False,
+                        },
+                        'count': {'balls': balls, 'strikes': strikes, 'outs': out},
+                        'pitchData': {
+                            'startSpeed': round(speed, 1), 'endSpeed': round(speed - 8.5, 1),
+                            'strikeZoneTop': round(rnd.uniform(3.2, 3.6), 2), 'strikeZoneBottom': round(rnd.uniform(1.5, 1.7), 2),
+                            'coordinates': {
+                                'aY': round(rnd.uniform(24, 34), 2), 'aZ': round(rnd.uniform(-40, -12), 2), 'pfxX': round(rnd.uniform(-10, 10), 2),
+                                'pfxZ': round(rnd.uniform(-6, 12), 2), 'pX': round(rnd.uniform(-1.5, 1.5), 2), 'pZ': round(rnd.uniform(0.5, 4.5), 2),
+                                'vX0': round(rnd.uniform(-9, 9), 2), 'vY0': round(-speed * 1.45, 2), 'vZ0': round(rnd.uniform(-9, 1), 2),
+                                'x': round(rnd.uniform(60, 160), 2), 'y': round(rnd.uniform(150, 220), 2), 'x0': round(rnd.uniform(-3, 3), 2),
+                                'y0': 50.0, 'z0': round(rnd.uniform(5, 6.6), 2), 'aX': round(rnd.uniform(-20, 15), 2),
+                            },
+                            'breaks': {
+                                'breakAngle': round(rnd.uniform(0, 50), 1), 'breakLength': round(rnd.uniform(3, 15), 1), 'breakY': 24.0,
+                                'breakVertical': round(rnd.uniform(-50, -10), 1), 'breakVerticalInduced': round(rnd.uniform(-5, 20), 1),
+                                'breakHorizontal': round(rnd.uniform(-15, 15), 1), 'spinRate': rnd.randint(1500, 2900), 'spinDirection': rnd.randint(0, 359),
+                            },
+                            'zone': rnd.randint(1, 14), 'typeConfidence': 0.9, 'plateTime': round(rnd.uniform(0.37, 0.48), 2), 'extension': round(rnd.uniform(5.5, 7.2), 2),
+                        },
+                        'index': index, 'playId': f"{game_pk:08x}-{len(plays):04x}-{index:04x}-0000-000000000000", 'pitchNumber': index + 1,
+                        'startTime': '2023-04-01T19:00:00.000Z', 'endTime': '2023-04-01T19:00:10.000Z', 'isPitch': True, 'type': 'pitch',
+                    })
+                    balls = min(balls + (call_code == 'B'), 3)
+                    strikes = min(strikes + (call_code != 'B'), 2)
+
+                    # Mound visits, pickoffs and substitutions are events that are not pitches.
+                    if rnd.random() < 0.05:
+                        events.append({'details': {'description': 'Mound Visit.', 'event': 'Game Advisory', 'isOut': False}, 'count': {'balls': balls, 'strikes': strikes, 'outs': out}, 'index': index, 'isPitch': False, 'type': 'action'})
+
+                if rnd.random() < 0.25:
+                    if half_inning == 'top':
+                        away_score += 1
+                    else:
+                        home_score += 1
+
+                plays.append({
+                    'result': {'type': 'atBat', 'event': 'Groundout', 'eventType': 'field_out', 'description': f"{batter['fullName']} grounds out.", 'rbi': 0, 'awayScore': away_score, 'homeScore': home_score, 'isOut': True},
+                    'about': {'atBatIndex': len(plays), 'halfInning': half_inning, 'isTopInning': half_inning == 'top', 'inning': inning, 'startTime': '2023-04-01T19:00:00.000Z', 'endTime': '2023-04-01T19:02:00.000Z', 'isComplete': True, 'isScoringPlay': False, 'hasReview': False, 'hasOut': True, 'captivatingIndex': 0},
+                    'count': {'balls': balls, 'strikes': strikes, 'outs': out + 1},
+                    'matchup': {'batter': batter, 'batSide': {'code': 'L' if batter['id'] % 3 == 0 else 'R', 'description': 'Right'}, 'pitcher': pitcher, 'pitchHand': {'code': 'L' if pitcher['id'] % 4 == 0 else 'R', 'description': 'Right'}, 'batterHotColdZones': [], 'pitcherHotColdZones': [], 'splits': {'batter': 'vs_RHP', 'pitcher': 'vs_RHB', 'menOnBase': 'Empty'}},
+                    'pitchIndex': list(range(len(events))), 'actionIndex': [], 'runnerIndex': [0], 'runners': [],
+                    'playEvents': events, 'playEndTime': '2023-04-01T19:02:00.000Z', 'atBatIndex': len(plays),
+                })
+
+    return {
+        'copyright': 'Copyright 2023 MLB Advanced Media, L.P.',
+        'gamePk': game_pk,
+        'link': f"/api/v1.1/game/{game_pk}/feed/live",
+        'metaData': {'wait': 10, 'timeStamp': '20230401_230000', 'gameEvents': [], 'logicalEvents': []},
+        'gameData': {
+            'game': {'pk': game_pk, 'type': 'R', 'doubleHeader': 'N', 'id': f"2023/04/01/game-{game_pk}", 'season': str(SEASON)},
+            'datetime': {'dateTime': '2023-04-01T19:00:00Z', 'officialDate': '2023-04-01'},
+            'status': {'abstractGameState': 'Final', 'codedGameState': 'F', 'detailedState': 'Final', 'statusCode': 'F'},
+            'teams': {'away': _team(0), 'home': _team(1)},
+            'players': {f"ID{person['id']}": {**person, 'primaryNumber': '1', 'currentAge': 28, 'height': "6' 2\"", 'weight': 200, 'active': True} for person in pitchers + batters},
+        },
+        'liveData': {
+            'plays': {'allPlays': plays, 'currentPlay': plays[-1], 'scoringPlays': [], 'playsByInning': []},
+            'linescore': {'currentInning': innings, 'scheduledInnings': 9, 'innings': [{'num': i, 'home': {'runs': 0}, 'away': {'runs': 0}} for i in range(1, innings + 1)]},
+            'boxscore': {'teams': {'away': {'team': _team(0), 'players': {}}, 'home': {'team': _team(1), 'players': {}}}, 'info': [{'label': 'Weather', 'value': '72 degrees, Sunny.'}] * 20},
+        },
+    }
+
+
+def generate_schedule(season, teams=30, games_per_day=15, first_game_pk=700001):
+    """ Generate a regular season schedule with the layout of /api/v1/schedule?hydrate=team.
+
+    Args:
+        season (int)
+        teams (int, optional): Defaults to 30.
+        games_per_day (int, optional): Defaults to 15, every team playing every day.
+        first_game_pk (int, optional): The gamePk of the first game. Defaults to 700001.
+
+    Returns:
+        dict
+    """
+
+    rnd = random.Random(season)
+    dates = []
+    day = date(season, 3, 30)
+    game_pk = first_game_pk - 1
+    while day <= date(season, 10, 1):
+        order = list(range(teams))
+        rnd.shuffle(order)
+        games = []
+        for i in range(games_per_day):
+            game_pk += 1
+            games.append({
+                'gamePk': game_pk, 'gameGuid': f"{game_pk:08x}-0000-0000-0000-000000000000", 'link': f"/api/v1.1/game/{game_pk}/feed/live",
+                'gameType': 'R', 'season': str(season), 'gameDate': f"{day.isoformat()}T23:05:00Z", 'officialDate': day.isoformat(),
+                'status': {'abstractGameState': 'Final', 'codedGameState': 'F', 'detailedState': 'Final', 'statusCode': 'F', 'startTimeTBD': False, 'abstractGameCode': 'F'},
+                'teams': {
+                    'away': {'leagueRecord': {'wins': 1, 'losses': 0, 'pct': '1.000'}, 'score': rnd.randint(0, 10), 'team': _team(order[2 * i]), 'isWinner': True, 'splitSquad': False, 'seriesNumber': 1},
+                    'home': {'leagueRecord': {'wins': 0, 'losses': 1, 'pct': '.000'}, 'score': rnd.randint(0, 10), 'team': _team(order[2 * i + 1]), 'isWinner': False, 'splitSquad': False, 'seriesNumber': 1},
+                },
+                'venue': {'id': 1 + order[2 * i + 1], 'name': f"Park {order[2 * i + 1]}", 'link': f"/api/v1/venues/{1 + order[2 * i + 1]}"},
+                'content': {'link': f"/api/v1/game/{game_pk}/content"}, 'isTie': False, 'gameNumber': 1, 'publicFacing': True,
+                'doubleHeader': 'N', 'gamedayType': 'P', 'tiebreaker': 'N', 'calendarEventID': f"14-{game_pk}-{day.isoformat()}",
+                'seasonDisplay': str(season), 'dayNight': 'night', 'scheduledInnings': 9, 'reverseHomeAwayStatus': False,
+                'inningBreakLength': 120, 'gamesInSeries': 3, 'seriesGameNumber': 1, 'seriesDescription': 'Regular Season',
+                'recordSource': 'S', 'ifNecessary': 'N', 'ifNecessaryDescription': 'Normal Game',
+            })
+        dates.append({'date': day.isoformat(), 'totalItems': len(games), 'totalEvents': 0, 'totalGames': len(games), 'totalGamesInProgress': 0, 'games': games, 'events': []})
+        day += timedelta(days=1)
+
+    return {'copyright': 'Copyright 2023 MLB Advanced Media, L.P.', 'totalItems': game_pk - first_game_pk + 1, 'totalEvents': 0, 'totalGames': game_pk - first_game_pk + 1, 'totalGamesInProgress': 0, 'dates': dates}
+
+
+def _team(i):
+    """ Generate the hydrated JSON of the i-th team. """
+
+    return {
+        'springLeague': {'id': 114, 'name': 'Cactus League', 'link': '/api/v1/league/114', 'abbreviation': 'CL'},
+        'allStarStatus': 'N', 'id': 108 + i, 'name': f"City{i} Club{i}s", 'link': f"/api/v1/teams/{108 + i}", 'season': SEASON,
+        'venue': {'id': 1 + i, 'name': f"Park {i}", 'link': f"/api/v1/venues/{1 + i}"}, 'teamCode': f"c{i:02d}", 'fileCode': f"c{i:02d}",
+        'abbreviation': f"C{i:02d}", 'teamName': f"Club{i}s", 'locationName': f"City{i}", 'firstYearOfPlay': '1901',
+        'league': {'id': 103, 'name': 'American League', 'link': '/api/v1/league/103'}, 'division': {'id': 200, 'name': 'American League West', 'link': '/api/v1/divisions/200'},
+        'sport': {'id': 1, 'link': '/api/v1/sports/1', 'name': 'Major League Baseball'}, 'shortName': f"City{i}", 'franchiseName': f"City{i}",
+        'clubName': f"Club{i}s", 'active': True,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Record statsapi responses as benchmark fixtures.')
+    parser.add_argument('--small', type=int, help='The gamePk of a short game, e.g. one called for rain.')
+    parser.add_argument('--typical', type=int, help='The gamePk of a nine inning game.')
+    parser.add_argument('--extra-innings', type=int, help='The gamePk of an extra innings game.')
+    parser.add_argument('--season', type=int, help='A season whose full regular season schedule to record.')
+    args = parser.parse_args()
+
+    for name, game_pk in (('feed_small', args.small), ('feed_typical', args.typical), ('feed_extra_innings', args.extra_innings)):
+        if game_pk is not None:
+            record_fixture(name, f"{BASE_URL}/api/v1.1/game/{game_pk}/feed/live")
+
+    if args.season is not None:
+        payload = {'sportId': 1, 'leagueId': 103, 'gameType': 'R', 'hydrate': 'team', 'startDate': f"{args.season}-01-01", 'endDate': f"{args.season}-12-31"}
+        record_fixture(SCHEDULE_FIXTURE, f"{BASE_URL}/api/v1/schedule", payload)
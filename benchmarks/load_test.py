@@ -0,0 +1,210 @@
+# This file load tests the fetch functions of api_methods against the statsapi stand-in (benchmarks/stand_in_server.py),
+# reporting the throughput and the p50/p95/p99 latency of each kind of request under concurrent workers.
+#
+# Run from the repository root, e.g.
+#   python3 -m benchmarks.load_test --workload mixed --concurrency 16 --duration 30 --latency 0.08 --jitter 0.04 --error-rate 0.02
+# which starts a stand-in in this process, or point it at one already running with --url http://127.0.0.1:8060.
+
+import argparse
+import contextlib
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+import numpy as np
+from tabulate import tabulate
+from api_cache import get_cache, set_cache
+from api_methods import fetch_teams, fetch_games, fetch_pitch_details
+from api_transport import get_transport, set_transport
+from instrumentation import Recorder, get_recorder, set_recorder
+from replay import ReplayTransport
+from snapshot import get_snapshot, set_snapshot
+from benchmarks.fixtures import SEASON
+from benchmarks.stand_in_server import add_fault_arguments, server_from_args
+
+# The share of each operation in the mixed workload, roughly what the interactive program sends.
+MIXED_WEIGHTS = {'teams': 1, 'schedule': 3, 'feed': 6}
+PERCENTILES = (50, 95, 99)
+
+
+def build_operations(season, games):
+    """ Build the operations a load test can send.
+
+    Args:
+        season (int): The season every request is for.
+        games (list[Game]): The games whose feeds are requested.
+
+    Returns:
+        dict[str, Callable[[random.Random], bool]]: Each operation by name. Each sends one request with the random
+            generator it is given and returns whether it succeeded.
+    """
+
+    def teams(rng):
+        return fetch_teams(season) is not None
+
+    def schedule(rng):
+        # A random month of the season, so responses vary in size as they do for users.
+        month = rng.randint(4, 9)
+        return fetch_games(f"{season}-{month:02d}-01", f"{season}-{month:02d}-28") is not None
+
+    def feed(rng):
+        return fetch_pitch_details(rng.choice(games)) is not None
+
+    return {'teams': teams, 'schedule': schedule, 'feed': feed}
+
+
+def run_load(operations, weights, concurrency, requests=None, duration=None, seed=None):
+    """ Send operations from concurrent workers until a number of requests or a duration is reached.
+
+    Args:
+        operations (dict[str, Callable[[random.Random], bool]]): See build_operations.
+        weights (dict[str, float]): The share of each operation sent.
+        concurrency (int): Worker threads, each sending one request at a time.
+        requests (int, optional): Stop after this many operations. Defaults to None.
+        duration (float, optional): Stop after this many seconds. Defaults to None.
+        seed (int, optional): Seeds the operations chosen. Defaults to None.
+
+    Returns:
+        tuple[list[tuple[str, float, bool]], float]: The name, latency in seconds and success of every operation,
+            and the seconds the whole test took.
+    """
+
+    names = list(weights)
+    cumulative = list(itertools.accumulate(weights[name] for name in names))
+    sent = itertools.count() # Shared between workers. next() on a count is atomic.
+    samples = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration if duration is not None else None
+
+    def work(index):
+        rng = random.Random(None if seed is None else seed + index)
+        results = []
+        while True:
+            if requests is not None and next(sent) >= requests:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+            name = rng.choices(names, cum_weights=cumulative)[0]
+            start = time.perf_counter()
+            try:
+                ok = operations[name](rng)
+            except Exception:
+                ok = False
+            results.append((name, time.perf_counter() - start, ok))
+
+        with lock:
+            samples.extend(results)
+
+    threads = [threading.Thread(target=work, args=(i,), name=f"load-{i}") for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples, elapsed):
+    """ Summarize the samples of a load test by operation and in total.
+
+    Args:
+        samples (list[tuple[str, float, bool]]): See run_load.
+        elapsed (float): Seconds.
+
+    Returns:
+        list[list]: One row per operation and a total row: name, requests, errors, requests per second, then the
+            latency at each of PERCENTILES in milliseconds.
+    """
+
+    groups = {}
+    for name, latency, ok in samples:
+        groups.setdefault(name, []).append((latency, ok))
+    groups = {name: groups[name] for name in sorted(groups)}
+    groups['total'] = [(latency, ok) for _, latency, ok in samples]
+
+    rows = []
+    for name, group in groups.items():
+        if len(group) == 0:
+            continue
+        latencies = np.array([latency for latency, _ in group]) * 1000
+        errors = sum(1 for _, ok in group if not ok)
+        rows.append([name, len(group), errors, len(group) / elapsed, *np.percentile(latencies, PERCENTILES)])
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the fetch functions against a statsapi stand-in.')
+    parser.add_argument('--url', help='A stand-in already running, e.g. http://127.0.0.1:8060. Defaults to starting one in this process.')
+    parser.add_argument('--workload', choices=[*MIXED_WEIGHTS, 'mixed'], default='mixed', help='The requests sent (default mixed).')
+    parser.add_argument('--concurrency', type=int, default=8, help='Workers sending requests at once (default 8).')
+    parser.add_argument('--requests', type=int, help='Stop after this many requests (default 500 unless --duration is given).')
+    parser.add_argument('--duration', type=float, help='Stop after this many seconds.')
+    parser.add_argument('--season', type=int, default=SEASON, help=f'The season requested (default {SEASON}).')
+    parser.add_argument('--games', type=int, default=50, help='Feeds are requested for this many games of the season (default 50).')
+    parser.add_argument('--max-retries', type=int, default=3, help='Retries of the transport for failed requests (default 3). 0 shows every injected error.')
+    parser.add_argument('--verbose', action='store_true', help='Show what the fetch functions print, e.g. failed requests.')
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    if args.requests is None and args.duration is None:
+        args.requests = 500
+
+    server = None
+    url = args.url
+    if url is None:
+        server = server_from_args(args)
+        url = server.start()
+
+    # Every request must reach the stand-in, on a connection per worker.
+    previous_cache, previous_snapshot, previous_transport, previous_recorder = get_cache(), get_snapshot(), get_transport(), get_recorder()
+    transport = ReplayTransport(url, pool_size=args.concurrency, max_retries=args.max_retries)
+    recorder = Recorder()
+    set_cache(None)
+    set_snapshot(None)
+    set_transport(transport)
+    set_recorder(recorder)
+
+    output = open(os.devnull, 'w') if not args.verbose else sys.stdout
+    try:
+        with contextlib.redirect_stdout(output):
+            games = fetch_games(f"{args.season}-01-01", f"{args.season}-12-31") or []
+        if len(games) == 0:
+            print(f"No games found for {args.season} at {url}.")
+            sys.exit(1)
+
+        rng = random.Random(args.seed)
+        games = rng.sample(games, min(args.games, len(games)))
+        operations = build_operations(args.season, games)
+        weights = MIXED_WEIGHTS if args.workload == 'mixed' else {args.workload: 1}
+
+        # Only count the retries of the test itself.
+        recorder.counters.clear()
+        with contextlib.redirect_stdout(output):
+            samples, elapsed = run_load(operations, weights, args.concurrency, args.requests, args.duration, args.seed)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        transport.close()
+        set_transport(previous_transport)
+        set_cache(previous_cache)
+        set_snapshot(previous_snapshot)
+        set_recorder(previous_recorder)
+        if server is not None:
+            server.stop()
+
+    headers = ['Operation', 'Requests', 'Errors', 'Req/s', *(f"p{p} (ms)" for p in PERCENTILES)]
+    print(tabulate(summarize(samples, elapsed), headers=headers, floatfmt='.1f'))
+    print('')
+    print(f"{len(samples)} requests in {elapsed:.1f}s from {args.concurrency} workers against {url}, "
+          f"{recorder.counters.get('http.retries', 0)} retries.")
+    if server is not None:
+        print(f"Stand-in: {server.stats['recorded']} recorded and {server.stats['generated']} generated responses, "
+              f"{server.stats['errors']} injected errors, {server.stats['bytes'] / 1024 / 1024:.1f} MiB sent.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+# This file defines a local HTTP stand-in for statsapi.mlb.com that serves /api/v1/teams, /api/v1/schedule and game feed
+# links from a fixture store recorded by replay.py, with configurable latency, jitter, errors and bandwidth.
+#
+# Requests that were not recorded are answered with generated responses in the API's layout (see benchmarks/fixtures.py),
+# so the stand-in works with an empty store. Run from the repository root, e.g.
+#   python3 -m benchmarks.stand_in_server --port 8060 --latency 0.08 --jitter 0.04 --error-rate 0.02 --bandwidth 2000000
+# then send requests there with set_transport(ReplayTransport('http://127.0.0.1:8060')).
+
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import threading
+from collections import OrderedDict
+from datetime import date
+from urllib.parse import urlsplit, parse_qsl
+from api_transport import read_request
+from replay import FixtureStore, STORE_PATH
+from benchmarks.fixtures import FEED_PATTERN, generate_feed, generate_schedule, _team
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8060
+ERROR_STATUSES = (429, 500, 502, 503, 504) # Chosen from at random for injected errors.
+WRITE_CHUNK_BYTES = 16 * 1024 # Bodies are sent in chunks of this size when the bandwidth is capped.
+GENERATED_ENTRIES = 128 # Generated responses kept, compressed, so repeated requests are not generated again.
+GENERATED_INNINGS = 9
+MAX_HEADER_LINES = 100
+
+STATUS_TEXT = {200: 'OK', 404: 'Not Found', 405: 'Method Not Allowed', 429: 'Too Many Requests', 500: 'Internal Server Error', 502: 'Bad Gateway', 503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+
+class StandInServer:
+    def __init__(self, store=None, generate=True, latency=0.0, jitter=0.0, error_rate=0.0, bandwidth=None, seed=None, responses=None):
+        """ A class to answer statsapi requests from fixtures, slowed down and failing as configured.
+
+        Args:
+            store (FixtureStore, optional): Recorded responses. Defaults to None, only generated ones.
+            generate (bool, optional): Answer requests that were not recorded with generated responses instead of 404.
+                Defaults to True.
+            latency (float, optional): Seconds before each response starts. Defaults to 0.
+            jitter (float, optional): Up to this many more seconds, at random, before each response. Defaults to 0.
+            error_rate (float, optional): The fraction of requests answered with a status in ERROR_STATUSES. Defaults to 0.
+            bandwidth (float, optional): The most bytes per second sent on each connection. Defaults to None, no cap.
+            seed (int, optional): Seeds the latency and errors, for repeatable runs. Defaults to None.
+            responses (dict[str, dict], optional): JSON served for a path whatever the parameters, ahead of the store,
+                e.g. from benchmarks.fixtures.fixture_responses. Defaults to None.
+        """
+        self.store = store
+        self.responses = {path: gzip.compress(json.dumps(data).encode(), 1) for (path, data) in (responses or {}).items()}
+        self.generate = generate
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bandwidth = bandwidth
+        self.stats = {'requests': 0, 'recorded': 0, 'generated': 0, 'not_found': 0, 'errors': 0, 'bytes': 0}
+        self._random = random.Random(seed)
+        self._generated = OrderedDict() # key: gzipped JSON, least recently used first.
+        self._schedules = {} # The generated schedule of each season.
+        self._server = None
+        self._loop = None
+        self._stopped = None
+        self._thread = None
+
+    def lookup(self, path, params):
+        """ Get the gzipped body of a response.
+
+        Args:
+            path (str): e.g. '/api/v1/schedule'.
+            params (dict[str, str])
+
+        Returns:
+            bytes | None: None if the request was not recorded and cannot be generated.
+        """
+
+        body = self.responses.get(path)
+        if body is not None:
+            self.stats['recorded'] += 1
+            return body
+
+        # Game feeds are the same whatever the parameters, so a full feed answers a request filtered by 'fields'.
+        if self.store is not None:
+            body = self.store.get_compressed(path, params, any_params=FEED_PATTERN.search(path) is not None)
+            if body is not None:
+                self.stats['recorded'] += 1
+                return body
+
+        if not self.generate:
+            return None
+
+        key = (path, tuple(sorted(params.items())))
+        body = self._generated.get(key)
+        if body is None:
+            data = self.generated_json(path, params)
+            if data is None:
+                return None
+            body = gzip.compress(json.dumps(data).encode(), 1)
+            self._generated[key] = body
+            while len(self._generated) > GENERATED_ENTRIES:
+                self._generated.popitem(last=False)
+        self._generated.move_to_end(key)
+        self.stats['generated'] += 1
+        return body
+
+    def generated_json(self, path, params):
+        """ Generate the JSON of a response in the API's layout.
+
+        Args:
+            path (str)
+            params (dict[str, str])
+
+        Returns:
+            dict | None: None if the path is not one the stand-in serves.
+        """
+
+        match = FEED_PATTERN.search(path)
+        if match is not None:
+            return generate_feed(int(match.group(1)), GENERATED_INNINGS)
+
+        if path.endswith('/teams'):
+            return {'copyright': '', 'teams': [_team(i) for i in range(30)]}
+
+        if path.endswith('/schedule'):
+            start_date = params.get('startDate', f"{date.today().year}-01-01")
+            end_date = params.get('endDate', f"{date.today().year}-12-31")
+            team_ids = {params[name] for name in ('teamId', 'opponentId') if name in params}
+
+            dates = []
+            for season in range(int(start_date[:4]), int(end_date[:4]) + 1):
+                if season not in self._schedules:
+                    # A different range of gamePks each season, so games of different seasons are not mistaken for each other.
+                    self._schedules[season] = generate_schedule(season, first_game_pk=season * 10000 + 1)
+                for day in self._schedules[season]['dates']:
+                    if not start_date <= day['date'] <= end_date:
+                        continue
+                    games = day['games']
+                    if len(team_ids) != 0:
+                        games = [game for game in games if team_ids <= {str(game['teams']['home']['team']['id']), str(game['teams']['away']['team']['id'])}]
+                    if len(games) != 0:
+                        dates.append({**day, 'totalItems': len(games), 'totalGames': len(games), 'games': games})
+            return {'copyright': '', 'totalGames': sum(len(day['games']) for day in dates), 'dates': dates}
+
+        return None
+
+    async def handle_connection(self, reader, writer):
+        """ Answer every request on one connection, keeping it open between requests unless the client closes it. """
+
+        try:
+            while True:
+                try:
+                    request = await read_request(reader, MAX_HEADER_LINES)
+                except ValueError:
+                    # The body cannot be skipped without its length, so answer and close the connection.
+                    writer.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, version, headers = request
+
+                self.stats['requests'] += 1
+                delay = self.latency + self._random.uniform(0, self.jitter)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                parts = urlsplit(target)
+                body = None
+                if method != 'GET':
+                    status = 405
+                elif self._random.random() < self.error_rate:
+                    status = self._random.choice(ERROR_STATUSES)
+                    self.stats['errors'] += 1
+                else:
+                    body = self.lookup(parts.path, dict(parse_qsl(parts.query)))
+                    status = 200 if body is not None else 404
+                    if body is None:
+                        self.stats['not_found'] += 1
+
+                # Send the stored gzip as it is when the client accepts it, as the API does.
+                gzipped = body is not None and 'gzip' in headers.get('accept-encoding', '')
+                if body is None:
+                    data = json.dumps({'message': STATUS_TEXT.get(status, '')}).encode()
+                else:
+                    data = body if gzipped else gzip.decompress(body)
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                head = [
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                    'Content-Type: application/json;charset=UTF-8',
+                    f"Content-Length: {len(data)}",
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ]
+                if gzipped:
+                    head.append('Content-Encoding: gzip')
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+                await self._send(writer, data)
+                self.stats['bytes'] += len(data)
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Cancelled when the stand-in stops with the connection still open.
+            pass
+        finally:
+            writer.close()
+
+    async def _send(self, writer, data):
+        """ Send a body, no faster than the bandwidth cap. """
+
+        if self.bandwidth is None:
+            writer.write(data)
+            await writer.drain()
+            return
+
+        for start in range(0, len(data), WRITE_CHUNK_BYTES):
+            chunk = data[start:start + WRITE_CHUNK_BYTES]
+            writer.write(chunk)
+            await writer.drain()
+            await asyncio.sleep(len(chunk) / self.bandwidth)
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """ Serve requests until cancelled. """
+
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serving statsapi stand-in on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    def start(self, host=DEFAULT_HOST, port=0):
+        """ Serve requests on a background thread, e.g. during a load test.
+
+        Args:
+            host (str, optional): Defaults to DEFAULT_HOST.
+            port (int, optional): Defaults to 0, any free port.
+
+        Returns:
+            str: The stand-in's URL, e.g. 'http://127.0.0.1:54321'.
+        """
+
+        started = threading.Event()
+
+        async def run():
+            self._loop = asyncio.get_running_loop()
+            self._stopped = asyncio.Event()
+            self._server = await asyncio.start_server(self.handle_connection, host, port)
+            started.set()
+            async with self._server:
+                await self._stopped.wait()
+
+        # asyncio.run cancels the connections still open once run returns, so none is left pending.
+        self._thread = threading.Thread(target=asyncio.run, args=(run(),), name='stand-in', daemon=True)
+        self._thread.start()
+        started.wait()
+        return f"http://{host}:{self._server.sockets[0].getsockname()[1]}"
+
+    def stop(self):
+        """ Stop serving requests started with start. """
+
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._stopped.set)
+        self._thread.join()
+        self._loop = None
+
+
+def add_fault_arguments(parser):
+    """ Add the options of the stand-in's latency, errors and bandwidth to a parser. """
+
+    parser.add_argument('--store', default=STORE_PATH, help='The fixture directory recorded by replay.py (default benchmarks/fixtures/recorded).')
+    parser.add_argument('--no-generate', action='store_true', help='Answer requests that were not recorded with 404 instead of generating a response.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds before each response starts (default 0).')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many more seconds, at random, before each response (default 0).')
+    parser.add_argument('--error-rate', type=float, default=0.0, help=f"Fraction of requests answered with one of {', '.join(map(str, ERROR_STATUSES))} (default 0).")
+    parser.add_argument('--bandwidth', type=float, help='Most bytes per second sent on each connection (default no cap).')
+    parser.add_argument('--seed', type=int, help='Seed the latency and errors, for repeatable runs.')
+
+
+def server_from_args(args):
+    """ Create a StandInServer from the options of add_fault_arguments. """
+
+    return StandInServer(FixtureStore(args.store), not args.no_generate, args.latency, args.jitter, args.error_rate, args.bandwidth, args.seed)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve recorded or generated statsapi responses locally.')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'(default {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'(default {DEFAULT_PORT})')
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(server_from_args(args).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
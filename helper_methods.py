@@ -1,19 +1,20 @@
 from tabulate import tabulate
 from datetime import datetime
 
-def print_games(games):
+def print_games(games, start=1):
     """ Print a list of Games using tabulate.
 
     Args:
         games (list[Game])
+        start (int, optional): The number of the first game. Defaults to 1.
     """
     
     headers = ['#', 'Date', 'Teams', 'Result']
     
     table_data = []
-    for index, game in enumerate(games):
+    for index, game in enumerate(games, start):
         table_data.append([
-            index + 1,
+            index,
             game.date,
             f"{game.home_team.abbreviation} vs {game.away_team.abbreviation}",
             game.score
@@ -22,31 +23,32 @@ def print_games(games):
     print(tabulate(table_data, headers=headers))
     
 
-def print_pitches(pitches):
+def print_pitches(pitches, start=1):
     """ Print a list of Pitches using tabulate.
 
     Args:
-        pitches (list[Pitch])
+        pitches (list[Pitch] | PitchTable)
+        start (int, optional): The number of the first pitch. Defaults to 1.
     """
     
     headers = ['#','Inn', 'Score', 'Outs', 'Count', 'Type', 'Speed', 'Result', 'Pitcher', 'Batter']
     
     table_data = []
     
-    for index, pitch in enumerate(pitches):
+    for index, pitch in enumerate(pitches, start):
         pitcher_parts = pitch.pitcher_name.split()
         batter_parts = pitch.batter_name.split()
         pitcher_name = f"{pitcher_parts[0][0].upper()}. {' '.join(pitcher_parts[1:])}" if len(pitcher_parts) > 1 else pitch.pitcher_name
         batter_name = f"{batter_parts[0][0].upper()}. {' '.join(batter_parts[1:])}" if len(batter_parts) > 1 else pitch.batter_name
         
         table_data.append([
-            index + 1,
+            index,
             f"{pitch.half_inning.title()[:3]} {pitch.inning}",
             f"{pitch.home_score_before} {pitch.home_abbreviation} {pitch.away_abbreviation} {pitch.away_score_before}",
             f"{pitch.outs_before} Outs",
             f"{pitch.balls_before}-{pitch.strikes_before} Count",
             pitch.pitch_type,
-            f"{round(pitch.pitch_data.get('startSpeed'))} MPH",
+            f"{round(speed) if (speed := pitch.data.get('start_speed')) is not None else '?'} MPH",
             pitch.result,
             f"{pitcher_name} ({pitch.pitcher_hand})",
             f"{batter_name} ({pitch.batter_hand})"
@@ -70,3 +72,97 @@ def str_to_datetime(date_str):
         return date_obj
     except ValueError:
         return None
+
+
+def build_pitch_args(pitch):
+    """ Build the command line args for the Unity simulation from a pitch.
+
+    Args:
+        pitch (Pitch | PitchRow)
+
+    Returns:
+        dict[str, str]: The args in the order the simulation expects them.
+    """
+    
+    # Get the arguments to call the command line. These are named as a precaution for bugs.
+    # The fields were extracted when the feed was parsed. Missing ones are None.
+    p_data = pitch.data
+    
+    # Coordinate axis origin is back of home plate.
+    pitch_args = {
+        'strikeZoneTop': p_data.get('strike_zone_top'), # Top of strike zone in ft from z=0 (ground)
+        'strikeZoneBot': p_data.get('strike_zone_bottom'), # Bottom of strike zone ft from z=0 (ground)
+        'aX50': p_data.get('aX'), # Acceleration in X direction at 'y50' in ft/s^2, we assume this to be constant for the pitch.
+        'aY50': p_data.get('aY'), # Acceleration in Y direction at 'y50' in ft/s^2, we assume this to be constant for the pitch.
+        'aZ50': p_data.get('aZ'), # Acceleration in Z direction at 'y50' in ft/s^2
+        'vX50': p_data.get('vX0'), # Velocity in X direction at 'y50' in ft/s
+        'vY50': p_data.get('vY0'), # Velocity in Y direction at 'y50' in ft/s
+        'vZ50': p_data.get('vZ0'), # Velocity in Z direction at 'y50' in ft/s
+        'x50': p_data.get('x0'), # X coordinates at 'y50' in ft
+        'y50': p_data.get('y0'), # Y coordinates, taken as close to 50 ft from the back of home plate as possible
+        'z50': p_data.get('z0'), # Z coordinates at 'y50' in ft
+        'x0': p_data.get('pX'), # X coordinates at y=1.417 in ft
+        'z0': p_data.get('pZ'), # X coordinates at =1.417 in ft            
+        'spinDirection': p_data.get('spin_direction'), # The angle the ball is spinning.
+        'extension': p_data.get('extension'), # Assumed to mean the distance the pitcher is from the rubber (y=60.5) when the ball is thrown in ft.
+    }
+    
+    # Convert all args to strings.
+    return {key:str(value) for (key,value) in pitch_args.items()}
+
+
+class LazyList:
+    def __init__(self, iterable):
+        """ A class to read items from an iterator only as far as they are needed, keeping the ones already read.
+
+        Args:
+            iterable (Iterable): e.g. the generator of iter_games or iter_pitch_details.
+        """
+        self.items = []
+        self.exhausted = False
+        self._iterator = iter(iterable)
+
+    def load(self, count):
+        """ Read from the iterator until count items are loaded or it runs out.
+
+        Args:
+            count (int)
+
+        Returns:
+            int: The number of items loaded.
+        """
+
+        while not self.exhausted and len(self.items) < count:
+            try:
+                self.items.append(next(self._iterator))
+            except StopIteration:
+                self.exhausted = True
+        return len(self.items)
+
+    def page(self, number, size):
+        """ Get one page of items, loading only as far as the end of the page plus one item to tell if there is another page.
+
+        Args:
+            number (int): Counted from 1.
+            size (int): Items per page.
+
+        Returns:
+            list
+        """
+
+        start = (number - 1) * size
+        self.load(start + size + 1)
+        return self.items[start:start + size]
+
+    def has_page(self, number, size):
+        """ Check whether a page has any items, loading as far as its first item.
+
+        Args:
+            number (int): Counted from 1.
+            size (int): Items per page.
+
+        Returns:
+            bool
+        """
+
+        return number >= 1 and self.load((number - 1) * size + 1) > (number - 1) * size
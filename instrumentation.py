@@ -0,0 +1,222 @@
+# This file defines timing spans and counters for the hot paths of the program, and sinks that export them.
+#
+# Nothing is recorded until a Recorder is installed with set_recorder, so span and count cost almost nothing otherwise.
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from tabulate import tabulate
+
+METRIC_PREFIX = 'pitch_simulation_' # Prepended to every Prometheus metric name.
+
+
+class Recorder:
+    def __init__(self, sinks=()):
+        """ A class to collect spans (named, timed sections of work) and counters, and hand each one to its sinks.
+
+        Args:
+            sinks (Iterable[JsonLinesSink | PrometheusSink], optional): Defaults to none.
+        """
+        self.sinks = list(sinks)
+        self.durations = {} # The duration in seconds of every span, by span name.
+        self.totals = {} # The sum of every numeric attribute of the spans, by span name then attribute.
+        self.counters = {}
+
+        # Spans are recorded from the worker threads of the bulk fetchers.
+        self._lock = threading.Lock()
+
+    def record_span(self, name, duration, attributes):
+        """ Record a finished span.
+
+        Args:
+            name (str): e.g. 'http.request'.
+            duration (float): Seconds.
+            attributes (dict): e.g. {'status': 200, 'bytes': 5120}. Numeric ones are summed in the summary.
+        """
+
+        with self._lock:
+            self.durations.setdefault(name, []).append(duration)
+            totals = self.totals.setdefault(name, {})
+            for key, value in attributes.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    totals[key] = totals.get(key, 0) + value
+
+        event = {'type': 'span', 'name': name, 'time': time.time(), 'duration': duration, **attributes}
+        for sink in self.sinks:
+            sink.emit(event)
+
+    def count(self, name, value=1):
+        """ Add to a counter.
+
+        Args:
+            name (str): e.g. 'cache.hits'.
+            value (int, optional): Defaults to 1.
+        """
+
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+        event = {'type': 'counter', 'name': name, 'time': time.time(), 'value': value}
+        for sink in self.sinks:
+            sink.emit(event)
+
+    def print_summary(self):
+        """ Print the count, total, mean, 95th percentile and max of each span, its summed attributes, and the counters. """
+
+        headers = ['Span', 'Count', 'Total (ms)', 'Mean (ms)', 'P95 (ms)', 'Max (ms)', 'Totals']
+        rows = []
+        with self._lock:
+            for name in sorted(self.durations):
+                durations = sorted(self.durations[name])
+                totals = ', '.join(f"{key} {value:g}" for (key, value) in self.totals[name].items())
+                rows.append([
+                    name,
+                    len(durations),
+                    sum(durations) * 1000,
+                    sum(durations) / len(durations) * 1000,
+                    durations[min(len(durations) - 1, int(0.95 * len(durations)))] * 1000,
+                    durations[-1] * 1000,
+                    totals,
+                ])
+            counters = sorted(self.counters.items())
+
+        print(tabulate(rows, headers=headers, floatfmt='.2f'))
+        if len(counters) != 0:
+            print('')
+            print(tabulate(counters, headers=['Counter', 'Value']))
+
+    def close(self):
+        """ Flush and close every sink. """
+
+        for sink in self.sinks:
+            sink.close(self)
+
+
+class JsonLinesSink:
+    def __init__(self, path):
+        """ A sink that appends every span and counter to a file as one JSON object per line.
+
+        Args:
+            path (str)
+        """
+        self.path = path
+        self._file = open(path, 'a')
+        self._lock = threading.Lock()
+
+    def emit(self, event):
+        line = json.dumps(event, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self, recorder):
+        with self._lock:
+            self._file.close()
+
+
+class PrometheusSink:
+    def __init__(self, path):
+        """ A sink that writes the totals of a Recorder in the Prometheus text format when it is closed,
+        e.g. for the node_exporter textfile collector.
+
+        Args:
+            path (str)
+        """
+        self.path = path
+
+    def emit(self, event):
+        # Only the totals are exported, once the Recorder is closed.
+        pass
+
+    def close(self, recorder):
+        lines = []
+        with recorder._lock:
+            for name in sorted(recorder.durations):
+                metric = _metric_name(name)
+                lines.append(f"# TYPE {metric}_seconds summary")
+                lines.append(f"{metric}_seconds_count {len(recorder.durations[name])}")
+                lines.append(f"{metric}_seconds_sum {sum(recorder.durations[name]):.6f}")
+                for key, value in recorder.totals[name].items():
+                    lines.append(f"# TYPE {metric}_{_metric_name(key, '')}_total counter")
+                    lines.append(f"{metric}_{_metric_name(key, '')}_total {value:g}")
+
+            for name, value in sorted(recorder.counters.items()):
+                lines.append(f"# TYPE {_metric_name(name)}_total counter")
+                lines.append(f"{_metric_name(name)}_total {value:g}")
+
+        with open(self.path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+def _metric_name(name, prefix=METRIC_PREFIX):
+    """ Convert a span, counter or attribute name to a Prometheus metric name, e.g. 'cache.hits' to 'pitch_simulation_cache_hits'. """
+
+    return prefix + ''.join(character if character.isalnum() else '_' for character in name)
+
+
+# The Recorder spans and counters go to. None means nothing is recorded.
+_recorder = None
+
+
+def get_recorder():
+    """ Get the installed Recorder.
+
+    Returns:
+        Recorder | None
+    """
+
+    return _recorder
+
+
+def set_recorder(recorder):
+    """ Install a Recorder, or None to stop recording.
+
+    Args:
+        recorder (Recorder | None)
+    """
+
+    global _recorder
+
+    _recorder = recorder
+
+
+@contextmanager
+def span(name, **attributes):
+    """ Time a block of work as a span. The block can add attributes to the dict it is given.
+
+    Args:
+        name (str): e.g. 'json.decode'.
+        **attributes: e.g. url='...'.
+
+    Yields:
+        dict: The span's attributes, e.g. to set attributes['bytes'] once the response arrives.
+
+    Example:
+        with span('http.request', url=url) as attributes:
+            r = session.get(url)
+            attributes['status'] = r.status_code
+    """
+
+    recorder = _recorder
+    if recorder is None:
+        yield attributes
+        return
+
+    start = time.perf_counter()
+    try:
+        yield attributes
+    finally:
+        recorder.record_span(name, time.perf_counter() - start, attributes)
+
+
+def count(name, value=1):
+    """ Add to a counter of the installed Recorder, if any.
+
+    Args:
+        name (str): e.g. 'cache.hits'.
+        value (int, optional): Defaults to 1.
+    """
+
+    recorder = _recorder
+    if recorder is not None:
+        recorder.count(name, value)
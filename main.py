@@ -1,5 +1,8 @@
-from api_methods import fetch_team_by_name, fetch_games, fetch_pitch_details
-from helper_methods import print_games, print_pitches, str_to_datetime
+from api_methods import fetch_team_by_name, iter_games, iter_pitch_details, get_team_registry
+from helper_methods import LazyList, build_pitch_args, print_games, print_pitches, str_to_datetime
+from instrumentation import Recorder, JsonLinesSink, PrometheusSink, set_recorder, span
+from prefetch import FeedPrefetcher
+import argparse
 import subprocess
 import time
 
@@ -8,7 +11,8 @@ IS_WINDOWS = False # Set to True if running on Windows, False if Mac.
 MIN_START_DATE = '2015-01-01'
 DEF_START_DATE = '2023-01-01' # Default start date.
 MAX_END_DATE = '2023-12-31'
-MAX_GAMES_TO_SHOW = 100
+GAMES_PER_PAGE = 25
+PITCHES_PER_PAGE = 30
 
 
 def prompt_for_start_date():
@@ -39,7 +43,7 @@ def prompt_for_start_date():
     return DEF_START_DATE
 
 def prompt_for_end_date(start_date):
-    """ Prompt user for the end date between start_date and DEFAULT_END_DATE
+    """ Prompt user for the end date between start_date and MAX_END_DATE. The range may cover several seasons.
 
     Args:
         start_date (str): The start date the user previously entered.
@@ -51,23 +55,28 @@ def prompt_for_end_date(start_date):
     # Convert the start date to datetime.
     start_date_obj = str_to_datetime(start_date)
     
-    # Set the maximum end date as December 31 of the year of the start date.
-    max_end = f"{start_date_obj.year}-12-31"
+    # Set the default end date as December 31 of the year of the start date.
+    def_end = f"{start_date_obj.year}-12-31"
     
     # Prompt the user.
-    end_date = input(f"Enter the end date between {start_date} and {max_end} in the form YYYY-MM-DD (default {max_end}): ")
+    end_date = input(f"Enter the end date between {start_date} and {MAX_END_DATE} in the form YYYY or YYYY-MM-DD (default {def_end}): ")
     
     # Try conveting the user's string to a datetime.
     end_date_obj = str_to_datetime(end_date)
     
+    # If the conversion failed, assume the user entered YYYY. Try converting again.
+    if end_date_obj is None:
+        end_date += "-12-31"
+        end_date_obj = str_to_datetime(end_date)
+    
     # If the conversion is successful and the end date is in the valid range, return the string the user entered.
-    if end_date_obj is not None and str_to_datetime(start_date) <= end_date_obj <= str_to_datetime(max_end):
+    if end_date_obj is not None and str_to_datetime(start_date) <= end_date_obj <= str_to_datetime(MAX_END_DATE):
         print(f"Set end date to {end_date}.")
         return end_date
     
-    # Otherwise, return the calculted max end date.
-    print(f"Set end date to default of {max_end}.")
-    return max_end
+    # Otherwise, return the default end date.
+    print(f"Set end date to default of {def_end}.")
+    return def_end
         
 
 def prompt_for_team(season=None):
@@ -77,22 +86,25 @@ def prompt_for_team(season=None):
         season (str, optional) : The current season as YYYY. Defaults to None.
 
     Returns:
-        Team | None: The Team or None if team user entered is not found.
+        Team | None: The Team or None if no team is entered.
     """
         
     # Prompt user for team.
-    team_name = input("Enter a team name, e.g. 'Oakland Athletics' or 'Oakland' or 'Athletics' (default all teams): ")
-    
-    # If no team entered, return None.
-    if team_name == '':
-        print("No team entered. Will show games with all teams.")
-        return None
+    team_name = input("Enter a team name, e.g. 'Oakland Athletics' or 'Oakland' or 'Athletics' or 'OAK' (default all teams): ")
     
-    # Get the team by name.
-    team = fetch_team_by_name(team_name, season)
-    if team is None:
-        print("Team not found. Will show games with all teams.")
-        return None
+    # Prompt again until the name fits one team.
+    while True:
+        # If no team entered, return None.
+        if team_name.strip() == '':
+            print("No team entered. Will show games with all teams.")
+            return None
+        
+        # Get the team by name.
+        team = fetch_team_by_name(team_name, season)
+        if team is not None:
+            break
+        
+        team_name = input(f"{team_not_found_message(team_name, season)} Enter a team name (default all teams): ")
     
     # If the team is found, return it.
     print(f"Set team to {team}.")
@@ -107,7 +119,7 @@ def prompt_for_opponent(team, season=None):
         season (str, optional): The season in YYYY. Defaults to None.
         
     Returns:
-        str | None : The opponent's id or None if not found or no original team is entered.
+        Team | None : The opponent or None if no opponent or no original team is entered.
     """
     
     # If no original team is entered, do not prompt for an opponent.
@@ -117,109 +129,187 @@ def prompt_for_opponent(team, season=None):
     # Prompt the user.
     opp_name = input("Enter an opposing team's name (default all teams): ")
     
-    # If no opponent entered, return None.
-    if opp_name == '':
-        print("No opponent entered. Will show games against all opponents.")
-        return None
+    # Prompt again until the name fits one team other than the original team.
+    while True:
+        # If no opponent entered, return None.
+        if opp_name.strip() == '':
+            print("No opponent entered. Will show games against all opponents.")
+            return None
 
-    # Get the oppoennt by name.
-    opponent = fetch_team_by_name(opp_name, season)
-    if opponent is None:
-        print("Team not found. Will show games against all opponents.")
-        return None
-    
-    # Validate the opponent is not the same as the team entered.
-    if opponent.id == team.id:
-        print("Cannot set opponent to self. Will show games against all opponents.")
-        return None
+        # Get the opponent by name.
+        opponent = fetch_team_by_name(opp_name, season)
+        if opponent is None:
+            opp_name = input(f"{team_not_found_message(opp_name, season)} Enter an opposing team's name (default all teams): ")
+            continue
+        
+        # Validate the opponent is not the same as the team entered.
+        if opponent.id == team.id:
+            opp_name = input("Cannot set opponent to self. Enter an opposing team's name (default all teams): ")
+            continue
+        
+        break
     
     # Return the opponent.
     print(f"Set opponent to {opponent.abbreviation} - {opponent.name}.")
     return opponent
     
 
-def prompt_for_game(games):
-    """ Prompt user to choose a game out of a list of games.
+def team_not_found_message(name, season=None):
+    """ Explain that a name did not fit one team, listing the teams it might refer to.
+
+    Args:
+        name (str): The name the user entered.
+        season (str, optional): The season in YYYY. Defaults to None.
+
+    Returns:
+        str
+    """
+    
+    suggestions = get_team_registry(season).suggest(name)
+    if len(suggestions) == 0:
+        return f"No team found for '{name}'."
+    return f"'{name}' could be {', '.join(str(team) for team in suggestions)}."
+    
+
+def prompt_for_game(games, prefetcher=None):
+    """ Prompt user to choose a game, one page of games at a time.
 
     Args:
-        games (list[Game])
+        games (Iterable[Game] | LazyList): e.g. the generator of iter_games. Games are only read as far as the pages
+            shown. Pass a LazyList to prompt again from the games already read.
+        prefetcher (FeedPrefetcher, optional): Prefetches the likely picks of each page while the user reads it.
+            Defaults to None.
 
     Returns:
         Game | None: The game selected or None if no games are entered.
     """
         
-    if games is None or len(games) == 0:
+    if games is None:
         return None
     
-    total_games_found = len(games)
-
-    # Calculate how many games to show.
-    games_showing = MAX_GAMES_TO_SHOW if total_games_found > MAX_GAMES_TO_SHOW else total_games_found
-    
-    print(f"Showing {games_showing} of {total_games_found} games found...")
-    print('')
-    print_games(games[:games_showing])
-    print('')
-    
-    # Prompt user.
-    try:
-        game_index = int(input(f"Enter a game number between 1 and {games_showing} (default 1): "))
-    except ValueError:
-        game_index = -1
-        
-    # Select game if valid, otherwise default of game #1.
-    if 1 <= game_index <= games_showing:
-        game = games[game_index - 1]
-        print(f"Selected game number {game_index}.")
-    else:
-        game = games[0]
-        print(f"Selected default game number 1.")
-    
-    return game
+    on_page = prefetcher.prefetch if prefetcher is not None else None
+    games = games if isinstance(games, LazyList) else LazyList(games)
+    return prompt_for_item(games, 'game', 'games', GAMES_PER_PAGE, print_games, on_page)
         
     
-def prompt_for_pitch(game):
-    """ Prompt user to choose a pitch from a game.
+def prompt_for_pitch(game, prefetcher=None):
+    """ Prompt user to choose a pitch from a game, one page of pitches at a time.
 
     Args:
         game (Game)
+        prefetcher (FeedPrefetcher, optional): The prefetcher passed to prompt_for_game. Defaults to None.
 
     Returns:
-        Pitch | None: The pitch selected or None if invalid args.
+        Pitch | None: The pitch selected, or None if the game has no pitches the simulation can draw or the feed
+            could not be downloaded.
     """
     
     print('')
     
-    pitches = fetch_pitch_details(game)
-    
-    if pitches is None or len(pitches) == 0:
-        return None
-    
-    pitches_len = len(pitches)
+    # Use the pitches prefetched while the user chose the game, if any, and cancel the other prefetches.
+    pitches = prefetcher.take(game) if prefetcher is not None else None
     
-    print(f"Showing all {pitches_len} pitches found...")
-    print('')
-    print_pitches(pitches)
-    print('')
+    # Only offer pitches the simulation can draw.
+    if pitches is None:
+        pitches = iter_pitch_details(game, drop_incomplete=True)
+    pitch = prompt_for_item(LazyList(pitches), 'pitch', 'pitches', PITCHES_PER_PAGE, print_pitches)
     
-    # Prompt user.
-    try:
-        pitch_index = int(input(f"Enter a pitch number between 1 and {pitches_len} (default 1): "))
-    except ValueError:
-        pitch_index = -1
-        
-    # Select pitch if valid, otherwise default of pitch #1.
-    if 1 <= pitch_index <= pitches_len:
-        pitch = pitches[pitch_index - 1]
-        print(f"Selected pitch number {pitch_index}-", end='')
-    else:
-        pitch = pitches[0]
-        print(f"Selected default pitch number 1-",end='')
+    if pitch is None:
+        return None
         
-    pitch_info = f" {pitch.pitch_type} | {round(pitch.pitch_data.get('startSpeed'))} MPH | {pitch.result}"
+    speed = pitch.data.get('start_speed')
+    pitch_info = f" {pitch.pitch_type} | {round(speed) if speed is not None else '?'} MPH | {pitch.result}"
     print(pitch_info)
         
     return pitch
+
+
+def prompt_for_item(items, noun, plural, page_size, print_page, on_page=None):
+    """ Show a page of items and prompt user to choose one, or to move to the next, previous or any page.
+
+    Only the items up to the end of the page shown are read, so the first page appears as soon as its items arrive.
+
+    Args:
+        items (LazyList)
+        noun (str): What an item is, e.g. 'game'.
+        plural (str): e.g. 'games'.
+        page_size (int)
+        print_page (Callable[[list, int], None]): Prints a page of items given the number of the first one, e.g. print_games.
+        on_page (Callable[[list], None], optional): Called with each page shown, before waiting for input. Defaults to None.
+
+    Returns:
+        Any | None: The item selected or None if there are no items.
+    """
+    
+    if not items.has_page(1, page_size):
+        return None
+    
+    page_number = 1
+    while True:
+        page = items.page(page_number, page_size)
+        first = (page_number - 1) * page_size + 1
+        last = first + len(page) - 1
+        
+        # The total is only known once every item is read.
+        total = f"{len(items.items)}" if items.exhausted else f"{len(items.items) - 1}+"
+        has_next = items.has_page(page_number + 1, page_size)
+        
+        print(f"Showing {plural} {first}-{last} of {total} found (page {page_number})...")
+        print('')
+        print_page(page, first)
+        print('')
+        
+        # Start any work on the page while the user reads it.
+        if on_page is not None:
+            on_page(page)
+        
+        # Prompt user.
+        commands = [f"a {noun} number between {first} and {last}"]
+        if has_next:
+            commands.append("'n' for the next page")
+        if page_number > 1:
+            commands.append("'p' for the previous page")
+        commands.append("'j' and a page number to jump to it")
+        user_input = input(f"Enter {', '.join(commands)} (default {first}): ").strip().lower()
+        
+        # Move between pages.
+        if user_input == 'n' and has_next:
+            page_number += 1
+            print('')
+            continue
+        if user_input == 'p' and page_number > 1:
+            page_number -= 1
+            print('')
+            continue
+        if user_input.startswith('j'):
+            try:
+                jump_to = int(user_input[1:])
+            except ValueError:
+                jump_to = 0
+            
+            # Past the last page, show the last page.
+            if jump_to >= 1 and not items.has_page(jump_to, page_size):
+                jump_to = max(1, (len(items.items) + page_size - 1) // page_size)
+                print(f"There are only {jump_to} pages.")
+            if jump_to >= 1:
+                page_number = jump_to
+            else:
+                print("Invalid page number.")
+            print('')
+            continue
+        
+        # Select item if valid, otherwise default of the first item on the page.
+        try:
+            item_number = int(user_input)
+        except ValueError:
+            item_number = -1
+        
+        if first <= item_number <= last:
+            print(f"Selected {noun} number {item_number}.")
+            return items.items[item_number - 1]
+        
+        print(f"Selected default {noun} number {first}.")
+        return page[0]
     
     
 def display_title():
@@ -232,10 +322,10 @@ def display_title():
     print("Current bugs: 1. Not finding as much game data as expected.")
     print('')
     print('Steps:')
-    print("   1. Select a range of dates for games you would like to search for. All the games must be from the same season.")
+    print("   1. Select a range of dates for games you would like to search for. The range may span several seasons.")
     print("   2. Select 0-2 teams you would like to search for games with.")
-    print(f"   3. Select a game from the first {MAX_GAMES_TO_SHOW} games found by the search.")
-    print("   4. Select a pitch from the game to simulate.")
+    print(f"   3. Select a game found by the search, browsing {GAMES_PER_PAGE} games at a time.")
+    print(f"   4. Select a pitch from the game to simulate, browsing {PITCHES_PER_PAGE} pitches at a time.")
     print("If you leave any prompt blank or enter an invalid option, the default will be selected.")
     print('')
     input('Press ENTER to begin ')
@@ -267,7 +357,9 @@ def run_on_windows(args):
     """
         
     try:
-        subprocess.run(["WindowsBuild\Pitch.exe", *args.values()])
+        # The span lasts until the simulation is closed, since subprocess.run waits for it.
+        with span('simulator.run', platform='windows'):
+            subprocess.run(["WindowsBuild\Pitch.exe", *args.values()])
     except (FileNotFoundError, TypeError) as e:
         print(f"Simulation failed to run on Windows: {e}")
         return
@@ -285,7 +377,8 @@ def run_on_mac(args):
     # Use devnull to capture unwanted console output.
     with open('/dev/null', 'w') as devnull:
         try:
-            subprocess.run(["MacBuild/Pitch.app/Contents/MacOS/Pitch", *args.values()], stdout=devnull, stderr=devnull)
+            with span('simulator.run', platform='mac'):
+                subprocess.run(["MacBuild/Pitch.app/Contents/MacOS/Pitch", *args.values()], stdout=devnull, stderr=devnull)
         except (FileNotFoundError, TypeError) as e:
             print(f"Simulation failed to run on Mac: {e}")
             return
@@ -293,8 +386,50 @@ def run_on_mac(args):
             print("Simulation ran on Mac successfully!")
         
 
+def parse_args():
+    """ Parse the command line options.
+
+    Returns:
+        argparse.Namespace
+    """
+    
+    parser = argparse.ArgumentParser(description="Simulate any MLB pitch.")
+    parser.add_argument('--profile', action='store_true', help='Print the time spent in requests, parsing and the simulation on exit.')
+    parser.add_argument('--metrics', help='Also write the spans and counters to this file.')
+    parser.add_argument('--metrics-format', choices=['jsonl', 'prometheus'], default='jsonl', help='jsonl writes every span as it ends, prometheus writes totals on exit (default jsonl).')
+    parser.add_argument('--no-prefetch', action='store_true', help='Do not download the feeds of likely games while a game is being chosen.')
+    return parser.parse_args()
+
+
+def start_recorder(args):
+    """ Install a Recorder if --profile or --metrics was passed.
+
+    Args:
+        args (argparse.Namespace): The result of parse_args.
+
+    Returns:
+        Recorder | None
+    """
+    
+    if not args.profile and args.metrics is None:
+        return None
+    
+    sinks = []
+    if args.metrics is not None:
+        sinks.append(JsonLinesSink(args.metrics) if args.metrics_format == 'jsonl' else PrometheusSink(args.metrics))
+    
+    recorder = Recorder(sinks)
+    set_recorder(recorder)
+    return recorder
+
     
 if __name__ == '__main__':
+    args = parse_args()
+    recorder = start_recorder(args)
+    
+    # Downloads the feeds of likely games while the user reads the table of games.
+    prefetcher = FeedPrefetcher() if not args.no_prefetch else None
+    
     display_title()
     
     while True:
@@ -321,50 +456,37 @@ if __name__ == '__main__':
         team_id = team.id if team is not None else None
         opponent_id = opponent.id if opponent is not None else None
         
-        # Get a list of games based on the user's preferences.
-        games = fetch_games(start_date, end_date, team_id, opponent_id)
+        # Get the games based on the user's preferences. They are fetched as the pages are shown, and kept so the
+        # user can choose again without downloading them again.
+        games = LazyList(iter_games(start_date, end_date, team_id, opponent_id))
         
-        if games is None:
+        while True:
+            # Prompt user for game.
+            game = prompt_for_game(games, prefetcher)
+            print('')
+            
+            if game is None:
+                break
+            
+            # Prompt user for pitch.
+            pitch = prompt_for_pitch(game, prefetcher)
+            print('')
+            
+            # Every pitch may be missing data the simulation needs, or the feed may have failed to download.
+            if pitch is not None:
+                break
+            print('No pitches the simulation can draw were found for this game. Choose another game.')
+            print('')
+        
+        if game is None:
             print('No games found!')
             if prompt_for_rerun():
                 continue
             else:
                 break
-        
-        # Prompt user for game.
-        game = prompt_for_game(games)
-        print('')
-
-        # Prompt user for pitch.
-        pitch = prompt_for_pitch(game)
-        print('')
     
-        # Get the arguments to call the command line. These are named as a precaution for bugs.
-        p_data = pitch.pitch_data
-        p_data_coords = pitch.pitch_data.get('coordinates')
-        p_data_breaks = pitch.pitch_data.get('breaks')
-        
-        # Coordinate axis origin is back of home plate.
-        pitch_args = {
-            'strikeZoneTop': p_data.get('strikeZoneTop'), # Top of strike zone in ft from z=0 (ground)
-            'strikeZoneBot': p_data.get('strikeZoneBottom'), # Bottom of strike zone ft from z=0 (ground)
-            'aX50': p_data_coords.get('aX'), # Acceleration in X direction at 'y50' in ft/s^2, we assume this to be constant for the pitch.
-            'aY50': p_data_coords.get('aY'), # Acceleration in Y direction at 'y50' in ft/s^2, we assume this to be constant for the pitch.
-            'aZ50': p_data_coords.get('aZ'), # Acceleration in Z direction at 'y50' in ft/s^2
-            'vX50': p_data_coords.get('vX0'), # Velocity in X direction at 'y50' in ft/s
-            'vY50': p_data_coords.get('vY0'), # Velocity in Y direction at 'y50' in ft/s
-            'vZ50': p_data_coords.get('vZ0'), # Velocity in Z direction at 'y50' in ft/s
-            'x50': p_data_coords.get('x0'), # X coordinates at 'y50' in ft
-            'y50': p_data_coords.get('y0'), # Y coordinates, taken as close to 50 ft from the back of home plate as possible
-            'z50': p_data_coords.get('z0'), # Z coordinates at 'y50' in ft
-            'x0': p_data_coords.get('pX'), # X coordinates at y=1.417 in ft
-            'z0': p_data_coords.get('pZ'), # X coordinates at =1.417 in ft            
-            'spinDirection': p_data_breaks.get('spinDirection'), # The angle the ball is spinning.
-            'extension': p_data.get('extension'), # Assumed to mean the distance the pitcher is from the rubber (y=60.5) when the ball is thrown in ft.
-        }
-        
-        # Convert all args to strings.
-        pitch_args = {key:str(value) for (key,value) in pitch_args.items()}
+        # Get the arguments to call the command line.
+        pitch_args = build_pitch_args(pitch)
         
         # Run the program.
         print("Running the simulation...")
@@ -383,6 +505,15 @@ if __name__ == '__main__':
         else:
             break
     
+    if prefetcher is not None:
+        prefetcher.close()
+    
     print('')
     print('Program exit successful.')
-    
\ No newline at end of file
+    
+    # Print and export what was recorded.
+    if recorder is not None:
+        if args.profile:
+            print('')
+            recorder.print_summary()
+        recorder.close()
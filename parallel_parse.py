@@ -0,0 +1,203 @@
+# This file defines a backend for fetch_pitch_details_bulk that decodes and parses game feeds in worker processes, for
+# building the pitches of whole seasons without being held to one core.
+#
+# Threads download the raw feeds. Each feed's bytes are handed to a process pool, where a worker decodes the JSON, runs
+# the same parser as fetch_pitch_details(as_table=True), and writes the flattened rows into a shared memory block it
+# creates. Only the block's name, the row count and the category lists come back through the pool, never the Pitches.
+
+import json
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from api_cache import get_cache
+from api_methods import _iter_pitches, _game_feed_ttl, MAX_CONCURRENT_FEEDS, MAX_REQUESTS_PER_SECOND
+from api_transport import get_transport, HostRateLimiter, BASE_URL
+from instrumentation import span, count
+from pitch_table import PitchTable, FLOAT_COLUMNS, INT_COLUMNS, CATEGORICAL_COLUMNS
+
+# One flattened pitch, with every PitchTable column at the dtype PitchTable uses.
+ROW_DTYPE = np.dtype(
+    [(name, '<f8') for name in FLOAT_COLUMNS]
+    + [(name, '<i2') for name in INT_COLUMNS]
+    + [(name, '<i4') for name in CATEGORICAL_COLUMNS]
+)
+
+# What a worker hands back for a feed: the shared memory block holding its rows, and the categories of its codes.
+ParsedFeed = namedtuple('ParsedFeed', ['block', 'rows', 'categories'])
+
+
+def fetch_feed_body(game, rate_limiter=None, refresh=False):
+    """ Get the raw JSON of a game's feed, from the response cache or with a GET request.
+
+    Args:
+        game (Game)
+        rate_limiter (HostRateLimiter, optional): Wait for it before sending the request. Defaults to None.
+        refresh (bool, optional): Ignore any stored response. Defaults to False.
+
+    Returns:
+        tuple[bytes | None, bool]: The JSON text, or None if the request failed, and whether it came from the cache.
+    """
+
+    url = BASE_URL + game.link
+
+    # Return the stored response if there is one.
+    cache = get_cache()
+    if cache is not None and not refresh:
+        with span('cache.read'):
+            body = cache.get_raw(url)
+        if body is not None:
+            count('cache.hits')
+            return body, True
+        count('cache.misses')
+
+    r = get_transport().get(url, rate_limiter=rate_limiter)
+
+    if r is None:
+        count('http.failures')
+        return None, False
+
+    if r.status_code != 200:
+        count('http.failures')
+        print(f"Request failed with status code {r.status_code} for {url}")
+        return None, False
+
+    return r.content, False
+
+
+def parse_feed(body, game):
+    """ Decode and parse a feed in a worker process, writing its pitches to a new shared memory block.
+
+    The caller must attach to the block and unlink it, e.g. with attach_rows.
+
+    Args:
+        body (bytes): The feed's JSON text.
+        game (Game)
+
+    Returns:
+        tuple[ParsedFeed | None, float | None]: The parsed feed, or None if it has no list of plays, and the seconds
+            the response may be cached for, as fetch_pitch_details would store it. A feed without pitches has no
+            block and 0 rows.
+    """
+
+    data = json.loads(body)
+    ttl = _game_feed_ttl(data)
+
+    try:
+        plays = data.get('liveData').get('plays').get('allPlays')
+    except AttributeError:
+        print("Error: list of plays in game not found!")
+        return None, ttl
+
+    # The serial parser, so the rows match fetch_pitch_details(as_table=True) exactly.
+    table = PitchTable.from_pitches(_iter_pitches(plays, game))
+    if len(table) == 0:
+        return ParsedFeed(None, 0, table.categories), ttl
+
+    block = SharedMemory(create=True, size=len(table) * ROW_DTYPE.itemsize)
+    try:
+        rows = np.ndarray(len(table), dtype=ROW_DTYPE, buffer=block.buf)
+        for name, values in table.columns.items():
+            rows[name] = values
+        del rows # The block cannot be closed while a view of it exists.
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+
+    block.close()
+    return ParsedFeed(block.name, len(table), table.categories), ttl
+
+
+def attach_rows(parsed):
+    """ Copy the rows a worker wrote into a PitchTable and free its shared memory block.
+
+    Args:
+        parsed (ParsedFeed)
+
+    Returns:
+        PitchTable
+    """
+
+    if parsed.block is None:
+        return PitchTable({name: np.zeros(0, dtype=ROW_DTYPE[name]) for name in ROW_DTYPE.names}, parsed.categories)
+
+    block = SharedMemory(name=parsed.block)
+    try:
+        rows = np.ndarray(parsed.rows, dtype=ROW_DTYPE, buffer=block.buf)
+        columns = {name: rows[name].copy() for name in ROW_DTYPE.names}
+        del rows
+    finally:
+        block.close()
+        block.unlink()
+
+    return PitchTable(columns, parsed.categories)
+
+
+def _fetch_and_parse(game, pool, downloads, rate_limiter, refresh, keep_empty=False):
+    """ Download one feed on a thread, parse it in the pool, and store the response once its TTL is known.
+
+    Args:
+        downloads (threading.Semaphore): Held while the feed downloads, so at most its value download at once.
+
+    Returns:
+        PitchTable | None: None if the feed failed, or has no pitches and keep_empty is False.
+    """
+
+    with downloads:
+        body, cached = fetch_feed_body(game, rate_limiter, refresh)
+    if body is None:
+        return None
+
+    with span('parse.process', bytes=len(body)) as attributes:
+        parsed, ttl = pool.submit(parse_feed, body, game).result()
+        table = attach_rows(parsed) if parsed is not None else None
+        attributes['pitches'] = len(table) if table is not None else 0
+
+    # Store the response as fetch_pitch_details would, without decoding it in this process.
+    cache = get_cache()
+    if cache is not None and not cached:
+        cache.put_raw(BASE_URL + game.link, None, body, ttl)
+
+    return table if table is None or len(table) != 0 or keep_empty else None
+
+
+def fetch_pitch_tables_parallel(games, processes=None, max_workers=MAX_CONCURRENT_FEEDS, requests_per_second=MAX_REQUESTS_PER_SECOND, refresh=False, keep_empty=False):
+    """ Get the pitches of many Games as PitchTables, downloading feeds on threads and parsing them in processes.
+
+    Args:
+        games (list[Game]): e.g. the result of fetch_games.
+        processes (int, optional): Worker processes. Defaults to None, one per CPU.
+        max_workers (int, optional): The most feeds downloaded at once. Defaults to MAX_CONCURRENT_FEEDS.
+        requests_per_second (float | None, optional): The most requests sent to each host per second, or None for
+            no limit. Defaults to MAX_REQUESTS_PER_SECOND.
+        refresh (bool, optional): Download every feed even if it is cached. Defaults to False.
+        keep_empty (bool, optional): Hand back an empty PitchTable for a feed without pitches. Defaults to False.
+
+    Yields:
+        tuple[Game, PitchTable | None]: Each Game with the result of fetch_pitch_details(game, as_table=True), in
+            order of completion.
+    """
+
+    processes = processes or os.cpu_count() or 1
+    rate_limiter = HostRateLimiter(requests_per_second) if requests_per_second is not None else None
+
+    # Workers are spawned rather than forked, since the download threads may hold locks at the time of a fork.
+    pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+
+    # Each thread waits on the pool while its feed is parsed, so there are enough to keep every process busy. The
+    # semaphore keeps the downloads themselves to max_workers.
+    threads = ThreadPoolExecutor(max_workers=max_workers + processes)
+    downloads = threading.Semaphore(max_workers)
+    try:
+        futures = {threads.submit(_fetch_and_parse, game, pool, downloads, rate_limiter, refresh, keep_empty): game for game in games}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # If the caller stops early, do not start the remaining downloads. Wait for the ones already running, so they
+        # can still be parsed, cached and have their shared memory freed before the pool shuts down.
+        threads.shutdown(wait=True, cancel_futures=True)
+        pool.shutdown(wait=True, cancel_futures=True)
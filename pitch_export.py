@@ -0,0 +1,365 @@
+# This file exports every pitch in a date range to CSV or Arrow IPC, streaming game by game so memory stays flat however
+# long the range is, and resuming from the last completed game if a run is interrupted.
+#
+# Run from the repository root, e.g.
+#   python3 pitch_export.py 2015-01-01 2023-12-31 pitches.csv
+#   python3 pitch_export.py 2021-04-01 2021-10-03 pitches.arrows --team Athletics
+#   python3 pitch_export.py 2015-01-01 2023-12-31 pitches.csv --resume
+#
+# Arrow IPC needs pyarrow. The file is in the streaming format, e.g. pyarrow.ipc.open_stream('pitches.arrows').read_all().
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import numpy as np
+from api_classes import NO_PITCH_STATUSES
+from api_methods import fetch_pitch_details, fetch_team_by_name, iter_game_tables, iter_range_games, MAX_CONCURRENT_FEEDS
+from instrumentation import span
+from pitch_table import FLOAT_COLUMNS, INT_COLUMNS, CATEGORICAL_COLUMNS
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+CHUNK_ROWS = 16384 # Pitches buffered before they are written as one chunk. The progress file is saved after each one.
+FORMATS = ('csv', 'arrow')
+ARROW_EXTENSIONS = ('.arrow', '.arrows', '.ipc')
+
+# Every column of the export, in order. Pitches are identified by game_pk and pitch_index, their position in
+# fetch_pitch_details for the game.
+GAME_COLUMNS = ('game_pk', 'date', 'pitch_index')
+EXPORT_COLUMNS = (*GAME_COLUMNS, *CATEGORICAL_COLUMNS, *INT_COLUMNS, *FLOAT_COLUMNS)
+
+# The end of an Arrow IPC stream.
+ARROW_END_OF_STREAM = b'\xff\xff\xff\xff\x00\x00\x00\x00'
+
+
+def flatten(game, table):
+    """ Convert a game's PitchTable to export columns.
+
+    Args:
+        game (Game)
+        table (PitchTable)
+
+    Returns:
+        dict[str, np.ndarray]: Every column in EXPORT_COLUMNS. Categorical columns are decoded to strings, with None
+            where missing. Integer columns keep -1 and float columns keep NaN where missing.
+    """
+
+    columns = {
+        'game_pk': np.full(len(table), game.game_pk or 0, dtype=np.int64),
+        'date': np.full(len(table), game.date, dtype=object),
+        'pitch_index': np.arange(len(table), dtype=np.int32),
+    }
+    for name in CATEGORICAL_COLUMNS:
+        columns[name] = table.column(name)
+    for name in (*INT_COLUMNS, *FLOAT_COLUMNS):
+        columns[name] = table.columns[name]
+    return columns
+
+
+class CsvChunkWriter:
+    def __init__(self, path, offset=None):
+        """ A class to write chunks of export columns as CSV rows. Missing values are empty fields.
+
+        Args:
+            path (str)
+            offset (int, optional): Keep the first offset bytes of an existing file and append after them, e.g. to
+                resume. Defaults to None, meaning start a new file with a header.
+        """
+        self._file = open(path, 'wb' if offset is None else 'r+b')
+        if offset is not None:
+            self._file.truncate(offset)
+            self._file.seek(offset)
+
+        self._text = io.TextIOWrapper(self._file, encoding='utf-8', newline='')
+        self._csv = csv.writer(self._text)
+        if offset is None:
+            self._csv.writerow(EXPORT_COLUMNS)
+
+    def write(self, columns):
+        """ Write a chunk.
+
+        Args:
+            columns (dict[str, np.ndarray]): As returned by flatten.
+        """
+
+        values = []
+        for name in EXPORT_COLUMNS:
+            column = columns[name]
+            if name in INT_COLUMNS:
+                values.append([value if value != -1 else None for value in column.tolist()])
+            elif name in FLOAT_COLUMNS:
+                values.append([value if value == value else None for value in column.tolist()]) # NaN != NaN.
+            else:
+                values.append(column.tolist())
+        self._csv.writerows(zip(*values))
+
+    def flush(self):
+        """ Write everything buffered to disk.
+
+        Returns:
+            int: The size of the file, to resume from.
+        """
+
+        self._text.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        self._text.close()
+
+
+class ArrowChunkWriter:
+    def __init__(self, path, offset=None):
+        """ A class to write chunks of export columns as record batches of an Arrow IPC stream.
+
+        Messages are written one at a time rather than through pyarrow's stream writer, so an unfinished stream can
+        be resumed after its last complete batch.
+
+        Args:
+            path (str)
+            offset (int, optional): Keep the first offset bytes of an existing stream, ending after a complete batch,
+                and append after them. Defaults to None, meaning start a new stream.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+        """
+        if pa is None:
+            raise ImportError('Arrow IPC export needs pyarrow. Install it with: pip install pyarrow')
+
+        self.schema = pa.schema(
+            [('game_pk', pa.int64()), ('date', pa.string()), ('pitch_index', pa.int32())]
+            + [(name, pa.string()) for name in CATEGORICAL_COLUMNS]
+            + [(name, pa.int16()) for name in INT_COLUMNS]
+            + [(name, pa.float64()) for name in FLOAT_COLUMNS]
+        )
+
+        self._file = open(path, 'wb' if offset is None else 'r+b')
+        if offset is not None:
+            self._file.truncate(offset)
+            self._file.seek(offset)
+        else:
+            self._file.write(self.schema.serialize().to_pybytes())
+
+    def write(self, columns):
+        """ Write a chunk as one record batch.
+
+        Args:
+            columns (dict[str, np.ndarray]): As returned by flatten.
+        """
+
+        arrays = []
+        for field in self.schema:
+            column = columns[field.name]
+            if field.name in INT_COLUMNS:
+                arrays.append(pa.array(column, type=field.type, mask=column == -1))
+            elif field.name in FLOAT_COLUMNS:
+                arrays.append(pa.array(column, type=field.type, mask=np.isnan(column)))
+            else:
+                arrays.append(pa.array(column, type=field.type))
+
+        batch = pa.record_batch(arrays, schema=self.schema)
+        self._file.write(batch.serialize().to_pybytes())
+
+    def flush(self):
+        """ Write everything buffered to disk.
+
+        Returns:
+            int: The size of the file, to resume from.
+        """
+
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        self._file.write(ARROW_END_OF_STREAM)
+        self._file.close()
+
+
+def progress_path(path):
+    """ Get the path of the progress file of an export. """
+
+    return path + '.progress'
+
+
+def _read_progress(path, query):
+    """ Read the progress of an earlier run of the same export.
+
+    Args:
+        path (str): The export's path.
+        query (dict): The export's dates, teams and format.
+
+    Returns:
+        dict | None: None if there is no progress to resume.
+
+    Raises:
+        ValueError: If the earlier run was of a different export.
+    """
+
+    if not os.path.exists(progress_path(path)) or not os.path.exists(path):
+        return None
+
+    with open(progress_path(path)) as f:
+        progress = json.load(f)
+
+    if progress.get('query') != query:
+        raise ValueError(f"{path} was started with {progress.get('query')}, not {query}")
+    return progress
+
+
+def _write_progress(path, progress):
+    """ Save the progress of an export, replacing the old file only once the new one is complete. """
+
+    temporary_path = progress_path(path) + '.tmp'
+    with open(temporary_path, 'w') as f:
+        json.dump(progress, f)
+    os.replace(temporary_path, progress_path(path))
+
+
+def export_pitches(path, start_date, end_date, team_id=None, opponent_id=None, output_format='csv', resume=False, chunk_rows=CHUNK_ROWS, max_workers=MAX_CONCURRENT_FEEDS):
+    """ Export every pitch in the games of a date range, in date order, one chunk at a time.
+
+    Memory holds at most max_workers feeds, one chunk of rows and one season's schedule, however long the range is.
+    After each chunk the number of games written and the size of the file are saved to a progress file next to it,
+    which is removed once the export completes.
+
+    Args:
+        path (str)
+        start_date (str): In the form YYYY-MM-DD.
+        end_date (str): In the form YYYY-MM-DD.
+        team_id (str, optional): Defaults to None.
+        opponent_id (str, optional): Defaults to None.
+        output_format (str, optional): 'csv' or 'arrow'. Defaults to 'csv'.
+        resume (bool, optional): Continue after the last chunk an earlier run of the same export saved, instead of
+            starting again. Defaults to False.
+        chunk_rows (int, optional): Defaults to CHUNK_ROWS.
+        max_workers (int, optional): The most feeds downloaded at once. Defaults to MAX_CONCURRENT_FEEDS.
+
+    The export stops at a game whose feed cannot be downloaded, after writing and saving the progress of every game
+    before it, so running again with resume=True starts from that game.
+
+    Returns:
+        tuple[int, int] | None: The number of pitches and games written, including those of the earlier run, or None
+            if the export cannot resume or stopped at a game that failed.
+    """
+
+    query = {'start_date': start_date, 'end_date': end_date, 'team_id': team_id, 'opponent_id': opponent_id, 'format': output_format}
+
+    progress = None
+    if resume:
+        try:
+            progress = _read_progress(path, query)
+        except ValueError as e:
+            print(f"Cannot resume: {e}")
+            return None
+    if progress is None:
+        # Forget any earlier run, since its file is about to be replaced.
+        if os.path.exists(progress_path(path)):
+            os.remove(progress_path(path))
+        progress = {'query': query, 'games': 0, 'rows': 0, 'bytes': None, 'last_game': None}
+    else:
+        print(f"Resuming after {progress['games']} games and {progress['rows']} pitches.")
+
+    writer_class = ArrowChunkWriter if output_format == 'arrow' else CsvChunkWriter
+    writer = writer_class(path, progress['bytes'])
+
+    games = iter_range_games(start_date, end_date, team_id, opponent_id)
+
+    # Skip the games written by the earlier run, checking the schedule still lists them in the same order.
+    skipped = None
+    for _ in range(progress['games']):
+        skipped = next(games, None)
+    if progress['games'] != 0 and (skipped is None or skipped.link != progress['last_game']):
+        writer.close()
+        print(f"Cannot resume: the schedule no longer matches the first {progress['games']} games written.")
+        return None
+
+    chunk = []
+    chunk_size = 0
+    games_in_chunk = 0
+    last_game = progress['last_game']
+
+    def write_chunk():
+        with span('export.chunk', rows=chunk_size, games=games_in_chunk):
+            if chunk_size != 0:
+                writer.write({name: np.concatenate([columns[name] for columns in chunk]) for name in EXPORT_COLUMNS})
+            progress['bytes'] = writer.flush()
+
+        # Saved only once the chunk is on disk, so a resumed run never skips a game that was not written.
+        progress['games'] += games_in_chunk
+        progress['rows'] += chunk_size
+        progress['last_game'] = last_game
+        _write_progress(path, progress)
+
+    failed = None
+    try:
+        for game, table in iter_game_tables(games, max_workers):
+            # The feed could not be downloaded. Unless the game was not played, try once more, then stop before the
+            # game so it is not recorded as written. A feed without pitches did not fail and is written as no rows.
+            if table is None and not (game.status or '').startswith(NO_PITCH_STATUSES):
+                table = fetch_pitch_details(game, as_table=True, refresh=True, keep_empty=True)
+                if table is None:
+                    failed = game
+                    break
+
+            if table is not None and len(table) != 0:
+                chunk.append(flatten(game, table))
+                chunk_size += len(table)
+            games_in_chunk += 1
+            last_game = game.link
+
+            # Chunks end between games, so a resumed run starts at the beginning of a game.
+            if chunk_size >= chunk_rows:
+                write_chunk()
+                chunk, chunk_size, games_in_chunk = [], 0, 0
+
+        write_chunk()
+    finally:
+        writer.close()
+
+    if failed is not None:
+        print(f"Stopped at {failed.date} {failed.away_team.abbreviation} @ {failed.home_team.abbreviation} ({failed.link}): its feed could not be downloaded.")
+        print(f"Wrote {progress['rows']} pitches from {progress['games']} games. Run again with --resume to retry from that game.")
+        return None
+
+    # The export is complete, so there is nothing to resume.
+    os.remove(progress_path(path))
+    return progress['rows'], progress['games']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export every pitch in a date range to CSV or Arrow IPC.')
+    parser.add_argument('start_date', help='YYYY-MM-DD')
+    parser.add_argument('end_date', help='YYYY-MM-DD')
+    parser.add_argument('output', help='The file to write.')
+    parser.add_argument('--format', choices=FORMATS, help=f"csv or arrow (default arrow if the file ends in {', '.join(ARROW_EXTENSIONS)}, else csv).")
+    parser.add_argument('--team', help='Only games with this team.')
+    parser.add_argument('--opponent', help='Only games against this team. Requires --team.')
+    parser.add_argument('--resume', action='store_true', help='Continue an interrupted export of the same range instead of starting again.')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help=f'Pitches written per chunk (default {CHUNK_ROWS}).')
+    parser.add_argument('--workers', type=int, default=MAX_CONCURRENT_FEEDS, help=f'Game feeds downloaded at once (default {MAX_CONCURRENT_FEEDS}).')
+    args = parser.parse_args()
+
+    if args.opponent and not args.team:
+        parser.error('--opponent requires --team')
+
+    output_format = args.format or ('arrow' if args.output.endswith(ARROW_EXTENSIONS) else 'csv')
+    if output_format == 'arrow' and pa is None:
+        parser.error('Arrow IPC export needs pyarrow. Install it with: pip install pyarrow')
+
+    season = args.start_date[:4]
+    team = fetch_team_by_name(args.team, season) if args.team else None
+    opponent = fetch_team_by_name(args.opponent, season) if args.opponent else None
+    if (args.team and team is None) or (args.opponent and opponent is None):
+        parser.error('team not found')
+
+    result = export_pitches(args.output, args.start_date, args.end_date, team.id if team else None, opponent.id if opponent else None, output_format, args.resume, args.chunk_rows, args.workers)
+    if result is None:
+        sys.exit(1)
+    print(f"Wrote {result[0]} pitches from {result[1]} games to {args.output}.")
@@ -0,0 +1,232 @@
+# This file defines a batch trajectory integrator that models drag and the Magnus effect from each pitch's spin.
+#
+# Instead of fitting a constant acceleration to the plate location, every pitch is advanced from its measured state at
+# y=50 ft with a 4th order Runge-Kutta method, using the spin rate and spin direction in pitchData to compute the lift
+# on the ball. All pitches advance together as NumPy arrays, each with its own adaptive step size.
+
+import numpy as np
+from pitch_solver import pitch_arrays, PLATE_Y
+
+MOUND_Y = 60.5 # The front of the pitcher's rubber in ft from the back of home plate.
+GRAVITY = -32.174 # ft/s^2.
+
+# Ball and air properties. Drag and lift follow Alan Nathan's baseball trajectory model.
+BALL_RADIUS = 0.1208 # ft, a 9.11 in circumference.
+BALL_MASS = 0.3203 # lb, 5.125 oz.
+AIR_DENSITY = 0.0740 # lb/ft^3, sea level at 70 F.
+DRAG_COEFFICIENT = 0.35
+
+# The coordinates the integrator reads from each pitch.
+INTEGRATOR_COLUMNS = ('x0', 'y0', 'z0', 'vX0', 'vY0', 'vZ0', 'pX', 'pZ', 'spin_rate', 'spin_direction', 'extension')
+
+
+class TrajectoryResult:
+    def __init__(self, states, time, steps):
+        """ A class to store where many pitches ended up, one row per pitch.
+
+        Args:
+            states (np.ndarray): Shape (n, 6) of x, y, z in ft and vX, vY, vZ in ft/s at the target y.
+            time (np.ndarray): Seconds taken to reach the target y, negative when integrated backwards.
+            steps (np.ndarray): The accepted steps for each pitch.
+        """
+        self.states = states
+        self.time = time
+        self.steps = steps
+
+    @property
+    def x(self):
+        """ np.ndarray: The x coordinate in ft at the target y. """
+
+        return self.states[:, 0]
+
+    @property
+    def z(self):
+        """ np.ndarray: The z coordinate in ft at the target y. """
+
+        return self.states[:, 2]
+
+    def __len__(self):
+        return len(self.time)
+
+
+def initial_states(c):
+    """ Stack the state of each pitch at y=50 ft.
+
+    Args:
+        c (dict[str, np.ndarray]): The result of pitch_arrays.
+
+    Returns:
+        np.ndarray: Shape (n, 6) of x, y, z, vX, vY, vZ.
+    """
+
+    return np.stack([c['x0'], c['y0'], c['z0'], c['vX0'], c['vY0'], c['vZ0']], axis=1)
+
+
+def spin_axes(spin_rate, spin_direction):
+    """ Get the angular velocity of each pitch, assuming all of the spin is transverse (no gyro spin).
+
+    spinDirection is measured from the catcher's view with 180 degrees as pure backspin, which lifts the ball, and
+    90 degrees moving the ball towards positive x.
+
+    Args:
+        spin_rate (np.ndarray): rpm.
+        spin_direction (np.ndarray): Degrees.
+
+    Returns:
+        np.ndarray: Shape (n, 3) in rad/s.
+    """
+
+    omega = spin_rate * 2 * np.pi / 60
+    theta = np.radians(spin_direction)
+
+    # For a ball moving in -y, (cos θ, 0, sin θ) x (0, -1, 0) = (sin θ, 0, -cos θ) is the direction of the lift.
+    return np.stack([omega * np.cos(theta), np.zeros_like(omega), omega * np.sin(theta)], axis=1)
+
+
+def accelerations(states, spin, drag_coefficient=DRAG_COEFFICIENT, air_density=AIR_DENSITY):
+    """ Get the acceleration of each pitch from gravity, drag and the Magnus effect.
+
+    Args:
+        states (np.ndarray): Shape (n, 6).
+        spin (np.ndarray): Shape (n, 3), the result of spin_axes.
+        drag_coefficient (float, optional): Defaults to DRAG_COEFFICIENT.
+        air_density (float, optional): Defaults to AIR_DENSITY.
+
+    Returns:
+        np.ndarray: Shape (n, 3) in ft/s^2.
+    """
+
+    k = air_density * np.pi * BALL_RADIUS ** 2 / (2 * BALL_MASS)
+    v = states[:, 3:6]
+    speed = np.linalg.norm(v, axis=1, keepdims=True)
+    omega = np.linalg.norm(spin, axis=1, keepdims=True)
+
+    # Lift coefficient from the spin factor S = r ω / v.
+    with np.errstate(invalid='ignore', divide='ignore'):
+        s = BALL_RADIUS * omega / speed
+        lift_coefficient = np.where(s > 0, 1 / (2.32 + 0.4 / s), 0.0)
+        spin_unit = np.where(omega > 0, spin / omega, 0.0)
+
+    # Drag opposes the velocity. Lift is along ω x v, which already scales with the speed.
+    a = -k * drag_coefficient * speed * v
+    a += k * lift_coefficient * speed * np.cross(spin_unit, v)
+    a[:, 2] += GRAVITY
+    return a
+
+
+def integrate_to_y(states, spin, target_y, step=0.01, tolerance=1e-7, y_tolerance=1e-7, max_steps=10000, drag_coefficient=DRAG_COEFFICIENT, air_density=AIR_DENSITY):
+    """ Advance every pitch until it reaches target_y, forwards or backwards in time.
+
+    Each pitch has its own step size, chosen by comparing one RK4 step with two half steps. Steps are shortened so a
+    pitch never passes target_y, and each pitch stops as soon as it is within y_tolerance of it.
+
+    Args:
+        states (np.ndarray): Shape (n, 6), the result of initial_states.
+        spin (np.ndarray): Shape (n, 3), the result of spin_axes.
+        target_y (float | np.ndarray): The y in ft to stop at, e.g. PLATE_Y.
+        step (float, optional): The first step size in seconds. Defaults to 0.01.
+        tolerance (float, optional): The largest position error in ft allowed per step. Defaults to 1e-7.
+        y_tolerance (float, optional): How close to target_y in ft a pitch must get. Defaults to 1e-7.
+        max_steps (int, optional): Give up on pitches that have not arrived after this many steps. Defaults to 10000.
+        drag_coefficient (float, optional): Defaults to DRAG_COEFFICIENT.
+        air_density (float, optional): Defaults to AIR_DENSITY.
+
+    Returns:
+        TrajectoryResult: NaN for pitches with missing data or that never reach target_y.
+    """
+
+    states = np.array(states, dtype=np.float64)
+    n = len(states)
+    target_y = np.broadcast_to(np.asarray(target_y, dtype=np.float64), (n,))
+    time = np.zeros(n)
+    steps = np.zeros(n, dtype=np.int32)
+    h = np.full(n, abs(step))
+
+    def f(s, w):
+        return np.concatenate([s[:, 3:6], accelerations(s, w, drag_coefficient, air_density)], axis=1)
+
+    def rk4(s, w, dt):
+        dt = dt[:, None]
+        k1 = f(s, w)
+        k2 = f(s + 0.5 * dt * k1, w)
+        k3 = f(s + 0.5 * dt * k2, w)
+        k4 = f(s + dt * k3, w)
+        return s + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+    valid = np.isfinite(states).all(axis=1) & np.isfinite(spin).all(axis=1) & np.isfinite(target_y)
+    active = valid & (np.abs(states[:, 1] - target_y) > y_tolerance)
+
+    for _ in range(max_steps):
+        index = np.flatnonzero(active)
+        if len(index) == 0:
+            break
+
+        s = states[index]
+        w = spin[index]
+
+        # The time to target_y at the current y velocity. Its sign picks the direction to integrate in.
+        with np.errstate(invalid='ignore', divide='ignore'):
+            time_to_target = (target_y[index] - s[:, 1]) / s[:, 4]
+        stalled = ~(np.isfinite(time_to_target) & (time_to_target != 0))
+        dt = np.sign(time_to_target) * np.minimum(h[index], np.abs(time_to_target))
+        dt[stalled] = 0
+
+        # Compare a full step with two half steps to estimate the error.
+        full = rk4(s, w, dt)
+        half = rk4(rk4(s, w, dt / 2), w, dt / 2)
+        error = np.max(np.abs(half[:, 0:3] - full[:, 0:3]), axis=1) / 15
+
+        # Accept steps within tolerance, using Richardson extrapolation of the two results.
+        accept = (error <= tolerance) & ~stalled
+        accepted = index[accept]
+        states[accepted] = half[accept] + (half[accept] - full[accept]) / 15
+        time[accepted] += dt[accept]
+        steps[accepted] += 1
+
+        # Grow or shrink each step size towards the tolerance.
+        with np.errstate(divide='ignore'):
+            scale = np.clip(0.9 * (tolerance / error) ** 0.2, 0.2, 5.0)
+        h[index] = np.abs(dt) * np.where(error > 0, scale, 5.0)
+        h[index[stalled]] = 0
+
+        # Stop pitches that have arrived, or that cannot arrive because they stopped moving in y.
+        active[index[stalled]] = False
+        valid[index[stalled]] = False
+        active[accepted] = np.abs(states[accepted, 1] - target_y[accepted]) > y_tolerance
+
+    # Pitches still going after max_steps did not arrive.
+    valid &= ~active
+    states[~valid] = np.nan
+    time[~valid] = np.nan
+    return TrajectoryResult(states, time, steps)
+
+
+def simulate_pitches(pitches, plate_y=PLATE_Y, **kwargs):
+    """ Integrate many pitches from their measured state at y=50 ft to the plate.
+
+    Args:
+        pitches (list[Pitch] | PitchTable | dict[str, np.ndarray]): A dict must hold every name in INTEGRATOR_COLUMNS.
+        plate_y (float, optional): Defaults to PLATE_Y.
+        **kwargs: Passed to integrate_to_y.
+
+    Returns:
+        TrajectoryResult: The state of each pitch at the plate.
+    """
+
+    c = pitches if isinstance(pitches, dict) else pitch_arrays(pitches, INTEGRATOR_COLUMNS)
+    return integrate_to_y(initial_states(c), spin_axes(c['spin_rate'], c['spin_direction']), plate_y, **kwargs)
+
+
+def release_states(pitches, **kwargs):
+    """ Integrate many pitches backwards from y=50 ft to where they were released, MOUND_Y minus their extension.
+
+    Args:
+        pitches (list[Pitch] | PitchTable | dict[str, np.ndarray]): A dict must hold every name in INTEGRATOR_COLUMNS.
+        **kwargs: Passed to integrate_to_y.
+
+    Returns:
+        TrajectoryResult: The state of each pitch at release. time is negative.
+    """
+
+    c = pitches if isinstance(pitches, dict) else pitch_arrays(pitches, INTEGRATOR_COLUMNS)
+    return integrate_to_y(initial_states(c), spin_axes(c['spin_rate'], c['spin_direction']), MOUND_Y - c['extension'], **kwargs)
@@ -0,0 +1,153 @@
+# This file defines an in-memory index for finding pitches by several criteria at once without scanning every pitch.
+
+import numpy as np
+from pitch_table import PitchTable, CATEGORICAL_COLUMNS, INT_COLUMNS
+
+# Fields indexed when a PitchIndex is built. Any other column is indexed the first time it is searched.
+INDEXED_FIELDS = (*CATEGORICAL_COLUMNS, 'balls_before', 'strikes_before', 'outs_before', 'inning', 'start_speed', 'pX', 'pZ')
+
+
+class PitchIndex:
+    def __init__(self, pitches):
+        """ A class to find pitches by their categorical fields and by ranges of their numeric fields.
+
+        Every field is kept as a sorted copy of its values with the row of each one. For a categorical field, the
+        rows of each value form a contiguous slice (an inverted index); for a numeric field, the rows in a range do.
+        A search takes the smallest slice among its criteria and checks the remaining criteria against only those rows.
+
+        Args:
+            pitches (list[Pitch] | PitchTable): e.g. every pitch loaded for a season.
+        """
+        self.pitches = pitches
+        self.table = pitches if isinstance(pitches, PitchTable) else PitchTable.from_pitches(pitches)
+        self._sorted = {}
+        for name in INDEXED_FIELDS:
+            self._index(name)
+
+    def search(self, **criteria):
+        """ Get the rows of the pitches that match every criterion.
+
+        Each keyword is a column of PitchTable, e.g. pitch_type, pitcher_name, pitcher_hand, strikes_before, inning,
+        start_speed, pX or pZ. A value is matched by:
+            str or number: Equality. Text fields must match exactly, e.g. 'Changeup' or 'L'.
+            list or set: Any of the values, e.g. ['Slider', 'Sweeper'] or {0, 1}.
+            tuple (low, high): For numeric fields, low <= value <= high. Either end may be None to leave it open.
+                Pitches missing the field never match a range.
+
+        Args:
+            **criteria
+
+        Returns:
+            np.ndarray: The matching rows in ascending order.
+
+        Example:
+            index.search(strikes_before=2, pitch_type='Changeup', start_speed=(88, None), pitcher_hand='L')
+        """
+
+        if len(criteria) == 0:
+            return np.arange(len(self.table))
+
+        # Turn each criterion into the slice of rows the sorted index gives for it.
+        candidates = []
+        for name, value in criteria.items():
+            if name not in self.table.columns:
+                raise ValueError(f"Cannot search unknown field '{name}'")
+            candidates.append((name, self._rows(name, value)))
+
+        # Start from the fewest rows, then filter them by the other criteria directly.
+        candidates.sort(key=lambda candidate: len(candidate[1]))
+        rows = np.sort(candidates[0][1])
+        for name, _ in candidates[1:]:
+            if len(rows) == 0:
+                break
+            rows = rows[self._matches(name, criteria[name], rows)]
+        return rows
+
+    def find(self, **criteria):
+        """ Get the pitches that match every criterion. See search.
+
+        Returns:
+            list[Pitch | PitchRow]: The original Pitches if the index was built from a list, otherwise PitchRows.
+        """
+
+        rows = self.search(**criteria)
+        if isinstance(self.pitches, PitchTable):
+            return [self.table[int(row)] for row in rows]
+        return [self.pitches[row] for row in rows]
+
+    def count(self, **criteria):
+        """ Get the number of pitches that match every criterion. See search. """
+
+        return len(self.search(**criteria))
+
+    def __len__(self):
+        return len(self.table)
+
+    def _index(self, name):
+        """ Sort a column once, keeping the row of each value. Equal values keep their row order. """
+
+        if name not in self._sorted:
+            values = self.table.columns[name]
+            order = np.argsort(values, kind='stable')
+            self._sorted[name] = (values[order], order)
+        return self._sorted[name]
+
+    def _bounds(self, name, value):
+        """ Get the ranges of stored values a criterion accepts.
+
+        Returns:
+            list[tuple[float, float]]: Inclusive (low, high) ranges of the stored values, codes for text fields.
+        """
+
+        if isinstance(value, tuple) and name not in self.table.categories:
+            low, high = value
+            low = -np.inf if low is None else low
+            high = np.inf if high is None else high
+
+            # Integer columns store a missing value as -1, so leave it out of the range. NaN is outside every range.
+            if name in INT_COLUMNS and low <= -1 <= high:
+                return [(low, high) for (low, high) in ((low, -2), (0, high)) if low <= high]
+            return [(low, high)]
+
+        values = value if isinstance(value, (list, set, tuple, frozenset)) else [value]
+        bounds = []
+        for item in values:
+            stored = self._encode(name, item)
+            if stored is not None:
+                bounds.append((stored, stored))
+
+        # Drop repeated values so their rows are not returned twice.
+        return list(dict.fromkeys(bounds))
+
+    def _encode(self, name, value):
+        """ Get the stored form of a value: its code for a text field, the value itself otherwise. None if absent. """
+
+        if name in self.table.categories:
+            try:
+                return self.table.categories[name].index(value)
+            except ValueError:
+                return None
+        return value
+
+    def _rows(self, name, value):
+        """ Get the rows matching one criterion from the sorted index. """
+
+        sorted_values, order = self._index(name)
+        parts = []
+        for low, high in self._bounds(name, value):
+            start = np.searchsorted(sorted_values, low, side='left')
+            stop = np.searchsorted(sorted_values, high, side='right')
+            parts.append(order[start:stop])
+
+        if len(parts) == 0:
+            return np.zeros(0, dtype=np.intp)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _matches(self, name, value, rows):
+        """ Get a mask of which of rows match one criterion, reading the column directly. """
+
+        values = self.table.columns[name][rows]
+        mask = np.zeros(len(rows), dtype=bool)
+        for low, high in self._bounds(name, value):
+            mask |= (values >= low) & (values <= high)
+        return mask
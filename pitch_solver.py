@@ -0,0 +1,150 @@
+# This file defines a vectorized solver for the corrected, constant accelerations that carry each pitch to its real plate location.
+#
+# The API gives each pitch's position, velocity and acceleration at y=50 ft, and where it crossed the plate (pX, pZ).
+# Under constant acceleration the ball reaches the plate at a time fixed by the y components alone, so the x and z
+# accelerations that land exactly on (pX, pZ) can be solved for directly instead of iterated towards.
+
+import numpy as np
+from pitch_table import PitchTable, FLOAT_COLUMNS
+
+PLATE_Y = 1.417 # The front of home plate in ft from the back of home plate.
+MAX_ITERATIONS = 500 # The number of corrections made by the simulation before it launches.
+
+# The coordinates the solver reads from each pitch.
+SOLVER_COLUMNS = ('x0', 'y0', 'z0', 'vX0', 'vY0', 'vZ0', 'aX', 'aY', 'aZ', 'pX', 'pZ')
+
+
+class SolverResult:
+    def __init__(self, aX, aY, aZ, plate_time, residual_x, residual_z, iterations):
+        """ A class to store the corrected accelerations of many pitches, one array element per pitch.
+
+        Args:
+            aX, aY, aZ (np.ndarray): The corrected accelerations in ft/s^2. aY is unchanged.
+            plate_time (np.ndarray): Seconds from y=50 ft until the ball reaches PLATE_Y.
+            residual_x, residual_z (np.ndarray): The simulated minus the real plate location in ft.
+            iterations (np.ndarray): The corrections made for each pitch, 0 for the closed-form solution.
+        """
+        self.aX = aX
+        self.aY = aY
+        self.aZ = aZ
+        self.plate_time = plate_time
+        self.residual_x = residual_x
+        self.residual_z = residual_z
+        self.iterations = iterations
+
+    @property
+    def residual(self):
+        """ np.ndarray: The distance between the simulated and the real plate location in ft. """
+
+        return np.hypot(self.residual_x, self.residual_z)
+
+    def __len__(self):
+        return len(self.aX)
+
+
+def pitch_arrays(pitches, names=SOLVER_COLUMNS):
+    """ Get the coordinates of many pitches as one array per field.
+
+    Args:
+        pitches (list[Pitch] | PitchTable)
+        names (tuple[str], optional): Column names from FLOAT_COLUMNS. Defaults to SOLVER_COLUMNS.
+
+    Returns:
+        dict[str, np.ndarray]: float64 arrays with NaN where a value is missing.
+    """
+
+    if not isinstance(pitches, PitchTable):
+        pitches = PitchTable.from_pitches(pitches)
+    return {name: pitches.columns[name] for name in names if name in FLOAT_COLUMNS}
+
+
+def plate_time(y0, vY0, aY, plate_y=PLATE_Y):
+    """ Get the time until each pitch reaches the plate under constant acceleration.
+
+    Args:
+        y0, vY0, aY (np.ndarray): Position, velocity and acceleration in the y direction at y=50 ft.
+        plate_y (float, optional): Defaults to PLATE_Y.
+
+    Returns:
+        np.ndarray: Seconds, NaN if the ball never reaches the plate.
+    """
+
+    # Solve 0.5 aY t^2 + vY0 t + (y0 - plate_y) = 0 for the first positive root. The form c / q avoids dividing by
+    # aY, so it is accurate when aY is near 0 and does not lose precision to cancellation.
+    c = y0 - plate_y
+    with np.errstate(invalid='ignore', divide='ignore'):
+        discriminant = vY0 ** 2 - 2 * aY * c
+        q = 0.5 * (np.sqrt(discriminant) - vY0)
+        t = c / q
+    # q is 0 when the ball moves away from the plate with no y acceleration, which makes t infinite.
+    return np.where((discriminant >= 0) & (t > 0) & np.isfinite(t), t, np.nan)
+
+
+def solve_accelerations(pitches, plate_y=PLATE_Y):
+    """ Get the constant accelerations that carry each pitch from its state at y=50 ft to (pX, pZ), in closed form.
+
+    Args:
+        pitches (list[Pitch] | PitchTable | dict[str, np.ndarray]): A dict must hold every name in SOLVER_COLUMNS.
+        plate_y (float, optional): Defaults to PLATE_Y.
+
+    Returns:
+        SolverResult: NaN for pitches with missing coordinates.
+    """
+
+    c = pitches if isinstance(pitches, dict) else pitch_arrays(pitches)
+    t = plate_time(c['y0'], c['vY0'], c['aY'], plate_y)
+
+    # x(t) = x0 + vX0 t + 0.5 aX t^2 = pX, so aX = 2 (pX - x0 - vX0 t) / t^2, and likewise for z.
+    with np.errstate(invalid='ignore', divide='ignore'):
+        aX = 2 * (c['pX'] - c['x0'] - c['vX0'] * t) / t ** 2
+        aZ = 2 * (c['pZ'] - c['z0'] - c['vZ0'] * t) / t ** 2
+
+    residual_x = _position(c['x0'], c['vX0'], aX, t) - c['pX']
+    residual_z = _position(c['z0'], c['vZ0'], aZ, t) - c['pZ']
+    return SolverResult(aX, c['aY'].copy(), aZ, t, residual_x, residual_z, np.zeros(len(t), dtype=np.int32))
+
+
+def solve_accelerations_iteratively(pitches, max_iterations=MAX_ITERATIONS, tolerance=1e-9, plate_y=PLATE_Y):
+    """ Get the corrected accelerations by repeatedly adding the plate location error to the acceleration.
+
+    This is the method the simulation uses, run on every pitch at once. Pitches stop being corrected once their
+    error is within tolerance. solve_accelerations gives the exact answer and should be preferred.
+
+    Args:
+        pitches (list[Pitch] | PitchTable | dict[str, np.ndarray]): A dict must hold every name in SOLVER_COLUMNS.
+        max_iterations (int, optional): Defaults to MAX_ITERATIONS.
+        tolerance (float, optional): The error in ft at which a pitch is done. Defaults to 1e-9.
+        plate_y (float, optional): Defaults to PLATE_Y.
+
+    Returns:
+        SolverResult
+    """
+
+    c = pitches if isinstance(pitches, dict) else pitch_arrays(pitches)
+    t = plate_time(c['y0'], c['vY0'], c['aY'], plate_y)
+    aX = c['aX'].copy()
+    aZ = c['aZ'].copy()
+    iterations = np.zeros(len(t), dtype=np.int32)
+
+    for _ in range(max_iterations):
+        error_x = c['pX'] - _position(c['x0'], c['vX0'], aX, t)
+        error_z = c['pZ'] - _position(c['z0'], c['vZ0'], aZ, t)
+
+        # Only correct the pitches still outside the tolerance. NaN compares False, so missing data is left alone.
+        active = np.hypot(error_x, error_z) > tolerance
+        if not active.any():
+            break
+
+        aX[active] += error_x[active]
+        aZ[active] += error_z[active]
+        iterations[active] += 1
+
+    residual_x = _position(c['x0'], c['vX0'], aX, t) - c['pX']
+    residual_z = _position(c['z0'], c['vZ0'], aZ, t) - c['pZ']
+    return SolverResult(aX, c['aY'].copy(), aZ, t, residual_x, residual_z, iterations)
+
+
+def _position(p0, v0, a, t):
+    """ Get the position after t seconds of constant acceleration. """
+
+    return p0 + v0 * t + 0.5 * a * t ** 2
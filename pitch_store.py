@@ -0,0 +1,480 @@
+# This file defines a local SQLite archive of teams, games and pitches from https://statsapi.mlb.com
+#
+# Run from the repository root, e.g.
+#   python3 pitch_store.py ingest 2021-04-01 2021-10-03
+#   python3 pitch_store.py sync
+#   python3 pitch_store.py pitches --season 2021 --pitcher "Frankie Montas" --type Slider
+
+import argparse
+import sqlite3
+from datetime import datetime
+from api_classes import Team, Game, Pitch, PitchData, NO_PITCH_STATUSES, FINAL_STATUSES
+from api_methods import fetch_games, fetch_game_changes, fetch_pitch_details_bulk
+from helper_methods import print_pitches, str_to_datetime
+from pitch_table import FLOAT_COLUMNS
+
+STORE_PATH = 'pitches.sqlite3'
+INSERT_BATCH_GAMES = 50 # Games inserted per transaction during ingestion.
+
+# The Pitch attributes stored as columns, in addition to one column per name in FLOAT_COLUMNS.
+PITCH_ATTRIBUTES = ('pitcher_name', 'pitcher_hand', 'batter_name', 'batter_hand', 'result', 'pitch_type', 'balls_before', 'strikes_before', 'outs_before', 'half_inning', 'inning', 'home_score_before', 'away_score_before', 'home_abbreviation', 'away_abbreviation')
+PITCH_COLUMNS = ('game_pk', 'pitch_index', *PITCH_ATTRIBUTES, *FLOAT_COLUMNS)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS teams (
+    season TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT,
+    franchise_name TEXT,
+    club_name TEXT,
+    abbreviation TEXT,
+    PRIMARY KEY (season, id)
+);
+CREATE TABLE IF NOT EXISTS games (
+    game_pk INTEGER PRIMARY KEY,
+    link TEXT NOT NULL,
+    date TEXT NOT NULL,
+    season TEXT NOT NULL,
+    home_team_id TEXT NOT NULL,
+    away_team_id TEXT NOT NULL,
+    score TEXT,
+    status TEXT,
+    marker TEXT, -- The status, date and score when the game was last synced. A change means it must be synced again. NULL if its last download failed.
+    synced_at TEXT
+);
+CREATE TABLE IF NOT EXISTS sync_runs (
+    id INTEGER PRIMARY KEY,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT, -- NULL until the run completes, so an interrupted run can be resumed.
+    games_fetched INTEGER NOT NULL DEFAULT 0,
+    changes_until TEXT -- The run's started_at if it checked the API's change log, so the next run checks from there.
+);
+CREATE TABLE IF NOT EXISTS pitches (
+    game_pk INTEGER NOT NULL REFERENCES games (game_pk),
+    pitch_index INTEGER NOT NULL,
+    {', '.join(f'{name} {"INTEGER" if name in ("balls_before", "strikes_before", "outs_before", "inning", "home_score_before", "away_score_before") else "TEXT"}' for name in PITCH_ATTRIBUTES)},
+    {', '.join(f'{name} REAL' for name in FLOAT_COLUMNS)},
+    PRIMARY KEY (game_pk, pitch_index)
+);
+CREATE INDEX IF NOT EXISTS games_date ON games (date);
+CREATE INDEX IF NOT EXISTS games_home_team ON games (home_team_id, date);
+CREATE INDEX IF NOT EXISTS games_away_team ON games (away_team_id, date);
+-- Names and pitch types are matched ignoring case, which only an index with the same collation can serve.
+CREATE INDEX IF NOT EXISTS pitches_pitcher_nocase ON pitches (pitcher_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS pitches_batter_nocase ON pitches (batter_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS pitches_type_nocase ON pitches (pitch_type COLLATE NOCASE);
+"""
+
+
+class PitchStore:
+    def __init__(self, path=STORE_PATH):
+        """ A class to store and query teams, games and flattened pitches in a SQLite database.
+
+        Args:
+            path (str, optional): Defaults to STORE_PATH.
+        """
+        self.path = path
+        self.conn = sqlite3.connect(path)
+
+        # WAL lets queries run while an ingestion is writing.
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+        # Add the sync columns to databases created before they existed.
+        game_columns = {row[1] for row in self.conn.execute('PRAGMA table_info(games)')}
+        for name in ('status', 'marker', 'synced_at'):
+            if name not in game_columns:
+                self.conn.execute(f'ALTER TABLE games ADD COLUMN {name} TEXT')
+        run_columns = {row[1] for row in self.conn.execute('PRAGMA table_info(sync_runs)')}
+        if 'changes_until' not in run_columns:
+            self.conn.execute('ALTER TABLE sync_runs ADD COLUMN changes_until TEXT')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add_game(self, game, pitches):
+        """ Store a game, its teams and its pitches, replacing any pitches already stored for it. Does not commit.
+
+        Args:
+            game (Game)
+            pitches (list[Pitch] | PitchTable | None)
+        """
+
+        season = game.date[:4]
+        for team in (game.home_team, game.away_team):
+            self.conn.execute(
+                'INSERT OR REPLACE INTO teams (season, id, name, franchise_name, club_name, abbreviation) VALUES (?, ?, ?, ?, ?, ?)',
+                (season, team.id, team.name, team.franchise_name, team.club_name, team.abbreviation)
+            )
+
+        self.conn.execute(
+            'INSERT OR REPLACE INTO games (game_pk, link, date, season, home_team_id, away_team_id, score, status, marker, synced_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (game.game_pk, game.link, game.date, season, game.home_team.id, game.away_team.id, game.score, game.status, _marker(game), datetime.now().isoformat(timespec='seconds'))
+        )
+
+        self.conn.execute('DELETE FROM pitches WHERE game_pk = ?', (game.game_pk,))
+        self.conn.executemany(
+            f"INSERT INTO pitches ({', '.join(PITCH_COLUMNS)}) VALUES ({', '.join('?' * len(PITCH_COLUMNS))})",
+            (_pitch_row(game.game_pk, index, pitch) for (index, pitch) in enumerate(pitches or []))
+        )
+
+    def ingest(self, start_date, end_date, team_id=None, opponent_id=None, games=None, processes=None):
+        """ Download and store every game in a date range with its pitches.
+
+        Args:
+            start_date (str): In the form YYYY-MM-DD.
+            end_date (str): In the form YYYY-MM-DD.
+            team_id (str, optional): Defaults to None.
+            opponent_id (str, optional): Defaults to None.
+            games (list[Game], optional): The games to store, instead of fetching them. Defaults to None.
+            processes (int, optional): Parse feeds in this many processes, 0 for one per CPU. Defaults to None, on threads.
+
+        Returns:
+            int: The number of games stored.
+        """
+
+        if games is None:
+            games = fetch_games(start_date, end_date, team_id, opponent_id) or []
+
+        stored = 0
+        failed = 0
+        for game, pitches in fetch_pitch_details_bulk(games, processes=processes, keep_empty=True):
+            # Leave out feeds that could not be downloaded, rather than storing the game without pitches, so a later
+            # ingestion or sync fetches them again. A feed that has no pitches is stored like any other.
+            if pitches is None:
+                failed += 1
+                continue
+
+            self.add_game(game, pitches)
+            stored += 1
+
+            # Commit in batches so a long ingestion keeps its progress without a transaction per game.
+            if stored % INSERT_BATCH_GAMES == 0:
+                self.conn.commit()
+                print(f"Stored {stored} of {len(games)} games...")
+
+        self.conn.commit()
+        if failed != 0:
+            print(f"Skipped {failed} games whose feeds failed. Run again to retry them.")
+        return stored
+
+    def sync(self, start_date=None, end_date=None, processes=None):
+        """ Bring the stored games in a date range up to date, downloading only the feeds that may have changed.
+
+        A game's feed is downloaded if the game is new, in progress, its status, date or score has changed since it
+        was last synced (e.g. postponed, suspended or resumed), or the API lists it as changed since the last sync
+        (e.g. reclassified pitches that leave the score as it was). Games that have not started are stored without a
+        download, and games whose download fails are downloaded again by the next sync. Progress is committed in
+        batches, so an interrupted sync resumes where it stopped.
+
+        Args:
+            start_date (str, optional): In the form YYYY-MM-DD. Defaults to None, meaning resume the last unfinished
+                sync, or else sync the current season up to today.
+            end_date (str, optional): In the form YYYY-MM-DD. Defaults to None.
+            processes (int, optional): Parse feeds in this many processes, 0 for one per CPU. Defaults to None, on threads.
+
+        Returns:
+            tuple[int, int]: The number of feeds downloaded and the number of games left unchanged.
+        """
+
+        run_id = None
+        started_at = datetime.now().isoformat(timespec='seconds')
+        if start_date is None:
+            row = self.conn.execute('SELECT id, start_date, end_date FROM sync_runs WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1').fetchone()
+            if row is not None:
+                run_id, start_date, end_date = row
+                print(f"Resuming sync of {start_date} to {end_date}.")
+            else:
+                today = datetime.now()
+                start_date = f"{today.year}-01-01"
+                end_date = today.strftime('%Y-%m-%d')
+
+        if end_date is None:
+            end_date = datetime.now().strftime('%Y-%m-%d')
+
+        # Record the checkpoint before any work so an interrupted run can be found again.
+        if run_id is None:
+            run_id = self.conn.execute('INSERT INTO sync_runs (start_date, end_date, started_at) VALUES (?, ?, ?)', (start_date, end_date, started_at)).lastrowid
+            self.conn.commit()
+
+        # A postponed game is listed on both its original and its new date, so keep the latest listing of each game.
+        games = {}
+        for game in fetch_games(start_date, end_date, refresh=True) or []:
+            if game.game_pk not in games or game.date >= games[game.game_pk].date:
+                games[game.game_pk] = game
+
+        markers = dict(self.conn.execute('SELECT game_pk, marker FROM games WHERE date BETWEEN ? AND ?', (start_date, end_date)))
+        changed = self._changed_games(start_date, end_date, started_at, run_id)
+
+        to_fetch = []
+        unchanged = 0
+        for game in games.values():
+            if not _needs_sync(game, markers.get(game.game_pk), changed):
+                unchanged += 1
+            elif game.status is not None and game.status.startswith(NO_PITCH_STATUSES):
+                # Nothing to download, but store the new status so the game is not checked again until it changes.
+                self.add_game(game, None)
+            else:
+                to_fetch.append(game)
+        self.conn.commit()
+
+        print(f"Syncing {len(to_fetch)} of {len(games)} games...")
+
+        fetched = 0
+        failed = 0
+        for game, pitches in fetch_pitch_details_bulk(to_fetch, refresh=True, processes=processes, keep_empty=True):
+            # Keep the stored pitches of a game whose download failed, but clear its marker so it is fetched again.
+            # A feed without pitches did not fail, so the game gets a marker and a final one is not fetched again.
+            if pitches is None:
+                self.conn.execute('UPDATE games SET marker = NULL WHERE game_pk = ?', (game.game_pk,))
+                failed += 1
+                continue
+
+            self.add_game(game, pitches)
+            fetched += 1
+            if fetched % INSERT_BATCH_GAMES == 0:
+                self.conn.execute('UPDATE sync_runs SET games_fetched = games_fetched + ? WHERE id = ?', (INSERT_BATCH_GAMES, run_id))
+                self.conn.commit()
+
+        self.conn.execute('UPDATE sync_runs SET games_fetched = games_fetched + ?, finished_at = ? WHERE id = ?', (fetched % INSERT_BATCH_GAMES, datetime.now().isoformat(timespec='seconds'), run_id))
+        self.conn.commit()
+        if failed != 0:
+            print(f"{failed} games failed to download. The next sync tries them again.")
+        return fetched, unchanged
+
+    def _changed_games(self, start_date, end_date, started_at, run_id):
+        """ Get the games the API has changed since the last sync that checked, and record that this run checked.
+
+        Args:
+            start_date (str): In the form YYYY-MM-DD.
+            end_date (str): In the form YYYY-MM-DD.
+            started_at (str): When this run started, in ISO format.
+            run_id (int): This run's row in sync_runs.
+
+        Returns:
+            set[int]: gamePks. Empty if nothing is stored yet or the change log could not be downloaded.
+        """
+
+        # Check from the start of the last run that checked, else from when the oldest game in the range was stored.
+        row = self.conn.execute('SELECT changes_until FROM sync_runs WHERE finished_at IS NOT NULL AND changes_until IS NOT NULL ORDER BY id DESC LIMIT 1').fetchone()
+        since = row[0] if row is not None else self.conn.execute('SELECT MIN(synced_at) FROM games WHERE date BETWEEN ? AND ?', (start_date, end_date)).fetchone()[0]
+        if since is None:
+            return set()
+
+        changed = fetch_game_changes(datetime.fromisoformat(since))
+        if changed is None:
+            # Leave changes_until unset, so the next sync checks from the same time.
+            print("Warning: the list of changed games could not be downloaded. Corrections are picked up by the next sync.")
+            return set()
+
+        self.conn.execute('UPDATE sync_runs SET changes_until = ? WHERE id = ?', (started_at, run_id))
+        return changed
+
+    def query_teams(self, season):
+        """ Get the stored teams of a season.
+
+        Args:
+            season (str): In the form YYYY.
+
+        Returns:
+            list[Team] | None
+        """
+
+        rows = self.conn.execute('SELECT name, id, franchise_name, club_name, abbreviation FROM teams WHERE season = ? ORDER BY name', (str(season),)).fetchall()
+        team_objs = [Team(*row) for row in rows]
+        return team_objs if len(team_objs) != 0 else None
+
+    def query_games(self, start_date=None, end_date=None, team_id=None, opponent_id=None):
+        """ Get stored games, filtered like fetch_games.
+
+        Args:
+            start_date (str, optional): In the form YYYY-MM-DD. Defaults to None.
+            end_date (str, optional): In the form YYYY-MM-DD. Defaults to None.
+            team_id (str, optional): Defaults to None.
+            opponent_id (str, optional): Defaults to None.
+
+        Returns:
+            list[Game] | None: In date order.
+        """
+
+        where = []
+        params = []
+        if start_date is not None:
+            where.append('date >= ?')
+            params.append(start_date)
+        if end_date is not None:
+            where.append('date <= ?')
+            params.append(end_date)
+        if team_id is not None:
+            where.append('(home_team_id = ? OR away_team_id = ?)')
+            params += [str(team_id), str(team_id)]
+        if opponent_id is not None:
+            where.append('(home_team_id = ? OR away_team_id = ?)')
+            params += [str(opponent_id), str(opponent_id)]
+
+        sql = 'SELECT game_pk, link, date, season, home_team_id, away_team_id, score, status FROM games'
+        if len(where) != 0:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY date, game_pk'
+
+        # Build each Team once and share it between games, as fetch_games does.
+        teams = {}
+        for team_row in self.conn.execute('SELECT season, name, id, franchise_name, club_name, abbreviation FROM teams'):
+            teams[(team_row[0], team_row[2])] = Team(*team_row[1:])
+
+        game_objs = []
+        for game_pk, link, date, season, home_team_id, away_team_id, score, status in self.conn.execute(sql, params):
+            game_objs.append(Game(teams.get((season, home_team_id)), teams.get((season, away_team_id)), link, date, score, status))
+        return game_objs if len(game_objs) != 0 else None
+
+    def query_pitches(self, game=None, season=None, start_date=None, end_date=None, pitcher_name=None, batter_name=None, pitch_type=None, limit=None):
+        """ Get stored pitches, e.g. every slider a pitcher threw in a season.
+
+        Args:
+            game (Game, optional): Only this game's pitches. Defaults to None.
+            season (str, optional): In the form YYYY. Defaults to None.
+            start_date (str, optional): In the form YYYY-MM-DD. Defaults to None.
+            end_date (str, optional): In the form YYYY-MM-DD. Defaults to None.
+            pitcher_name (str, optional): The full name, ignoring case. Defaults to None.
+            batter_name (str, optional): The full name, ignoring case. Defaults to None.
+            pitch_type (str, optional): e.g. 'Slider', ignoring case. Defaults to None.
+            limit (int, optional): The most pitches returned. Defaults to None.
+
+        Returns:
+            list[Pitch] | None: In the order they were thrown.
+        """
+
+        where = []
+        params = []
+        if game is not None:
+            where.append('p.game_pk = ?')
+            params.append(game.game_pk)
+        if season is not None:
+            where.append('g.season = ?')
+            params.append(str(season))
+        if start_date is not None:
+            where.append('g.date >= ?')
+            params.append(start_date)
+        if end_date is not None:
+            where.append('g.date <= ?')
+            params.append(end_date)
+        if pitcher_name is not None:
+            where.append('p.pitcher_name = ? COLLATE NOCASE')
+            params.append(pitcher_name)
+        if batter_name is not None:
+            where.append('p.batter_name = ? COLLATE NOCASE')
+            params.append(batter_name)
+        if pitch_type is not None:
+            where.append('p.pitch_type = ? COLLATE NOCASE')
+            params.append(pitch_type)
+
+        sql = f"SELECT {', '.join('p.' + name for name in PITCH_ATTRIBUTES + tuple(FLOAT_COLUMNS))} FROM pitches p JOIN games g ON g.game_pk = p.game_pk"
+        if len(where) != 0:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY g.date, p.game_pk, p.pitch_index'
+        if limit is not None:
+            sql += f' LIMIT {int(limit)}'
+
+        pitch_objs = [_pitch(row) for row in self.conn.execute(sql, params)]
+        return pitch_objs if len(pitch_objs) != 0 else None
+
+
+def _marker(game):
+    """ Get the values of a game that change when it must be synced again. """
+
+    return f"{game.status}|{game.date}|{game.score}"
+
+
+def _needs_sync(game, stored_marker, changed=()):
+    """ Check if a game from the schedule differs from the stored one, or may still change.
+
+    Args:
+        game (Game)
+        stored_marker (str | None): The stored game's marker, None if it is not stored or its last download failed.
+        changed (set[int], optional): The gamePks the API has changed since the last sync. Defaults to none.
+
+    Returns:
+        bool
+    """
+
+    if stored_marker is None or stored_marker != _marker(game) or game.game_pk in changed:
+        return True
+
+    # Games that are in progress, delayed or suspended keep changing until they are final.
+    status = game.status or ''
+    return not status.startswith(FINAL_STATUSES + NO_PITCH_STATUSES)
+
+
+def _pitch_row(game_pk, index, pitch):
+    """ Flatten a Pitch to a row of the pitches table, in the order of PITCH_COLUMNS. """
+
+    return (
+        game_pk,
+        index,
+        *(getattr(pitch, name) for name in PITCH_ATTRIBUTES),
+        *(pitch.data.get(name) for name in FLOAT_COLUMNS),
+    )
+
+
+def _pitch(row):
+    """ Convert a row of PITCH_ATTRIBUTES followed by FLOAT_COLUMNS to a Pitch. """
+
+    attributes = dict(zip(PITCH_ATTRIBUTES, row))
+    pitch_data = PitchData(dict(zip(FLOAT_COLUMNS, row[len(PITCH_ATTRIBUTES):])))
+    return Pitch(pitch_data=pitch_data, **attributes)
+
+
+if __name__ == '__main__':
+    from main import MIN_START_DATE, MAX_END_DATE
+
+    parser = argparse.ArgumentParser(description='Build and query a local archive of pitches.')
+    parser.add_argument('--db', default=STORE_PATH, help=f'The SQLite database (default {STORE_PATH}).')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = commands.add_parser('ingest', help='Download and store every game in a date range.')
+    ingest_parser.add_argument('start_date', help=f'YYYY-MM-DD, no earlier than {MIN_START_DATE}.')
+    ingest_parser.add_argument('end_date', help=f'YYYY-MM-DD, no later than {MAX_END_DATE}.')
+    ingest_parser.add_argument('--processes', type=int, metavar='N', help='Parse feeds in N worker processes, or 0 for one per CPU (default: on the download threads).')
+
+    sync_parser = commands.add_parser('sync', help='Download only the games that are new or changed since the last sync.')
+    sync_parser.add_argument('start_date', nargs='?', help='YYYY-MM-DD (default: resume the last unfinished sync, else this season).')
+    sync_parser.add_argument('end_date', nargs='?', help='YYYY-MM-DD (default today).')
+    sync_parser.add_argument('--processes', type=int, metavar='N', help='Parse feeds in N worker processes, or 0 for one per CPU (default: on the download threads).')
+
+    pitches_parser = commands.add_parser('pitches', help='Print stored pitches.')
+    pitches_parser.add_argument('--season')
+    pitches_parser.add_argument('--pitcher')
+    pitches_parser.add_argument('--batter')
+    pitches_parser.add_argument('--type')
+    pitches_parser.add_argument('--limit', type=int, default=100)
+
+    args = parser.parse_args()
+
+    with PitchStore(args.db) as store:
+        if args.command == 'ingest':
+            start_date_obj = str_to_datetime(args.start_date)
+            end_date_obj = str_to_datetime(args.end_date)
+            if start_date_obj is None or end_date_obj is None or not str_to_datetime(MIN_START_DATE) <= start_date_obj <= end_date_obj <= str_to_datetime(MAX_END_DATE):
+                parser.error(f"dates must be YYYY-MM-DD between {MIN_START_DATE} and {MAX_END_DATE}, start before end")
+
+            stored = store.ingest(args.start_date, args.end_date, processes=args.processes)
+            print(f"Stored {stored} games in {args.db}.")
+        elif args.command == 'sync':
+            fetched, unchanged = store.sync(args.start_date, args.end_date, processes=args.processes)
+            print(f"Downloaded {fetched} games, {unchanged} unchanged.")
+        else:
+            pitches = store.query_pitches(season=args.season, pitcher_name=args.pitcher, batter_name=args.batter, pitch_type=args.type, limit=args.limit)
+            if pitches is None:
+                print('No pitches found!')
+            else:
+                print_pitches(pitches)
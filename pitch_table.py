@@ -0,0 +1,200 @@
+# This file defines a compact, column-oriented store of Pitches for working with many games at once.
+
+import numpy as np
+from api_classes import Pitch, PitchData, PITCH_DATA_FIELDS
+
+# Numeric columns, one per field of PitchData. Missing values are stored as NaN.
+FLOAT_COLUMNS = PITCH_DATA_FIELDS
+
+# Small integer attributes of a Pitch. Missing values are stored as -1.
+INT_COLUMNS = ('balls_before', 'strikes_before', 'outs_before', 'inning', 'home_score_before', 'away_score_before')
+
+# Text attributes of a Pitch, stored as an index into a list of the distinct values. Missing values are stored as -1.
+CATEGORICAL_COLUMNS = ('pitch_type', 'result', 'pitcher_name', 'pitcher_hand', 'batter_name', 'batter_hand', 'half_inning', 'home_abbreviation', 'away_abbreviation')
+
+
+class PitchTable:
+    def __init__(self, columns, categories):
+        """ A class to store Pitches as one NumPy array per field instead of one object per pitch.
+
+        Args:
+            columns (dict[str, np.ndarray]): Every column in FLOAT_COLUMNS, INT_COLUMNS and CATEGORICAL_COLUMNS, all the same length.
+            categories (dict[str, list[str]]): The distinct values of each categorical column, indexed by its codes.
+        """
+        self.columns = columns
+        self.categories = categories
+
+    @classmethod
+    def from_pitches(cls, pitches):
+        """ Build a PitchTable from Pitches. Each Pitch can be discarded as soon as it is read.
+
+        Args:
+            pitches (Iterable[Pitch]): e.g. the result of fetch_pitch_details or iter_pitch_details.
+
+        Returns:
+            PitchTable
+        """
+
+        float_values = {name: [] for name in FLOAT_COLUMNS}
+        int_values = {name: [] for name in INT_COLUMNS}
+        codes = {name: [] for name in CATEGORICAL_COLUMNS}
+        encoders = {name: {} for name in CATEGORICAL_COLUMNS}
+
+        for pitch in pitches or []:
+            # Missing fields of PitchData are already NaN.
+            data = pitch.data
+            for name in FLOAT_COLUMNS:
+                float_values[name].append(getattr(data, name))
+
+            for name in INT_COLUMNS:
+                value = getattr(pitch, name)
+                int_values[name].append(value if value is not None else -1)
+
+            # Give each new distinct value the next code.
+            for name in CATEGORICAL_COLUMNS:
+                value = getattr(pitch, name)
+                codes[name].append(encoders[name].setdefault(value, len(encoders[name])) if value is not None else -1)
+
+        columns = {}
+        for name, values in float_values.items():
+            columns[name] = np.array(values, dtype=np.float64)
+        for name, values in int_values.items():
+            columns[name] = np.array(values, dtype=np.int16)
+        for name, values in codes.items():
+            columns[name] = np.array(values, dtype=np.int32)
+
+        categories = {name: list(encoder) for (name, encoder) in encoders.items()}
+        return cls(columns, categories)
+
+    @classmethod
+    def concat(cls, tables):
+        """ Join PitchTables end to end, e.g. the tables of every game in a season.
+
+        Args:
+            tables (Iterable[PitchTable])
+
+        Returns:
+            PitchTable
+        """
+
+        tables = list(tables)
+        if len(tables) == 0:
+            return cls.from_pitches([])
+
+        columns = {}
+        for name in (*FLOAT_COLUMNS, *INT_COLUMNS):
+            columns[name] = np.concatenate([table.columns[name] for table in tables])
+
+        # Re-encode the categorical codes of each table against the merged list of categories.
+        categories = {}
+        for name in CATEGORICAL_COLUMNS:
+            encoder = {}
+            parts = []
+            for table in tables:
+                mapping = np.array([encoder.setdefault(value, len(encoder)) for value in table.categories[name]] + [-1], dtype=np.int32)
+                parts.append(mapping[table.columns[name]]) # A code of -1 picks the trailing -1.
+            columns[name] = np.concatenate(parts)
+            categories[name] = list(encoder)
+
+        return cls(columns, categories)
+
+    def column(self, name):
+        """ Get a column. Categorical columns are decoded to an array of strings (None where missing).
+
+        Args:
+            name (str)
+
+        Returns:
+            np.ndarray
+        """
+
+        values = self.columns[name]
+        if name not in self.categories:
+            return values
+
+        decoded = np.array(self.categories[name] + [None], dtype=object)
+        return decoded[values]
+
+    def equals(self, name, value):
+        """ Get a mask of the rows where a categorical column equals a value, without decoding the column.
+
+        Args:
+            name (str): A name in CATEGORICAL_COLUMNS.
+            value (str)
+
+        Returns:
+            np.ndarray: An array of bool, one per row.
+        """
+
+        try:
+            code = self.categories[name].index(value)
+        except ValueError:
+            return np.zeros(len(self), dtype=bool)
+        return self.columns[name] == code
+
+    def __len__(self):
+        return len(self.columns['start_speed'])
+
+    def __getitem__(self, key):
+        """ Get a PitchRow by index, or a new PitchTable for a slice, an array of indexes or a mask of bool. """
+
+        if isinstance(key, (int, np.integer)):
+            index = int(key)
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError('PitchTable index out of range')
+            return PitchRow(self, index)
+
+        return PitchTable({name: values[key] for (name, values) in self.columns.items()}, self.categories)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield PitchRow(self, index)
+
+
+class PitchRow:
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table, index):
+        """ A class to read one row of a PitchTable with the same attributes as a Pitch.
+
+        Args:
+            table (PitchTable)
+            index (int)
+        """
+        self._table = table
+        self._index = index
+
+    def __getattr__(self, name):
+        columns = self._table.columns
+        if name not in columns:
+            raise AttributeError(f"'PitchRow' object has no attribute '{name}'")
+
+        value = columns[name][self._index]
+        if name in self._table.categories:
+            return self._table.categories[name][value] if value != -1 else None
+        if name in FLOAT_COLUMNS:
+            return float(value) if not np.isnan(value) else None
+        return int(value) if value != -1 else None
+
+    @property
+    def data(self):
+        """ PitchData: The stored numeric fields. """
+
+        return PitchData({name: getattr(self, name) for name in FLOAT_COLUMNS})
+
+    @property
+    def pitch_data(self):
+        """ dict: The stored numeric fields in the nested layout of the API's pitchData. """
+
+        return self.data.to_dict()
+
+    @property
+    def complete(self):
+        """ bool: Whether the row has every field the simulation needs. """
+
+        return self.data.complete
+
+    __str__ = Pitch.__str__
+
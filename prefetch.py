@@ -0,0 +1,197 @@
+# This file defines a prefetcher that downloads and parses the feeds of the games the user is likely to pick while they
+# read the table of games, so the pitches are ready as soon as a game is chosen.
+
+import sys
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from api_methods import iter_pitch_details
+from instrumentation import span, count
+
+PREFETCH_WORKERS = 2 # Feeds downloaded at once. Kept low so prefetching does not crowd out the user's own requests.
+PREFETCH_GAMES = 4 # The most feeds prefetched for each page of games shown.
+PREFETCH_BYTES = 32 * 1024 * 1024 # The most memory the prefetched pitches may hold, estimated. 32 MB.
+RECENT_TEAMS = 4 # The teams of recently chosen games remembered, whose games are prefetched first.
+
+
+class FeedPrefetcher:
+    def __init__(self, max_workers=PREFETCH_WORKERS, max_games=PREFETCH_GAMES, max_bytes=PREFETCH_BYTES):
+        """ A class to prefetch the pitches of the games on the page the user is reading, most likely pick first.
+
+        Call prefetch with each page of games shown, then take with the game chosen.
+
+        Args:
+            max_workers (int, optional): Defaults to PREFETCH_WORKERS.
+            max_games (int, optional): Defaults to PREFETCH_GAMES.
+            max_bytes (int, optional): Prefetched pitches past this estimated size are dropped, oldest first.
+                Defaults to PREFETCH_BYTES.
+        """
+        self.max_games = max_games
+        self.max_bytes = max_bytes
+        self.recent_teams = deque(maxlen=RECENT_TEAMS) # Team ids, most recent last.
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+        self._futures = {} # The future of each queued or running prefetch, by game link.
+        self._results = OrderedDict() # link: (pitches, estimated bytes), oldest first.
+        self._bytes = 0
+        self._wanted = set() # Links whose prefetch is still wanted. Running prefetches stop once theirs is removed.
+        self._lock = threading.Lock()
+
+    def candidates(self, page):
+        """ Order the games of a page by how likely the user is to pick each one, keeping at most max_games.
+
+        The default pick, the first game of the page, comes first, then games with a recently chosen team, then the
+        rest from the top of the page down.
+
+        Args:
+            page (list[Game])
+
+        Returns:
+            list[Game]
+        """
+
+        recent = set(self.recent_teams)
+        ordered = page[:1]
+        ordered += [game for game in page[1:] if game.home_team.id in recent or game.away_team.id in recent]
+        ordered += page[1:]
+
+        games = {}
+        for game in ordered:
+            games.setdefault(game.link, game)
+        return list(games.values())[:self.max_games]
+
+    def prefetch(self, page):
+        """ Start prefetching the likely picks of a page of games. Queued prefetches for games no longer shown are cancelled.
+
+        Args:
+            page (list[Game])
+        """
+
+        games = self.candidates(page)
+        with self._lock:
+            self._wanted = {game.link for game in games} | set(self._results)
+            for link, future in list(self._futures.items()):
+                if link not in self._wanted:
+                    future.cancel()
+                    del self._futures[link]
+
+            # The pool runs prefetches in the order they are submitted, so the likeliest pick starts first.
+            for game in games:
+                if game.link in self._futures or game.link in self._results:
+                    continue
+                self._futures[game.link] = self.executor.submit(self._load, game)
+
+    def take(self, game):
+        """ Get the prefetched pitches of the game the user chose and cancel every other prefetch.
+
+        Waits if the game's feed is being downloaded already, since that is sooner than starting again.
+
+        Args:
+            game (Game)
+
+        Returns:
+            list[Pitch] | None: The pitches iter_pitch_details(game, drop_incomplete=True) yields, or None if the game
+                was not prefetched.
+        """
+
+        self.recent_teams.extend((game.home_team.id, game.away_team.id))
+
+        with self._lock:
+            # Only the chosen game's prefetch may finish.
+            self._wanted = {game.link}
+            future = self._futures.pop(game.link, None)
+            for other in self._futures.values():
+                other.cancel()
+            self._futures.clear()
+
+            entry = self._results.pop(game.link, None)
+            self._results.clear()
+            self._bytes = 0
+
+        if entry is not None:
+            count('prefetch.hits')
+            return entry[0]
+
+        # Not started yet, so fetching it directly is no slower.
+        if future is None or future.cancel():
+            count('prefetch.misses')
+            return None
+
+        count('prefetch.waits')
+        try:
+            pitches = future.result()
+        except CancelledError:
+            pitches = None
+        except Exception as e:
+            print(f"Prefetch failed: {e}")
+            pitches = None
+
+        with self._lock:
+            self._wanted = set()
+            self._results.pop(game.link, None)
+            self._bytes = 0
+        return pitches
+
+    def close(self):
+        """ Cancel every prefetch and stop the workers without waiting for running downloads. """
+
+        with self._lock:
+            self._wanted = set()
+            self._futures.clear()
+            self._results.clear()
+            self._bytes = 0
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _load(self, game):
+        """ Download and parse a game's pitches on a worker, keeping them within the memory budget.
+
+        Args:
+            game (Game)
+
+        Returns:
+            list[Pitch] | None: None if it was cancelled or the request failed.
+        """
+
+        def cancelled():
+            return game.link not in self._wanted
+
+        # Stop once the game is no longer wanted rather than download or parse a feed nobody will read. It is checked
+        # before the request, before the response is decoded, and after each pitch.
+        pitches = []
+        with span('prefetch.feed') as attributes:
+            for pitch in iter_pitch_details(game, drop_incomplete=True, cancelled=cancelled):
+                if cancelled():
+                    break
+                pitches.append(pitch)
+
+            if cancelled():
+                attributes['cancelled'] = 'true'
+                return None
+            attributes['pitches'] = len(pitches)
+
+        # Leave failed requests to the normal fetch, which reports them.
+        if len(pitches) == 0:
+            return None
+
+        size = _estimate_bytes(pitches)
+        with self._lock:
+            self._futures.pop(game.link, None)
+            if game.link not in self._wanted or size > self.max_bytes:
+                return pitches
+
+            self._results[game.link] = (pitches, size)
+            self._bytes += size
+
+            # Drop the oldest prefetches until the budget is met.
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._results.popitem(last=False)
+                self._bytes -= evicted
+                count('prefetch.evictions')
+        return pitches
+
+
+def _estimate_bytes(pitches):
+    """ Estimate the memory a list of pitches holds. Names and results are mostly shared between pitches, so strings are not counted. """
+
+    if len(pitches) == 0:
+        return sys.getsizeof(pitches)
+    return sys.getsizeof(pitches) + len(pitches) * (sys.getsizeof(pitches[0]) + sys.getsizeof(pitches[0].data))
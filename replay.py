@@ -0,0 +1,196 @@
+# This file defines transports that record responses from https://statsapi.mlb.com to a local fixture store and replay
+# them from a stand-in server, so anything built on api_methods can be load tested without the real API.
+#
+# Record the requests a date range makes, from the repository root, e.g.
+#   python3 replay.py record 2023-04-01 2023-04-07 --store fixtures/april
+# then serve them with benchmarks/stand_in_server.py and send requests there with
+#   set_transport(ReplayTransport('http://127.0.0.1:8060'))
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import urlparse
+from api_cache import ResponseCache
+from api_transport import Transport, BASE_URL
+
+STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'fixtures', 'recorded')
+INDEX_NAME = 'index.jsonl'
+
+
+def fixture_key(url, params=None):
+    """ Build the key of a response from its path and parameters, so it matches whichever host serves it.
+
+    Args:
+        url (str): A full URL or a path, e.g. '/api/v1/teams'.
+        params (dict, optional): Defaults to None.
+
+    Returns:
+        str: e.g. '/api/v1/teams?season=2023&sportId=1'.
+    """
+
+    return ResponseCache.make_key(urlparse(url).path, params)
+
+
+class FixtureStore:
+    def __init__(self, path=STORE_PATH):
+        """ A class to store response bodies on disk, gzipped, one file per request, listed in an index.
+
+        Args:
+            path (str, optional): A directory. Defaults to STORE_PATH.
+        """
+        self.path = path
+        self._entries = {} # The file of each key.
+        self._paths = {} # The keys recorded for each path, without parameters.
+        self._lock = threading.Lock()
+
+        index_path = os.path.join(path, INDEX_NAME)
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                for line in f:
+                    if line.strip() != '':
+                        entry = json.loads(line)
+                        self._add(entry['key'], entry['file'])
+
+    def _add(self, key, file):
+        self._entries[key] = file
+        self._paths.setdefault(key.split('?')[0], []).append(key)
+
+    def put(self, url, params, body):
+        """ Store a response body, replacing any stored for the same key.
+
+        Args:
+            url (str)
+            params (dict | None)
+            body (bytes): The JSON text.
+        """
+
+        key = fixture_key(url, params)
+        file = hashlib.sha1(key.encode()).hexdigest()[:20] + '.json.gz'
+
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            with gzip.open(os.path.join(self.path, file), 'wb') as f:
+                f.write(body)
+            if key not in self._entries:
+                with open(os.path.join(self.path, INDEX_NAME), 'a') as f:
+                    f.write(json.dumps({'key': key, 'file': file}) + '\n')
+                self._add(key, file)
+
+    def get_compressed(self, url, params=None, any_params=False):
+        """ Get a stored response body as it is stored, gzipped.
+
+        Args:
+            url (str)
+            params (dict, optional): Defaults to None.
+            any_params (bool, optional): If nothing is stored for these parameters, use the response stored for the
+                same path with the fewest parameters, e.g. a full game feed for a request filtered by 'fields'.
+                Defaults to False.
+
+        Returns:
+            bytes | None
+        """
+
+        key = fixture_key(url, params)
+        with self._lock:
+            file = self._entries.get(key)
+            if file is None and any_params:
+                keys = self._paths.get(key.split('?')[0])
+                if keys:
+                    file = self._entries[min(keys, key=len)]
+
+        if file is None:
+            return None
+        with open(os.path.join(self.path, file), 'rb') as f:
+            return f.read()
+
+    def get(self, url, params=None, any_params=False):
+        """ Get a stored response body. See get_compressed.
+
+        Returns:
+            bytes | None: The JSON text.
+        """
+
+        compressed = self.get_compressed(url, params, any_params)
+        return gzip.decompress(compressed) if compressed is not None else None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RecordingTransport(Transport):
+    def __init__(self, store, **kwargs):
+        """ A Transport that stores the body of every successful response in a FixtureStore.
+
+        Args:
+            store (FixtureStore)
+            **kwargs: Passed to Transport.
+        """
+        super().__init__(**kwargs)
+        self.store = store
+
+    def get(self, url, params=None, stream=False, rate_limiter=None):
+        r = super().get(url, params=params, stream=stream, rate_limiter=rate_limiter)
+
+        # Reading a streamed body here would consume it, so only whole responses are recorded.
+        if r is not None and r.status_code == 200 and not stream:
+            self.store.put(url, params, r.content)
+        return r
+
+
+class ReplayTransport(Transport):
+    def __init__(self, stand_in_url, **kwargs):
+        """ A Transport that sends every request for statsapi.mlb.com to a stand-in server instead.
+
+        Args:
+            stand_in_url (str): e.g. 'http://127.0.0.1:8060'.
+            **kwargs: Passed to Transport, e.g. max_retries=0 to see every injected error.
+        """
+        super().__init__(**kwargs)
+        self.stand_in_url = stand_in_url.rstrip('/')
+
+    def get(self, url, params=None, stream=False, rate_limiter=None):
+        if url.startswith(BASE_URL):
+            url = self.stand_in_url + url[len(BASE_URL):]
+        return super().get(url, params=params, stream=stream, rate_limiter=rate_limiter)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Record the statsapi responses a date range needs into a fixture store.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_parser = commands.add_parser('record', help='Record the teams, schedule and game feeds of a date range.')
+    record_parser.add_argument('start_date', help='YYYY-MM-DD')
+    record_parser.add_argument('end_date', help='YYYY-MM-DD')
+    record_parser.add_argument('--store', default=STORE_PATH, help='The fixture directory (default benchmarks/fixtures/recorded).')
+    record_parser.add_argument('--team', help='Only games with this team.')
+    record_parser.add_argument('--max-games', type=int, help='Record the feeds of at most this many games.')
+    args = parser.parse_args()
+
+    from api_cache import set_cache
+    from api_methods import fetch_teams, fetch_team_by_name, fetch_pitch_details_bulk, iter_games, iter_pitch_details
+    from api_transport import set_transport
+    from snapshot import set_snapshot
+
+    # Every request must reach the API to be recorded.
+    store = FixtureStore(args.store)
+    set_transport(RecordingTransport(store))
+    set_cache(None)
+    set_snapshot(None)
+
+    season = args.start_date[:4]
+    fetch_teams(season)
+    team = fetch_team_by_name(args.team, season) if args.team else None
+    if args.team and team is None:
+        parser.error('team not found')
+
+    games = list(iter_games(args.start_date, args.end_date, team.id if team else None))[:args.max_games]
+
+    # Record both the full feed fetch_pitch_details reads and the filtered one iter_pitch_details reads.
+    for _ in fetch_pitch_details_bulk(games):
+        pass
+    for game in games:
+        list(iter_pitch_details(game))
+
+    print(f"Recorded {len(store)} responses for {len(games)} games in {args.store}.")
@@ -0,0 +1,404 @@
+# This file defines a local HTTP service that answers lookups of teams, games, pitches and simulation args as JSON,
+# so many clients can share one warm process instead of each calling https://statsapi.mlb.com
+#
+# Run from the repository root, e.g.
+#   python3 service.py --port 8050
+# then request, for example:
+#   GET /teams?season=2023
+#   GET /games?start_date=2023-04-01&end_date=2023-04-30&team=Athletics&opponent=Angels
+#   GET /games/717465
+#   GET /games/717465/pitches
+#   GET /games/717465/args                  The simulation args of every pitch with the data the simulation needs.
+#   GET /games/717465/pitches/12/args       The simulation args of the pitch at position 12, counted from 0.
+#   GET /stats
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+from api_cache import LIVE_GAME_TTL
+from api_classes import FINAL_STATUSES
+from api_methods import fetch_teams, fetch_games, fetch_pitch_details, fetch_team_by_name, iter_games, season_ttl
+from api_transport import read_request
+from instrumentation import count
+from helper_methods import build_pitch_args, str_to_datetime
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8050
+MEMORY_CACHE_ENTRIES = 2048 # The most lookups kept in memory. Each game's pitches is one entry.
+MAX_WORKERS = 16 # Lookups that call the API at once.
+NOT_FOUND_TTL = LIVE_GAME_TTL # Seconds a lookup that found nothing is remembered.
+MAX_HEADER_LINES = 100
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        """ An error to answer a request with.
+
+        Args:
+            status (int): The HTTP status code, e.g. 404.
+            message (str)
+        """
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class MemoryCache:
+    def __init__(self, max_entries=MEMORY_CACHE_ENTRIES):
+        """ A class to keep the results of lookups in memory, each until its TTL passes, evicting the least recently used.
+
+        Args:
+            max_entries (int, optional): Defaults to MEMORY_CACHE_ENTRIES.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # key: (expires or None, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """ Get a stored value.
+
+        Args:
+            key (tuple)
+
+        Returns:
+            tuple[bool, Any]: Whether the key was found and not expired, and its value. The value may be None.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+
+            expires, value = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return False, None
+
+            self._entries.move_to_end(key)
+            return True, value
+
+    def put(self, key, value, ttl=None):
+        """ Store a value.
+
+        Args:
+            key (tuple)
+            value (Any)
+            ttl (float | None, optional): Seconds until it expires. Defaults to None, meaning it never changes.
+        """
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl if ttl is not None else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class PitchService:
+    def __init__(self, cache=None, max_workers=MAX_WORKERS):
+        """ A class to answer lookups from a shared MemoryCache, running the blocking fetch_* functions on worker threads.
+
+        Identical lookups that arrive while one is already running wait for its result instead of calling the API again.
+
+        Args:
+            cache (MemoryCache, optional): Defaults to a new MemoryCache.
+            max_workers (int, optional): Defaults to MAX_WORKERS.
+        """
+        self.cache = cache if cache is not None else MemoryCache()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.stats = {'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'lookups': 0}
+        self._in_flight = {} # The future of each running lookup, by key. Only touched from the event loop.
+
+    async def lookup(self, key, function, ttl=None):
+        """ Get the result of a blocking function, from the cache, from an identical running lookup, or by running it.
+
+        Args:
+            key (tuple): Identifies the lookup, e.g. ('teams', '2023').
+            function (Callable[[], Any])
+            ttl (float | Callable[[Any], float | None] | None, optional): Seconds the result is kept, or a function
+                of the result returning it. Results of None are kept for NOT_FOUND_TTL. Defaults to None, forever.
+
+        Returns:
+            Any
+        """
+
+        found, value = self.cache.get(key)
+        if found:
+            self.stats['cache_hits'] += 1
+            count('service.cache_hits')
+            return value
+
+        # Wait for the identical lookup already running.
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            count('service.coalesced')
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._in_flight[key] = future
+        self.stats['lookups'] += 1
+        try:
+            value = await loop.run_in_executor(self.executor, function)
+            if value is None:
+                self.cache.put(key, value, NOT_FOUND_TTL)
+            else:
+                self.cache.put(key, value, ttl(value) if callable(ttl) else ttl)
+            future.set_result(value)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._in_flight[key]
+
+            # Cancelled, e.g. the client went away. Answer the lookups waiting on this one rather than leave them hanging.
+            if not future.done():
+                future.set_exception(ServiceError(500, f"The lookup of {key} was cancelled"))
+            future.exception() # Mark any exception retrieved in case nothing was waiting.
+
+        return value
+
+    async def teams(self, season=None):
+        """ Get every team in a season as JSON. """
+
+        teams = await self.lookup(('teams', season), lambda: fetch_teams(season), season_ttl(season))
+        if teams is None:
+            raise ServiceError(404, f"No teams found for season {season}")
+        return [team_json(team) for team in teams]
+
+    async def games(self, start_date, end_date, team=None, opponent=None):
+        """ Get the games in a date range as JSON, with team and opponent given by name. """
+
+        def load():
+            # Team names are looked up in the season the range starts in, as main.py does.
+            season = start_date[:4]
+            ids = []
+            for name in (team, opponent):
+                if name is None:
+                    ids.append(None)
+                    continue
+                found = fetch_team_by_name(name, season)
+                if found is None:
+                    raise ServiceError(404, f"No team found for '{name}'")
+                ids.append(found.id)
+            return list(iter_games(start_date, end_date, *ids)) or None
+
+        games = await self.lookup(('games', start_date, end_date, team, opponent), load, season_ttl(end_date[:4]))
+        if games is None:
+            raise ServiceError(404, 'No games found')
+        return [game_json(game) for game in games]
+
+    async def game(self, game_pk):
+        """ Get one Game by gamePk. Its status is refreshed every LIVE_GAME_TTL until it is final. """
+
+        games = await self.lookup(('game', game_pk), lambda: fetch_games(game_pk=game_pk), lambda games: _game_ttl(games[0]))
+        if games is None:
+            raise ServiceError(404, f"No game found for {game_pk}")
+        return games[0]
+
+    async def pitches(self, game_pk):
+        """ Get the Pitches of one game. """
+
+        game = await self.game(game_pk)
+        pitches = await self.lookup(('pitches', game_pk), lambda: fetch_pitch_details(game), _game_ttl(game))
+        if pitches is None:
+            raise ServiceError(404, f"No pitches found for {game_pk}")
+        return pitches
+
+    async def args(self, game_pk, pitch_index=None):
+        """ Get the simulation args main.py builds, for one pitch or every complete pitch in a game. """
+
+        pitches = await self.pitches(game_pk)
+        if pitch_index is not None:
+            if not 0 <= pitch_index < len(pitches):
+                raise ServiceError(404, f"Game {game_pk} has {len(pitches)} pitches")
+            if not pitches[pitch_index].complete:
+                raise ServiceError(404, f"Pitch {pitch_index} of game {game_pk} is missing data the simulation needs")
+            return build_pitch_args(pitches[pitch_index])
+
+        return [{'pitch_index': i, **build_pitch_args(pitch)} for (i, pitch) in enumerate(pitches) if pitch.complete]
+
+    async def route(self, target):
+        """ Answer a request target, e.g. '/games/717465/pitches'.
+
+        Returns:
+            Any: The JSON to respond with.
+
+        Raises:
+            ServiceError
+        """
+
+        parts = urlsplit(target)
+        path = [part for part in parts.path.split('/') if part != '']
+        query = {key: values[-1] for (key, values) in parse_qs(parts.query).items()}
+
+        if path == ['teams']:
+            season = query.get('season')
+            if season is not None and not (len(season) == 4 and season.isdigit()):
+                raise ServiceError(400, 'season must be in the form YYYY')
+            return await self.teams(season)
+
+        if path == ['games']:
+            if 'start_date' not in query:
+                raise ServiceError(400, 'start_date is required')
+            start_date = query['start_date']
+            end_date = query.get('end_date', start_date)
+
+            # Checked here, since a bad date would otherwise fail deep in a lookup as a 500.
+            for name, value in (('start_date', start_date), ('end_date', end_date)):
+                date_obj = str_to_datetime(value)
+                if date_obj is None or date_obj.strftime('%Y-%m-%d') != value:
+                    raise ServiceError(400, f"{name} must be in the form YYYY-MM-DD")
+            if end_date < start_date:
+                raise ServiceError(400, 'end_date must not be before start_date')
+            return await self.games(start_date, end_date, query.get('team'), query.get('opponent'))
+
+        if len(path) >= 2 and path[0] == 'games':
+            if not path[1].isdigit():
+                raise ServiceError(400, 'The game must be a gamePk')
+            game_pk = int(path[1])
+            if len(path) == 2:
+                return game_json(await self.game(game_pk))
+            if path[2:] == ['pitches']:
+                return [pitch_json(pitch) for pitch in await self.pitches(game_pk)]
+            if path[2:] == ['args']:
+                return await self.args(game_pk)
+            if len(path) == 5 and path[2] == 'pitches' and path[3].isdigit() and path[4] == 'args':
+                return await self.args(game_pk, int(path[3]))
+
+        if path == ['stats']:
+            return {**self.stats, 'cached': len(self.cache), 'in_flight': len(self._in_flight)}
+
+        raise ServiceError(404, f"Unknown path {parts.path}")
+
+    async def handle_connection(self, reader, writer):
+        """ Answer every request on one connection, keeping it open between requests unless the client closes it. """
+
+        try:
+            while True:
+                try:
+                    request = await read_request(reader, MAX_HEADER_LINES)
+                except ValueError as e:
+                    await self._respond(writer, 400, {'error': str(e)}, False)
+                    break
+                if request is None:
+                    break
+                method, target, version, headers = request
+
+                self.stats['requests'] += 1
+                if method != 'GET':
+                    status, body = 405, {'error': 'Only GET is supported'}
+                else:
+                    try:
+                        status, body = 200, await self.route(target)
+                    except ServiceError as e:
+                        status, body = e.status, {'error': e.message}
+                    except Exception as e:
+                        print(f"Request {target} failed: {e}")
+                        status, body = 500, {'error': str(e)}
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                await self._respond(writer, status, body, keep_alive)
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, body, keep_alive):
+        """ Send one JSON response. """
+
+        data = json.dumps(body).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"\r\n".encode('latin-1') + data
+        )
+        await writer.drain()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """ Serve requests until cancelled. """
+
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serving on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def team_json(team):
+    """ Convert a Team to JSON. """
+
+    return {'id': team.id, 'name': team.name, 'franchise_name': team.franchise_name, 'club_name': team.club_name, 'abbreviation': team.abbreviation}
+
+
+def game_json(game):
+    """ Convert a Game to JSON. """
+
+    return {
+        'game_pk': game.game_pk,
+        'link': game.link,
+        'date': game.date,
+        'status': game.status,
+        'score': game.score,
+        'home_team': team_json(game.home_team),
+        'away_team': team_json(game.away_team),
+    }
+
+
+def pitch_json(pitch):
+    """ Convert a Pitch to JSON. """
+
+    return {
+        'pitcher_name': pitch.pitcher_name,
+        'pitcher_hand': pitch.pitcher_hand,
+        'batter_name': pitch.batter_name,
+        'batter_hand': pitch.batter_hand,
+        'result': pitch.result,
+        'pitch_type': pitch.pitch_type,
+        'balls_before': pitch.balls_before,
+        'strikes_before': pitch.strikes_before,
+        'outs_before': pitch.outs_before,
+        'half_inning': pitch.half_inning,
+        'inning': pitch.inning,
+        'home_score_before': pitch.home_score_before,
+        'away_score_before': pitch.away_score_before,
+        'home_abbreviation': pitch.home_abbreviation,
+        'away_abbreviation': pitch.away_abbreviation,
+        'pitch_data': pitch.pitch_data,
+        'complete': pitch.complete,
+    }
+
+
+def _game_ttl(game):
+    """ Get how long a lookup about a game can be kept: forever once it is final, otherwise LIVE_GAME_TTL. """
+
+    return None if game.status is not None and game.status.startswith(FINAL_STATUSES) else LIVE_GAME_TTL
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve teams, games, pitches and simulation args as JSON over HTTP.')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'(default {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'(default {DEFAULT_PORT})')
+    parser.add_argument('--cache-entries', type=int, default=MEMORY_CACHE_ENTRIES, help=f'Lookups kept in memory (default {MEMORY_CACHE_ENTRIES}).')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help=f'Lookups that call the API at once (default {MAX_WORKERS}).')
+    args = parser.parse_args()
+
+    service = PitchService(MemoryCache(args.cache_entries), args.workers)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
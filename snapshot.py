@@ -0,0 +1,341 @@
+# This file defines a compact snapshot of the teams and regular season schedules of past seasons, read through a memory
+# map, so fetch_teams and fetch_games can answer for past seasons without the network.
+#
+# Layout, all little-endian:
+#   Header      HEADER_FORMAT, see below.
+#   Teams       One TEAM_DTYPE record per team per season, sorted by season.
+#   Games       One GAME_DTYPE record per game, sorted by date.
+#   Strings     A zlib-compressed JSON list of every name and status. Records refer to them by position.
+#
+# No snapshot ships with the repository, so until one is built every lookup uses the network. The build stops without
+# replacing the old snapshot if any schedule fails to download. Build it from the repository root, e.g.
+#   python3 snapshot.py build 2015 2023
+#   python3 snapshot.py info
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from datetime import date, timedelta
+import numpy as np
+from api_classes import Team, Game
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schedule_snapshot.bin')
+
+MAGIC = b'PSNP'
+VERSION = 1
+HEADER_FORMAT = '<4sHHIIIIQQQI' # magic, version, reserved, first date, last date, team count, game count, teams offset, games offset, strings offset, strings size.
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+TEAM_DTYPE = np.dtype([
+    ('season', '<u2'),
+    ('id', '<u4'),
+    ('name', '<u4'), # Positions in the strings list.
+    ('franchise_name', '<u4'),
+    ('club_name', '<u4'),
+    ('abbreviation', '<u4'),
+])
+GAME_DTYPE = np.dtype([
+    ('date', '<u4'), # YYYYMMDD, so dates sort as numbers.
+    ('game_pk', '<u4'),
+    ('home_id', '<u4'),
+    ('away_id', '<u4'),
+    ('home_score', '<i2'), # -1 if unknown.
+    ('away_score', '<i2'),
+    ('status', '<u4'), # A position in the strings list. The empty string if the game has no status.
+])
+
+
+class Snapshot:
+    def __init__(self, path=SNAPSHOT_PATH):
+        """ A class to read a snapshot file. Games in a date range are found by binary search without reading the rest.
+
+        Args:
+            path (str, optional): Defaults to SNAPSHOT_PATH.
+
+        Raises:
+            ValueError: If the file is not a snapshot of a supported version.
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, first_date, last_date, team_count, game_count, teams_offset, games_offset, strings_offset, strings_size = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} snapshot")
+
+        # Every day from first_date to last_date is in the snapshot, including days without games.
+        self.first_date = _from_number(first_date)
+        self.last_date = _from_number(last_date)
+        self.team_records = np.frombuffer(self._mmap, dtype=TEAM_DTYPE, count=team_count, offset=teams_offset)
+        self.game_records = np.frombuffer(self._mmap, dtype=GAME_DTYPE, count=game_count, offset=games_offset)
+        self.strings = json.loads(zlib.decompress(self._mmap[strings_offset:strings_offset + strings_size]))
+        self._teams = {} # The Teams of each season, built on first use.
+
+    def teams(self, season):
+        """ Get every Team of a season.
+
+        Args:
+            season (str | int): In the form YYYY.
+
+        Returns:
+            list[Team] | None: None if the season is not in the snapshot.
+        """
+
+        season = int(season)
+        if season not in self._teams:
+            seasons = self.team_records['season']
+            records = self.team_records[np.searchsorted(seasons, season, 'left'):np.searchsorted(seasons, season, 'right')]
+            if len(records) == 0:
+                return None
+            self._teams[season] = {
+                str(record['id']): Team(self.strings[record['name']], str(record['id']), self.strings[record['franchise_name']], self.strings[record['club_name']], self.strings[record['abbreviation']])
+                for record in records
+            }
+        return list(self._teams[season].values())
+
+    def covered(self, start_date, end_date):
+        """ Get the part of a date range the snapshot covers.
+
+        Args:
+            start_date (str): In the form YYYY-MM-DD.
+            end_date (str): In the form YYYY-MM-DD.
+
+        Returns:
+            tuple[str, str] | None: The first and last date covered, or None if no date is.
+        """
+
+        start = max(start_date, self.first_date)
+        end = min(end_date, self.last_date)
+        return (start, end) if start <= end else None
+
+    def games(self, start_date, end_date, team_id=None, opponent_id=None):
+        """ Get the games in a date range, in the order fetch_games returns them.
+
+        Args:
+            start_date (str): In the form YYYY-MM-DD.
+            end_date (str): In the form YYYY-MM-DD.
+            team_id (str, optional): Only games with this team. Defaults to None.
+            opponent_id (str, optional): Only games between team_id and this team. Defaults to None.
+
+        Returns:
+            list[Game]
+        """
+
+        dates = self.game_records['date']
+        records = self.game_records[np.searchsorted(dates, _to_number(start_date), 'left'):np.searchsorted(dates, _to_number(end_date), 'right')]
+
+        if team_id is not None:
+            team_id = int(team_id)
+            if opponent_id is None:
+                records = records[(records['home_id'] == team_id) | (records['away_id'] == team_id)]
+            else:
+                opponent_id = int(opponent_id)
+                records = records[((records['home_id'] == team_id) & (records['away_id'] == opponent_id)) | ((records['home_id'] == opponent_id) & (records['away_id'] == team_id))]
+
+        games = []
+        for record in records:
+            game_date = _from_number(record['date'])
+            season = int(game_date[:4])
+            if season not in self._teams:
+                self.teams(season)
+            teams = self._teams.get(season, {})
+            home_team = teams.get(str(record['home_id']))
+            away_team = teams.get(str(record['away_id']))
+            if home_team is None or away_team is None:
+                continue
+
+            home_score = int(record['home_score'])
+            away_score = int(record['away_score'])
+            score = f"{home_score} - {away_score}" if home_score != -1 and away_score != -1 else "Unknown"
+            status = self.strings[record['status']] or None
+            games.append(Game(home_team, away_team, f"/api/v1.1/game/{record['game_pk']}/feed/live", game_date, score, status))
+        return games
+
+    def close(self):
+        """ Release the memory map. """
+
+        self.team_records = None
+        self.game_records = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # numpy views still point into the map. It is closed when the last one is garbage collected.
+            pass
+        self._file.close()
+
+
+def write_snapshot(path, teams_by_season, games, first_date, last_date):
+    """ Write a snapshot file.
+
+    Args:
+        path (str)
+        teams_by_season (dict[int, list[Team]])
+        games (Iterable[Game]): Every game from first_date to last_date, e.g. from iter_games(strict=True). Days
+            without games are recorded as such, so a schedule that failed to download must not be left out.
+        first_date (str): In the form YYYY-MM-DD. The first date the snapshot answers for.
+        last_date (str): In the form YYYY-MM-DD. The last date the snapshot answers for.
+
+    Returns:
+        tuple[int, int]: The number of teams and games written.
+    """
+
+    strings = {}
+
+    def string(value):
+        return strings.setdefault(str(value), len(strings))
+
+    team_records = []
+    for season in sorted(teams_by_season):
+        for team in teams_by_season[season]:
+            team_records.append((season, int(team.id), string(team.name), string(team.franchise_name), string(team.club_name), string(team.abbreviation)))
+    team_array = np.array(team_records, dtype=TEAM_DTYPE)
+
+    game_records = []
+    for game in games:
+        home_score, away_score = _parse_score(game.score)
+        status = string(game.status if game.status is not None else '')
+        game_records.append((_to_number(game.date), game.game_pk or 0, int(game.home_team.id), int(game.away_team.id), home_score, away_score, status))
+
+    # A stable sort keeps the order the API listed each day's games in.
+    game_array = np.array(game_records, dtype=GAME_DTYPE)
+    game_array = game_array[np.argsort(game_array['date'], kind='stable')]
+
+    strings_data = zlib.compress(json.dumps(list(strings)).encode(), 9)
+    teams_offset = _align(HEADER_SIZE)
+    games_offset = _align(teams_offset + team_array.nbytes)
+    strings_offset = games_offset + game_array.nbytes
+
+    with open(path, 'wb') as f:
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, 0, _to_number(first_date), _to_number(last_date), len(team_array), len(game_array), teams_offset, games_offset, strings_offset, len(strings_data)))
+        f.write(b'\0' * (teams_offset - HEADER_SIZE))
+        f.write(team_array.tobytes())
+        f.write(b'\0' * (games_offset - teams_offset - team_array.nbytes))
+        f.write(game_array.tobytes())
+        f.write(strings_data)
+
+    return len(team_array), len(game_array)
+
+
+def _to_number(date_str):
+    """ Convert YYYY-MM-DD to the number YYYYMMDD. """
+
+    return int(date_str.replace('-', ''))
+
+
+def _from_number(number):
+    """ Convert the number YYYYMMDD to YYYY-MM-DD. """
+
+    number = int(number)
+    return f"{number // 10000:04d}-{number // 100 % 100:02d}-{number % 100:02d}"
+
+
+def _parse_score(score):
+    """ Get the home and away score from a Game's score, -1 for each if it is unknown. """
+
+    try:
+        home_score, away_score = (int(part) for part in str(score).split(' - '))
+    except ValueError:
+        return -1, -1
+    return home_score, away_score
+
+
+def _align(offset, alignment=8):
+    """ Round an offset up to a multiple of alignment. """
+
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def day_before(date_str):
+    """ Get the day before a date in the form YYYY-MM-DD. """
+
+    return (date.fromisoformat(date_str) - timedelta(days=1)).isoformat()
+
+
+def day_after(date_str):
+    """ Get the day after a date in the form YYYY-MM-DD. """
+
+    return (date.fromisoformat(date_str) + timedelta(days=1)).isoformat()
+
+
+# The Snapshot used by api_methods. Opened on first use; False if there is no snapshot file.
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    """ Get the shared snapshot, opening SNAPSHOT_PATH on first use.
+
+    Returns:
+        Snapshot | None: None if there is no snapshot or it is disabled.
+    """
+
+    global _snapshot
+
+    with _snapshot_lock:
+        if _snapshot is None:
+            try:
+                _snapshot = Snapshot(SNAPSHOT_PATH) if os.path.exists(SNAPSHOT_PATH) else False
+            except (OSError, ValueError, struct.error) as e:
+                print(f"Could not read the snapshot: {e}")
+                _snapshot = False
+        return _snapshot or None
+
+
+def set_snapshot(snapshot):
+    """ Replace the shared snapshot, e.g. with None to always use the network.
+
+    Args:
+        snapshot (Snapshot | None)
+    """
+
+    global _snapshot
+
+    with _snapshot_lock:
+        _snapshot = snapshot if snapshot is not None else False
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build or describe the snapshot of past teams and schedules.')
+    parser.add_argument('--path', default=SNAPSHOT_PATH, help='The snapshot file (default schedule_snapshot.bin next to this file).')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help='Download every team and regular season game of a range of seasons.')
+    build_parser.add_argument('first_season', type=int)
+    build_parser.add_argument('last_season', type=int)
+    commands.add_parser('info', help='Describe the snapshot.')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        from api_methods import fetch_teams, iter_games
+
+        # Download from the API, not from the snapshot being replaced.
+        set_snapshot(None)
+
+        teams_by_season = {}
+        for season in range(args.first_season, args.last_season + 1):
+            teams = fetch_teams(season)
+            if teams is None:
+                parser.error(f"could not download the teams of {season}")
+            teams_by_season[season] = teams
+
+        # iter_games keeps the latest listing of each game, e.g. 'Final' rather than 'Postponed' for a rescheduled one.
+        first_date = f"{args.first_season}-01-01"
+        last_date = f"{args.last_season}-12-31"
+        # A window that failed would otherwise look like days without games, and the header would claim it is covered.
+        try:
+            games = list(iter_games(first_date, last_date, strict=True))
+        except ConnectionError as e:
+            parser.error(f"{e}. The snapshot was not changed")
+
+        # Write next to the old snapshot, then replace it, so a failed build leaves it intact.
+        temporary_path = args.path + '.tmp'
+        team_count, game_count = write_snapshot(temporary_path, teams_by_season, games, first_date, last_date)
+        os.replace(temporary_path, args.path)
+        print(f"Wrote {team_count} teams and {game_count} games from {first_date} to {last_date} to {args.path} ({os.path.getsize(args.path)} bytes).")
+    else:
+        snapshot = Snapshot(args.path)
+        print(f"{args.path}: {len(snapshot.team_records)} teams and {len(snapshot.game_records)} games from {snapshot.first_date} to {snapshot.last_date}.")
+        snapshot.close()
@@ -0,0 +1,223 @@
+# This file defines an index of the Teams in a season, used to look teams up without scanning a list.
+
+import re
+
+# Common nicknames, as extra names for the club name they stand for.
+CLUB_NICKNAMES = {
+    'athletics': ('as',),
+    'diamondbacks': ('dbacks',),
+    'blue jays': ('jays',),
+    'nationals': ('nats',),
+    'cardinals': ('cards',),
+    'phillies': ('phils',),
+    'guardians': ('guards',),
+}
+
+MAX_EDIT_DISTANCE = 2 # The most typos resolve forgives.
+MAX_SUGGESTIONS = 5
+
+
+class TeamRegistry:
+    def __init__(self, season=None):
+        """ A class to index the Teams of a season by id, name, franchise name, club name and abbreviation.
+
+        Args:
+            season (str, optional): In the form YYYY. Defaults to None.
+        """
+        self.season = season
+        self.complete = False # True once every team in the season has been added.
+        self.by_id = {}
+        self.by_name = {}
+        self.by_franchise_name = {}
+        self.by_club_name = {}
+        self.by_abbreviation = {}
+
+        # Every normalized name, abbreviation and nickname of every team, for resolve. A name may fit several teams.
+        self.aliases = {}
+        self.trie = {} # Nested dicts of characters, each node with the ids of teams whose aliases pass through it under ''.
+
+    def add(self, team):
+        """ Add a Team to every index. A team already added by id is kept so the same object is shared.
+
+        Args:
+            team (Team)
+
+        Returns:
+            Team: The Team stored for team.id.
+        """
+
+        existing = self.by_id.get(team.id)
+        if existing is not None:
+            return existing
+
+        self.by_id[team.id] = team
+
+        # Franchise names such as 'New York' are shared, so the first team added keeps the key.
+        self.by_name.setdefault(_key(team.name), team)
+        self.by_franchise_name.setdefault(_key(team.franchise_name), team)
+        self.by_club_name.setdefault(_key(team.club_name), team)
+        self.by_abbreviation.setdefault(_key(team.abbreviation), team)
+
+        for alias in _aliases(team):
+            self.aliases.setdefault(alias, set()).add(team.id)
+
+            node = self.trie
+            for character in alias:
+                node = node.setdefault(character, {})
+                node.setdefault('', set()).add(team.id)
+        return team
+
+    def get(self, id):
+        """ Get a Team by its id.
+
+        Args:
+            id (str | int)
+
+        Returns:
+            Team | None
+        """
+
+        return self.by_id.get(str(id))
+
+    def find(self, name):
+        """ Get a Team by its name, franchise name, club name or abbreviation, ignoring case.
+
+        Args:
+            name (str): e.g. 'Oakland Athletics' or 'Oakland' or 'Athletics' or 'OAK'
+
+        Returns:
+            Team | None
+        """
+
+        key = _key(name)
+        for index in (self.by_name, self.by_franchise_name, self.by_club_name, self.by_abbreviation):
+            team = index.get(key)
+            if team is not None:
+                return team
+        return None
+
+    def resolve(self, name):
+        """ Get the one Team a name refers to, forgiving case, punctuation, nicknames, prefixes and small typos.
+
+        Tries, in order: an exact alias ('oakland athletics', 'oak', "oakland a's"), a prefix of an alias ('yank'),
+        and the alias within MAX_EDIT_DISTANCE edits ('yankes'). Each step only succeeds if it picks out one team.
+
+        Args:
+            name (str)
+
+        Returns:
+            Team | None: None if no team or more than one team fits, e.g. 'New York'. See suggest.
+        """
+
+        key = _alias_key(name)
+        if key == '':
+            return None
+
+        for ids in (self.aliases.get(key), self._prefix_ids(key), self._nearest_ids(key)):
+            if ids is not None and len(ids) != 0:
+                return self.by_id[next(iter(ids))] if len(ids) == 1 else None
+        return None
+
+    def suggest(self, name, limit=MAX_SUGGESTIONS):
+        """ Get the Teams a name might refer to, e.g. every New York team for 'New York'.
+
+        Args:
+            name (str)
+            limit (int, optional): Defaults to MAX_SUGGESTIONS.
+
+        Returns:
+            list[Team]
+        """
+
+        key = _alias_key(name)
+        if key == '':
+            return []
+
+        for ids in (self.aliases.get(key), self._prefix_ids(key), self._nearest_ids(key)):
+            if ids is not None and len(ids) != 0:
+                return sorted((self.by_id[id] for id in ids), key=lambda team: team.name)[:limit]
+        return []
+
+    def _prefix_ids(self, key):
+        """ Get the ids of the teams with an alias starting with key. """
+
+        node = self.trie
+        for character in key:
+            node = node.get(character)
+            if node is None:
+                return set()
+        return node.get('', set())
+
+    def _nearest_ids(self, key):
+        """ Get the ids of the teams with the alias fewest edits from key, if within MAX_EDIT_DISTANCE. """
+
+        best_distance = min(MAX_EDIT_DISTANCE, len(key) // 3) # Short inputs like 'ny' must not match everything.
+        best_ids = set()
+        for alias, ids in self.aliases.items():
+            distance = _edit_distance(key, alias, best_distance)
+            if distance < best_distance:
+                best_distance = distance
+                best_ids = set(ids)
+            elif distance == best_distance:
+                best_ids |= ids
+        return best_ids
+
+    def teams(self):
+        """ Get every Team in the order they were added.
+
+        Returns:
+            list[Team]
+        """
+
+        return list(self.by_id.values())
+
+    def __len__(self):
+        return len(self.by_id)
+
+
+def _key(name):
+    """ Normalize a name for lookup. """
+
+    return ' '.join(str(name).split()).casefold()
+
+
+def _alias_key(name):
+    """ Normalize a name for resolve, also dropping punctuation, e.g. "Oakland A's" to 'oakland as'. """
+
+    return _key(re.sub(r"[^\w\s]", '', str(name)))
+
+
+def _aliases(team):
+    """ Get every alias of a team for resolve. """
+
+    club_name = _alias_key(team.club_name)
+    franchise_name = _alias_key(team.franchise_name)
+    aliases = {_alias_key(team.name), franchise_name, club_name, _alias_key(team.abbreviation)}
+
+    # Nicknames on their own and after the franchise name, e.g. 'as' and 'oakland as'.
+    for nickname in CLUB_NICKNAMES.get(club_name, ()):
+        aliases.add(nickname)
+        aliases.add(f"{franchise_name} {nickname}")
+
+    aliases.discard('')
+    aliases.discard('none')
+    return aliases
+
+
+def _edit_distance(a, b, bound):
+    """ Get the Levenshtein distance between two strings, or bound + 1 once it is certain to exceed bound. """
+
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+
+    previous = list(range(len(b) + 1))
+    for i, character_a in enumerate(a, 1):
+        current = [i]
+        for j, character_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (character_a != character_b)))
+
+        # Every later row is at least the smallest value in this one.
+        if min(current) > bound:
+            return bound + 1
+        previous = current
+    return previous[-1]
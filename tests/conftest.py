@@ -0,0 +1,53 @@
+# Shared fixtures for the tests. Nothing here sends a request to https://statsapi.mlb.com
+
+import pytest
+from api_classes import Team, Game, Pitch, PitchData
+
+# A pitch thrown at about 89 MPH that crosses the middle of the plate, in the units of the API's pitchData.
+PITCH_DATA = {
+    'start_speed': 89.0,
+    'strike_zone_top': 3.4,
+    'strike_zone_bottom': 1.6,
+    'extension': 6.4,
+    'x0': -1.6,
+    'y0': 50.0,
+    'z0': 5.9,
+    'vX0': 5.2,
+    'vY0': -129.5,
+    'vZ0': -4.6,
+    'aX': -9.8,
+    'aY': 27.6,
+    'aZ': -20.4,
+    'pX': 0.1,
+    'pZ': 2.5,
+    'spin_rate': 2350.0,
+    'spin_direction': 210.0,
+}
+
+
+@pytest.fixture
+def game():
+    """ A Game between two placeholder teams. """
+
+    home_team = Team('Oakland Athletics', '133', 'Oakland', 'Athletics', 'OAK')
+    away_team = Team('Seattle Mariners', '136', 'Seattle', 'Mariners', 'SEA')
+    return Game(home_team, away_team, '/api/v1.1/game/717465/feed/live', '2023-04-01', '3 - 2', 'Final')
+
+
+@pytest.fixture
+def make_pitch():
+    """ Build a Pitch from PITCH_DATA, with any attribute or pitchData field replaced by a keyword. A field given as
+    None is missing. """
+
+    def make(**changes):
+        values = {**PITCH_DATA, **{name: value for (name, value) in changes.items() if name in PITCH_DATA}}
+        attributes = {
+            'pitcher_name': 'Frankie Montas', 'pitcher_hand': 'R', 'batter_name': 'Julio Rodriguez', 'batter_hand': 'R',
+            'result': 'Ball', 'pitch_type': 'Slider', 'balls_before': 0, 'strikes_before': 0, 'outs_before': 0,
+            'half_inning': 'top', 'inning': 1, 'home_score_before': 0, 'away_score_before': 0,
+            'home_abbreviation': 'OAK', 'away_abbreviation': 'SEA',
+        }
+        attributes.update({name: value for (name, value) in changes.items() if name not in PITCH_DATA})
+        return Pitch(pitch_data=PitchData(values), **attributes)
+
+    return make
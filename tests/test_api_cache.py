@@ -0,0 +1,68 @@
+import os
+import api_cache
+from api_cache import ResponseCache, TOUCH_INTERVAL
+
+URL = 'https://statsapi.mlb.com/api/v1/schedule'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def stored_keys(cache):
+    return {key for (key,) in cache._conn.execute('SELECT key FROM responses')}
+
+
+def test_expired_response_is_dropped(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(api_cache, 'time', clock)
+    cache = ResponseCache(':memory:')
+
+    cache.put(URL, {'season': 2024}, {'dates': []}, ttl=30)
+    cache.put(URL, {'season': 2023}, {'dates': [1]})
+
+    clock.now += 29
+    assert cache.get(URL, {'season': 2024}) == {'dates': []}
+
+    clock.now += 1
+    assert cache.get(URL, {'season': 2024}) is None
+    assert stored_keys(cache) == {ResponseCache.make_key(URL, {'season': 2023})}
+
+    # A response without a TTL never expires.
+    clock.now += 10 ** 9
+    assert cache.get(URL, {'season': 2023}) == {'dates': [1]}
+
+
+def test_least_recently_used_response_is_evicted(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(api_cache, 'time', clock)
+
+    # Random bytes do not compress, so each response takes about 1000 bytes and three fit.
+    bodies = {name: os.urandom(1000) for name in 'abcd'}
+    cache = ResponseCache(':memory:', max_bytes=3100)
+    for name in 'abc':
+        cache.put_raw(URL, {'game': name}, bodies[name])
+        clock.now += 1
+
+    # A hit soon after the response was stored does not change the order, but one after TOUCH_INTERVAL does.
+    assert cache.get_raw(URL, {'game': 'b'}) == bodies['b']
+    clock.now += TOUCH_INTERVAL
+    assert cache.get_raw(URL, {'game': 'a'}) == bodies['a']
+
+    cache.put_raw(URL, {'game': 'd'}, bodies['d'])
+    assert cache.get_raw(URL, {'game': 'b'}) is None
+    for name in 'acd':
+        assert cache.get_raw(URL, {'game': name}) == bodies[name]
+
+
+def test_cache_survives_reopening(tmp_path):
+    path = str(tmp_path / 'responses.sqlite3')
+    cache = ResponseCache(path)
+    cache.put(URL, None, {'teams': []})
+    cache._conn.close()
+
+    assert ResponseCache(path).get(URL) == {'teams': []}
@@ -0,0 +1,38 @@
+import pytest
+from api_transport import Transport
+from benchmarks.stand_in_server import StandInServer, ERROR_STATUSES
+
+
+@pytest.fixture
+def stand_in():
+    """ Start a stand-in for statsapi.mlb.com that fails every request, and stop it after the test. """
+
+    server = StandInServer(error_rate=1.0, seed=0)
+    url = server.start()
+    yield server, url
+    server.stop()
+
+
+def test_failed_requests_are_retried_then_given_up(stand_in):
+    server, url = stand_in
+    transport = Transport(max_retries=2, backoff_factor=0)
+
+    r = transport.get(url + '/api/v1/teams')
+    transport.close()
+
+    assert r.status_code in ERROR_STATUSES
+    assert server.stats['requests'] == 3
+
+
+def test_compressed_response_is_decoded(stand_in):
+    server, url = stand_in
+    server.error_rate = 0.0
+    transport = Transport(max_retries=2, backoff_factor=0)
+
+    r = transport.get(url + '/api/v1/teams')
+    transport.close()
+
+    assert r.status_code == 200
+    assert r.headers['Content-Encoding'] == 'gzip'
+    assert len(r.json()['teams']) == 30
+    assert server.stats['requests'] == 1
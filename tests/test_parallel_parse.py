@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+import pytest
+import api_cache
+import api_transport
+from api_classes import Game
+from api_methods import _iter_pitches
+from benchmarks.fixtures import generate_feed
+from parallel_parse import parse_feed, attach_rows, fetch_pitch_tables_parallel
+from pitch_table import PitchTable
+
+
+class FeedResponse:
+    def __init__(self, content):
+        self.status_code = 200
+        self.content = content
+
+
+class FeedTransport:
+    """ Serves a generated feed for every game, slowly enough for downloads to overlap, and records how many overlap. """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most_running = 0
+
+    def get(self, url, params=None, stream=False, rate_limiter=None):
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        game_pk = int(url.split('/')[-3])
+        return FeedResponse(json.dumps(generate_feed(game_pk, innings=3)).encode())
+
+
+def shared_blocks():
+    return {name for name in os.listdir('/dev/shm') if name.startswith('psm_')}
+
+
+def test_parsed_feed_matches_serial_parser(game):
+    data = generate_feed(717465, innings=9)
+    expected = PitchTable.from_pitches(_iter_pitches(data['liveData']['plays']['allPlays'], game))
+
+    parsed, ttl = parse_feed(json.dumps(data).encode(), game)
+    table = attach_rows(parsed)
+
+    assert len(table) == len(expected) > 0
+    assert table.categories == expected.categories
+    assert table.columns.keys() == expected.columns.keys()
+    for name, values in expected.columns.items():
+        assert table.columns[name].dtype == values.dtype, name
+        assert np.array_equal(table.columns[name], values, equal_nan=values.dtype.kind == 'f'), name
+
+
+def test_stopping_early_caps_downloads_and_frees_shared_memory(monkeypatch, game):
+    if not os.path.isdir('/dev/shm'):
+        pytest.skip('Shared memory blocks are not listed in /dev/shm')
+
+    transport = FeedTransport()
+    monkeypatch.setattr(api_transport, '_transport', transport)
+    monkeypatch.setattr(api_cache, '_cache', None)
+    monkeypatch.setattr(api_cache, '_cache_disabled', True)
+    games = [Game(game.home_team, game.away_team, f"/api/v1.1/game/{700001 + i}/feed/live", '2023-04-01', '3 - 2', 'Final') for i in range(12)]
+
+    before = shared_blocks()
+    results = fetch_pitch_tables_parallel(games, processes=2, max_workers=2, requests_per_second=None)
+    first_game, first_table = next(results)
+    results.close()
+
+    assert first_table is not None and len(first_table) > 0
+    assert transport.most_running <= 2
+    assert shared_blocks() <= before
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+import api_methods
+import pitch_export
+from api_classes import Game
+from pitch_export import ArrowChunkWriter, EXPORT_COLUMNS, flatten
+from pitch_table import PitchTable
+
+
+def test_arrow_stream_reads_back_with_pyarrow(tmp_path, game, make_pitch):
+    pa = pytest.importorskip('pyarrow')
+    table = PitchTable.from_pitches([make_pitch(), make_pitch(inning=None, start_speed=None, pitch_type=None)])
+    path = str(tmp_path / 'pitches.arrows')
+
+    writer = ArrowChunkWriter(path)
+    writer.write(flatten(game, table))
+    writer.flush()
+    writer.close()
+
+    read = pa.ipc.open_stream(path).read_all()
+    assert read.column_names == list(EXPORT_COLUMNS)
+    assert read.num_rows == 2
+    assert read.column('game_pk').to_pylist() == [717465, 717465]
+    assert read.column('pitch_index').to_pylist() == [0, 1]
+    assert read.column('pitch_type').to_pylist() == ['Slider', None]
+    assert read.column('inning').to_pylist() == [1, None]
+    assert read.column('start_speed').to_pylist() == [89.0, None]
+
+
+def test_arrow_stream_resumes_after_last_batch(tmp_path, game, make_pitch):
+    pa = pytest.importorskip('pyarrow')
+    path = str(tmp_path / 'pitches.arrows')
+
+    writer = ArrowChunkWriter(path)
+    writer.write(flatten(game, PitchTable.from_pitches([make_pitch(inning=1)])))
+    offset = writer.flush()
+    writer.write(flatten(game, PitchTable.from_pitches([make_pitch(inning=9)]))) # Lost when the run is interrupted.
+    writer.flush()
+    writer.close()
+
+    writer = ArrowChunkWriter(path, offset)
+    writer.write(flatten(game, PitchTable.from_pitches([make_pitch(inning=2)])))
+    writer.flush()
+    writer.close()
+
+    read = pa.ipc.open_stream(path).read_all()
+    assert read.column('inning').to_pylist() == [1, 2]
+    assert np.array_equal(read.column('start_speed').to_numpy(), [89.0, 89.0])
+
+
+def test_export_writes_empty_feeds_and_stops_at_failed_ones(tmp_path, monkeypatch, game, make_pitch):
+    played = Game(game.home_team, game.away_team, '/api/v1.1/game/1/feed/live', '2023-04-01', '3 - 2', 'Final')
+    empty = Game(game.home_team, game.away_team, '/api/v1.1/game/2/feed/live', '2023-04-02', '0 - 0', 'Final')
+    failed = Game(game.home_team, game.away_team, '/api/v1.1/game/3/feed/live', '2023-04-03', '1 - 0', 'Final')
+    tables = {played.link: PitchTable.from_pitches([make_pitch(), make_pitch()]), empty.link: PitchTable.from_pitches([]), failed.link: None}
+
+    monkeypatch.setattr(pitch_export, 'iter_range_games', lambda *args: iter([played, empty, failed]))
+    # Both the downloads of iter_game_tables and the export's retry.
+    fetch = lambda game, *args, **kwargs: tables[game.link]
+    monkeypatch.setattr(api_methods, 'fetch_pitch_details', fetch)
+    monkeypatch.setattr(pitch_export, 'fetch_pitch_details', fetch)
+
+    path = str(tmp_path / 'pitches.csv')
+    assert pitch_export.export_pitches(path, '2023-04-01', '2023-04-03') is None
+    progress = pitch_export._read_progress(path, {'start_date': '2023-04-01', 'end_date': '2023-04-03', 'team_id': None, 'opponent_id': None, 'format': 'csv'})
+    assert (progress['games'], progress['rows'], progress['last_game']) == (2, 2, empty.link)
+
+    # Once the feed downloads, the resumed export finishes.
+    tables[failed.link] = PitchTable.from_pitches([make_pitch()])
+    assert pitch_export.export_pitches(path, '2023-04-01', '2023-04-03', resume=True) == (3, 3)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from pitch_integrator import GRAVITY, MOUND_Y, INTEGRATOR_COLUMNS, simulate_pitches, release_states, spin_axes, accelerations, initial_states
+from pitch_solver import pitch_arrays, PLATE_Y
+
+
+@pytest.fixture
+def spinless(make_pitch):
+    """ Pitches without spin, so with no drag their only acceleration is gravity. """
+
+    return pitch_arrays([make_pitch(spin_rate=0.0), make_pitch(spin_rate=0.0, vX0=-6.0, vY0=-120.0, vZ0=1.5), make_pitch(spin_rate=0.0, x0=None)], INTEGRATOR_COLUMNS)
+
+
+def constant_acceleration(c, target_y):
+    """ Where and when each pitch of c reaches target_y under gravity alone, which leaves vY constant. """
+
+    t = (target_y - c['y0']) / c['vY0']
+    return c['x0'] + c['vX0'] * t, c['z0'] + c['vZ0'] * t + 0.5 * GRAVITY * t ** 2, t
+
+
+def test_rk4_matches_constant_acceleration_without_drag_or_spin(spinless):
+    result = simulate_pitches(spinless, drag_coefficient=0.0)
+    x, z, t = constant_acceleration(spinless, PLATE_Y)
+
+    np.testing.assert_allclose(result.x[:2], x[:2], atol=1e-6)
+    np.testing.assert_allclose(result.z[:2], z[:2], atol=1e-6)
+    np.testing.assert_allclose(result.states[:2, 1], PLATE_Y, atol=1e-6)
+    np.testing.assert_allclose(result.time[:2], t[:2], atol=1e-8)
+    assert np.all(np.isnan(result.states[2]))
+
+
+def test_rk4_integrates_backwards_to_release(spinless):
+    result = release_states(spinless, drag_coefficient=0.0)
+    release_y = MOUND_Y - spinless['extension']
+    x, z, t = constant_acceleration(spinless, release_y)
+
+    # The release is behind y=50 ft, so it was reached before the measured state.
+    assert np.all(result.time[:2] < 0)
+    np.testing.assert_allclose(result.states[:2, 1], release_y[:2], atol=1e-6)
+    np.testing.assert_allclose(result.x[:2], x[:2], atol=1e-6)
+    np.testing.assert_allclose(result.z[:2], z[:2], atol=1e-6)
+
+
+def test_drag_slows_the_ball_and_backspin_lifts_it(make_pitch):
+    c = pitch_arrays([make_pitch(spin_rate=2400.0, spin_direction=180.0)], INTEGRATOR_COLUMNS)
+    a = accelerations(initial_states(c), spin_axes(c['spin_rate'], c['spin_direction']))
+
+    # The ball moves in -y, so drag pushes it towards +y. Backspin lifts it against gravity.
+    assert a[0, 1] > 0
+    assert GRAVITY < a[0, 2] < 0
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from pitch_search import PitchIndex
+from pitch_table import PitchTable
+
+
+@pytest.fixture
+def pitches(make_pitch):
+    return [
+        make_pitch(pitch_type='Slider', inning=1, strikes_before=2, start_speed=86.0, pitcher_hand='R'),
+        make_pitch(pitch_type='Changeup', inning=None, strikes_before=2, start_speed=88.5, pitcher_hand='L'),
+        make_pitch(pitch_type='Changeup', inning=3, strikes_before=0, start_speed=None, pitcher_hand='L'),
+        make_pitch(pitch_type='Sweeper', inning=7, strikes_before=None, start_speed=83.0, pitcher_hand='R'),
+        make_pitch(pitch_type=None, inning=9, strikes_before=1, start_speed=97.2, pitcher_hand='R'),
+    ]
+
+
+@pytest.fixture(params=['list', 'table'])
+def index(request, pitches):
+    return PitchIndex(pitches if request.param == 'list' else PitchTable.from_pitches(pitches))
+
+
+@pytest.mark.parametrize('criteria, rows', [
+    ({}, [0, 1, 2, 3, 4]),
+    ({'pitch_type': 'Changeup'}, [1, 2]),
+    ({'pitch_type': ['Slider', 'Sweeper']}, [0, 3]),
+    ({'pitch_type': 'Knuckleball'}, []),
+    ({'strikes_before': 2, 'pitcher_hand': 'L'}, [1]),
+    ({'strikes_before': {0, 1}}, [2, 4]),
+    ({'start_speed': (85, 90)}, [0, 1]),
+    ({'start_speed': (90, None)}, [4]),
+    ({'pitch_type': 'Changeup', 'start_speed': (88, None), 'pitcher_hand': 'L', 'strikes_before': 2}, [1]),
+])
+def test_search(index, criteria, rows):
+    np.testing.assert_array_equal(index.search(**criteria), rows)
+
+
+@pytest.mark.parametrize('criteria, rows', [
+    ({'inning': (None, 3)}, [0, 2]),
+    ({'inning': (None, None)}, [0, 2, 3, 4]),
+    ({'inning': (-5, 1)}, [0]),
+    ({'strikes_before': (None, 1)}, [2, 4]),
+    ({'start_speed': (None, None)}, [0, 1, 3, 4]),
+    ({'start_speed': (None, 90), 'inning': (None, 5)}, [0]),
+])
+def test_ranges_leave_out_missing_values(index, criteria, rows):
+    np.testing.assert_array_equal(index.search(**criteria), rows)
+
+
+def test_find_returns_the_original_pitches(pitches):
+    index = PitchIndex(pitches)
+    assert index.find(pitch_type='Sweeper') == [pitches[3]]
+    assert index.count(pitcher_hand='R') == 3
+
+
+def test_unknown_field(index):
+    with pytest.raises(ValueError):
+        index.search(spin_axis=(0, 90))
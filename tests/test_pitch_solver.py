@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from pitch_solver import plate_time, solve_accelerations, solve_accelerations_iteratively, pitch_arrays, PLATE_Y
+
+
+@pytest.fixture
+def pitches(make_pitch):
+    return [
+        make_pitch(),
+        make_pitch(vX0=-3.1, aX=12.5, pX=-0.8, pZ=1.7), # A breaking ball away from a right-handed batter.
+        make_pitch(vY0=-140.0, aY=0.0, aZ=-12.0, pZ=3.1), # No y acceleration, which must not divide by zero.
+        make_pitch(pX=None), # Missing the plate location.
+    ]
+
+
+def test_closed_form_lands_on_the_plate_location(pitches):
+    solved = solve_accelerations(pitches)
+    assert np.all(solved.residual[:3] < 1e-9)
+    assert np.isnan(solved.aX[3]) and np.isnan(solved.residual[3])
+
+
+def test_closed_form_matches_iterative_solver(pitches):
+    exact = solve_accelerations(pitches)
+    iterated = solve_accelerations_iteratively(pitches, tolerance=1e-9)
+
+    np.testing.assert_allclose(iterated.aX[:3], exact.aX[:3], rtol=1e-6)
+    np.testing.assert_allclose(iterated.aZ[:3], exact.aZ[:3], rtol=1e-6)
+    np.testing.assert_array_equal(iterated.aY, exact.aY)
+    assert np.all(iterated.residual[:3] <= 1e-9)
+    assert np.all(iterated.iterations[:3] > 0)
+
+    # Missing data is left alone rather than corrected.
+    assert iterated.iterations[3] == 0
+
+
+def test_plate_time_solves_the_y_quadratic(pitches):
+    c = pitch_arrays(pitches)
+    t = plate_time(c['y0'], c['vY0'], c['aY'])
+    y = c['y0'] + c['vY0'] * t + 0.5 * c['aY'] * t ** 2
+    np.testing.assert_allclose(y, PLATE_Y, atol=1e-9)
+    assert 0.35 < t[0] < 0.45
+
+
+def test_plate_time_is_nan_when_the_ball_never_arrives():
+    # Moving away from the plate, and slowing down before it gets there.
+    t = plate_time(np.array([50.0, 50.0]), np.array([10.0, -20.0]), np.array([0.0, 20.0]))
+    assert np.all(np.isnan(t))
@@ -0,0 +1,63 @@
+import pitch_store
+from api_classes import Game
+from pitch_store import PitchStore
+
+
+def stored_games(store):
+    return dict(store.conn.execute('SELECT game_pk, marker FROM games'))
+
+
+def test_sync_refetches_failed_feeds_and_keeps_empty_final_games(monkeypatch, game, make_pitch):
+    played = Game(game.home_team, game.away_team, '/api/v1.1/game/1/feed/live', '2023-04-01', '3 - 2', 'Final')
+    empty = Game(game.home_team, game.away_team, '/api/v1.1/game/2/feed/live', '2023-04-01', '0 - 0', 'Final')
+    feeds = {played.link: None, empty.link: []}
+    requested = []
+
+    def fetch_pitch_details_bulk(games, **kwargs):
+        requested.append([game.link for game in games])
+        return [(game, feeds[game.link]) for game in games]
+
+    monkeypatch.setattr(pitch_store, 'fetch_games', lambda *args, **kwargs: [played, empty])
+    monkeypatch.setattr(pitch_store, 'fetch_game_changes', lambda since: set())
+    monkeypatch.setattr(pitch_store, 'fetch_pitch_details_bulk', fetch_pitch_details_bulk)
+    store = PitchStore(':memory:')
+
+    # The failed feed is not stored. The game without pitches is, with its marker.
+    assert store.sync('2023-04-01', '2023-04-01') == (1, 0)
+    assert stored_games(store) == {2: 'Final|2023-04-01|0 - 0'}
+
+    # Only the failed feed is downloaded again.
+    feeds[played.link] = [make_pitch(), make_pitch()]
+    assert store.sync('2023-04-01', '2023-04-01') == (1, 1)
+    assert requested[-1] == [played.link]
+    assert len(store.query_pitches(played)) == 2
+    assert stored_games(store) == {1: 'Final|2023-04-01|3 - 2', 2: 'Final|2023-04-01|0 - 0'}
+
+    # A correction that fails to download keeps the stored pitches but clears the marker, so the next sync retries it.
+    feeds[played.link] = None
+    monkeypatch.setattr(pitch_store, 'fetch_game_changes', lambda since: {1})
+    assert store.sync('2023-04-01', '2023-04-01') == (0, 1)
+    assert stored_games(store)[1] is None
+    assert len(store.query_pitches(played)) == 2
+
+    monkeypatch.setattr(pitch_store, 'fetch_game_changes', lambda since: set())
+    store.sync('2023-04-01', '2023-04-01')
+    assert requested[-1] == [played.link]
+
+
+def test_ingested_pitches_read_back(monkeypatch, game, make_pitch):
+    pitches = [make_pitch(pitch_type='Slider', start_speed=85.5), make_pitch(pitch_type='Changeup', start_speed=None, inning=None)]
+    monkeypatch.setattr(pitch_store, 'fetch_pitch_details_bulk', lambda games, **kwargs: [(game, pitches)])
+    store = PitchStore(':memory:')
+
+    assert store.ingest('2023-04-01', '2023-04-01', games=[game]) == 1
+
+    assert [(g.game_pk, g.status, g.home_team.abbreviation) for g in store.query_games('2023-04-01', '2023-04-30', team_id='136')] == [(717465, 'Final', 'OAK')]
+    assert store.query_games(team_id='133', opponent_id='999') is None
+
+    sliders = store.query_pitches(season='2023', pitch_type='slider')
+    assert len(sliders) == 1 and sliders[0].data.get('start_speed') == 85.5
+
+    changeup = store.query_pitches(game=game, pitch_type='Changeup')[0]
+    assert changeup.inning is None and changeup.data.get('start_speed') is None
+    assert changeup.data.get('spin_rate') == 2350.0
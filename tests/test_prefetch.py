@@ -0,0 +1,69 @@
+import json
+import api_cache
+import api_transport
+from benchmarks.fixtures import generate_feed
+from prefetch import FeedPrefetcher
+
+
+class FeedResponse:
+    def __init__(self, calls, data):
+        self.calls = calls
+        self.status_code = 200
+        self.content = json.dumps(data).encode()
+
+    def json(self):
+        self.calls.append('decode')
+        return json.loads(self.content)
+
+
+class FeedTransport:
+    """ Serves a generated feed for every game, first running on_get, e.g. to have the user pick another game. """
+
+    def __init__(self, on_get=None):
+        self.calls = []
+        self.on_get = on_get
+
+    def get(self, url, params=None, stream=False, rate_limiter=None):
+        self.calls.append('get')
+        if self.on_get is not None:
+            self.on_get()
+        return FeedResponse(self.calls, generate_feed(int(url.split('/')[-3]), innings=3))
+
+
+def use_transport(monkeypatch, transport):
+    monkeypatch.setattr(api_transport, '_transport', transport)
+    monkeypatch.setattr(api_cache, '_cache', None)
+    monkeypatch.setattr(api_cache, '_cache_disabled', True)
+
+
+def test_prefetched_pitches_are_taken(monkeypatch, game):
+    transport = FeedTransport()
+    use_transport(monkeypatch, transport)
+    prefetcher = FeedPrefetcher()
+
+    prefetcher.prefetch([game])
+    prefetcher.executor.shutdown(wait=True)
+
+    pitches = prefetcher.take(game)
+    assert transport.calls == ['get', 'decode']
+    assert len(pitches) > 0 and pitches[0].home_abbreviation == 'OAK'
+
+    # Taken pitches are not kept.
+    assert prefetcher.take(game) is None
+
+
+def test_feed_no_longer_wanted_is_not_decoded(monkeypatch, game):
+    prefetcher = FeedPrefetcher()
+
+    # The user moves to another page while the feed downloads.
+    def leave_page():
+        prefetcher._wanted = set()
+
+    transport = FeedTransport(on_get=leave_page)
+    use_transport(monkeypatch, transport)
+
+    prefetcher.prefetch([game])
+    prefetcher.executor.shutdown(wait=True)
+
+    assert transport.calls == ['get']
+    assert prefetcher.take(game) is None
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+import pytest
+from service import PitchService, ServiceError
+
+
+def test_identical_lookups_share_one_call():
+    service = PitchService(max_workers=2)
+    calls = []
+
+    def load():
+        calls.append('load')
+        return ['OAK']
+
+    async def run():
+        return await asyncio.gather(*(service.lookup(('teams', '2023'), load) for _ in range(3)))
+
+    assert asyncio.run(run()) == [['OAK']] * 3
+    assert calls == ['load']
+    assert service.stats['coalesced'] == 2
+    service.executor.shutdown()
+
+
+def test_waiters_are_answered_when_the_lookup_is_cancelled():
+    service = PitchService(max_workers=1)
+    release = threading.Event()
+
+    async def run():
+        first = asyncio.create_task(service.lookup(('games', '2023'), release.wait))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(service.lookup(('games', '2023'), release.wait))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        with pytest.raises(ServiceError) as error:
+            await asyncio.wait_for(waiter, timeout=5)
+        assert error.value.status == 500
+        assert len(service._in_flight) == 0
+
+    try:
+        asyncio.run(run())
+    finally:
+        release.set()
+        service.executor.shutdown()
@@ -0,0 +1,57 @@
+import pytest
+from api_classes import Team
+from team_registry import TeamRegistry
+
+
+@pytest.fixture
+def registry():
+    registry = TeamRegistry('2023')
+    for team in (
+        Team('Oakland Athletics', '133', 'Oakland', 'Athletics', 'OAK'),
+        Team('New York Yankees', '147', 'New York', 'Yankees', 'NYY'),
+        Team('New York Mets', '121', 'New York', 'Mets', 'NYM'),
+        Team('Arizona Diamondbacks', '109', 'Arizona', 'D-backs', 'AZ'),
+        Team('Seattle Mariners', '136', 'Seattle', 'Mariners', 'SEA'),
+    ):
+        registry.add(team)
+    return registry
+
+
+@pytest.mark.parametrize('name, team_id', [
+    ('Oakland Athletics', '133'),
+    ('  oakland   ATHLETICS ', '133'),
+    ('OAK', '133'),
+    ("A's", '133'),
+    ("Oakland A's", '133'),
+    ('Yankees', '147'),
+    ('nym', '121'),
+    ('Dbacks', '109'),
+    ('yank', '147'), # A prefix.
+    ('Mari', '136'),
+    ('Yankes', '147'), # One typo.
+    ('Seatle Marnersy', None), # Too many typos.
+    ('Marienrs', '136'), # Two typos.
+])
+def test_resolve(registry, name, team_id):
+    team = registry.resolve(name)
+    assert (team.id if team is not None else None) == team_id
+
+
+def test_resolve_is_none_when_several_teams_fit(registry):
+    assert registry.resolve('New York') is None
+    assert registry.resolve('ne') is None
+    assert [team.abbreviation for team in registry.suggest('New York')] == ['NYM', 'NYY']
+
+
+def test_short_names_are_not_matched_by_typo(registry):
+    # Two letters are one or two edits from every abbreviation, so typos are only forgiven in longer names.
+    assert registry.resolve('xq') is None
+    assert registry.resolve('ny') is None # A prefix of both NYY and NYM.
+    assert registry.resolve('') is None
+
+
+def test_add_keeps_the_first_team_with_an_id(registry):
+    same_id = Team('Athletics', '133', 'Oakland', 'Athletics', 'OAK')
+    assert registry.add(same_id) is registry.get(133)
+    assert registry.get(133).name == 'Oakland Athletics'
+    assert len(registry) == 5
@@ -0,0 +1,262 @@
+# This file defines a compact binary file of precomputed pitch trajectories that can be memory-mapped and read without copying.
+#
+# Layout, all little-endian:
+#   Header      HEADER_FORMAT, see below.
+#   Index       One INDEX_DTYPE record per pitch, in the order written.
+#   Samples     float32 (x, y, z) in ft for every pitch back to back. A pitch's samples start at its index 'offset'
+#               and are 'dt' seconds apart, the first at 'start_time' seconds from y=50 ft and the last at 'end_time'.
+#
+# Run from the repository root to export a date range, e.g.
+#   python3 trajectory_export.py 2023-04-01 2023-04-07 april.ptrj --team Athletics
+
+import argparse
+import mmap
+import struct
+import numpy as np
+from api_methods import fetch_team_by_name, iter_game_tables, iter_range_games
+from pitch_integrator import MOUND_Y
+from pitch_solver import pitch_arrays, solve_accelerations, SOLVER_COLUMNS
+
+MAGIC = b'PTRJ'
+VERSION = 1
+HEADER_FORMAT = '<4sHHIfQQ' # magic, version, reserved, pitch count, dt, index offset, samples offset.
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+INDEX_DTYPE = np.dtype([
+    ('game_pk', '<u4'),
+    ('pitch_index', '<u4'), # The pitch's position in fetch_pitch_details for its game.
+    ('offset', '<u8'), # The first sample, counted in samples from the start of the samples section.
+    ('count', '<u4'), # 0 if the pitch is missing coordinates.
+    ('start_time', '<f4'), # Seconds from y=50 ft to the first sample, negative when it starts at release.
+    ('end_time', '<f4'), # Seconds from y=50 ft to the last sample, at the plate.
+])
+SAMPLE_DTYPE = np.dtype(('<f4', 3))
+DEFAULT_DT = 1 / 240 # Seconds between samples.
+
+
+def sample_trajectories(pitches, dt=DEFAULT_DT, from_release=True):
+    """ Sample the path of many pitches at a fixed time step, using the corrected constant accelerations the simulation uses.
+
+    Args:
+        pitches (list[Pitch] | PitchTable)
+        dt (float, optional): Seconds between samples. Defaults to DEFAULT_DT.
+        from_release (bool, optional): Start at release (MOUND_Y minus extension) rather than y=50 ft. Defaults to True.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The samples of every pitch back to back with shape
+            (total, 3), the number of samples per pitch, and the time of each pitch's first and last sample.
+    """
+
+    c = pitch_arrays(pitches, SOLVER_COLUMNS + ('extension',))
+    solved = solve_accelerations(c)
+    t_end = solved.plate_time
+
+    # Under constant acceleration the ball is at the release y at the negative root of the same quadratic.
+    t_start = np.zeros(len(t_end))
+    if from_release:
+        c_release = c['y0'] - (MOUND_Y - c['extension'])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            q = 0.5 * (np.sqrt(c['vY0'] ** 2 - 2 * c['aY'] * c_release) - c['vY0'])
+            t_release = c_release / q
+        t_start = np.where(np.isfinite(t_release) & (t_release < 0), t_release, 0.0)
+
+    # Every sample dt apart from t_start, plus one final sample exactly at the plate unless a step already lands on it.
+    # The tolerance keeps rounding in the division from adding a second sample a hair before the plate.
+    valid = np.isfinite(t_end) & np.isfinite(solved.aX) & np.isfinite(solved.aZ)
+    counts = np.zeros(len(t_end), dtype=np.int64)
+    counts[valid] = np.ceil((t_end[valid] - t_start[valid]) / dt - 1e-9).astype(np.int64) + 1
+
+    # Build the time of every sample at once, then evaluate every position at once.
+    pitch = np.repeat(np.arange(len(counts)), counts)
+    first = np.cumsum(counts) - counts
+    step = np.arange(len(pitch)) - np.repeat(first, counts)
+    t = np.minimum(t_start[pitch] + step * dt, t_end[pitch])
+
+    samples = np.empty((len(pitch), 3), dtype=np.float32)
+    samples[:, 0] = c['x0'][pitch] + c['vX0'][pitch] * t + 0.5 * solved.aX[pitch] * t ** 2
+    samples[:, 1] = c['y0'][pitch] + c['vY0'][pitch] * t + 0.5 * solved.aY[pitch] * t ** 2
+    samples[:, 2] = c['z0'][pitch] + c['vZ0'][pitch] * t + 0.5 * solved.aZ[pitch] * t ** 2
+    return samples, counts, t_start, t_end
+
+
+def write_trajectories(path, games_with_pitches, dt=DEFAULT_DT, from_release=True):
+    """ Write the sampled trajectories of many games to a file, one game at a time.
+
+    Args:
+        path (str)
+        games_with_pitches (Iterable[tuple[Game, list[Pitch] | PitchTable | None]]): e.g. fetch_pitch_details_bulk.
+        dt (float, optional): Seconds between samples. Defaults to DEFAULT_DT.
+        from_release (bool, optional): Start each path at release. Defaults to True.
+
+    Returns:
+        int: The number of pitches written.
+    """
+
+    index_parts = []
+    written = 0
+
+    with open(path, 'wb') as f:
+        # Reserve the header, then stream the samples. The index is written last once every offset is known.
+        f.write(b'\0' * HEADER_SIZE)
+        samples_offset = HEADER_SIZE
+
+        for game, pitches in games_with_pitches:
+            if pitches is None or len(pitches) == 0:
+                continue
+
+            samples, counts, t_start, t_end = sample_trajectories(pitches, dt, from_release)
+            index = np.zeros(len(counts), dtype=INDEX_DTYPE)
+            index['game_pk'] = game.game_pk or 0
+            index['pitch_index'] = np.arange(len(counts))
+            index['offset'] = written + np.cumsum(counts) - counts
+            index['count'] = counts
+            index['start_time'] = t_start
+            index['end_time'] = np.where(counts > 0, t_end, 0.0)
+            index_parts.append(index)
+
+            f.write(samples.astype(SAMPLE_DTYPE.base, copy=False).tobytes())
+            written += int(counts.sum())
+
+        index = np.concatenate(index_parts) if len(index_parts) != 0 else np.zeros(0, dtype=INDEX_DTYPE)
+        index_offset = samples_offset + written * SAMPLE_DTYPE.itemsize
+        f.write(index.tobytes())
+
+        f.seek(0)
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, 0, len(index), dt, index_offset, samples_offset))
+
+    return len(index)
+
+
+class TrajectoryFile:
+    def __init__(self, path):
+        """ A class to read a trajectory file through a memory map. Paths are views into the file, not copies.
+
+        Args:
+            path (str)
+
+        Raises:
+            ValueError: If the file is not a trajectory file of a supported version.
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, count, dt, index_offset, samples_offset = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} trajectory file")
+
+        self.dt = dt
+        self.index = np.frombuffer(self._mmap, dtype=INDEX_DTYPE, count=count, offset=index_offset)
+        self.samples = np.frombuffer(self._mmap, dtype=SAMPLE_DTYPE, count=(index_offset - samples_offset) // SAMPLE_DTYPE.itemsize, offset=samples_offset)
+        self._positions = None
+
+    def path_of(self, i):
+        """ Get the sampled path of the i-th pitch in the file.
+
+        Args:
+            i (int)
+
+        Returns:
+            np.ndarray: A read-only view of shape (count, 3) of x, y, z in ft.
+        """
+
+        entry = self.index[i]
+        offset = int(entry['offset'])
+        return self.samples[offset:offset + int(entry['count'])]
+
+    def times_of(self, i):
+        """ Get the time of each sample of the i-th pitch, in seconds from y=50 ft. The last sample is at the plate.
+
+        Args:
+            i (int)
+
+        Returns:
+            np.ndarray
+        """
+
+        entry = self.index[i]
+        return np.minimum(entry['start_time'] + np.arange(int(entry['count'])) * self.dt, entry['end_time'])
+
+    def find(self, game_pk, pitch_index):
+        """ Get the position in the file of a pitch.
+
+        Args:
+            game_pk (int)
+            pitch_index (int): The pitch's position in fetch_pitch_details for its game.
+
+        Returns:
+            int | None
+        """
+
+        if self._positions is None:
+            self._positions = {(int(pk), int(p)): i for (i, (pk, p)) in enumerate(zip(self.index['game_pk'], self.index['pitch_index']))}
+        return self._positions.get((int(game_pk), int(pitch_index)))
+
+    def close(self):
+        """ Release the memory map. If views returned by path_of are still alive, it is released once they are gone. """
+
+        self.index = None
+        self.samples = None
+        self._positions = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # numpy views still point into the map. It is closed when the last one is garbage collected.
+            pass
+        self._file.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_date_range(path, start_date, end_date, team_id=None, opponent_id=None, dt=DEFAULT_DT, from_release=True):
+    """ Write the trajectories of every pitch in the games of a date range, in date order.
+
+    Feeds are downloaded a few at a time and each game is written as soon as it arrives, so memory holds at most
+    MAX_CONCURRENT_FEEDS games however long the range is.
+
+    Args:
+        path (str)
+        start_date (str): In the form YYYY-MM-DD.
+        end_date (str): In the form YYYY-MM-DD.
+        team_id (str, optional): Defaults to None.
+        opponent_id (str, optional): Defaults to None.
+        dt (float, optional): Seconds between samples. Defaults to DEFAULT_DT.
+        from_release (bool, optional): Start each path at release. Defaults to True.
+
+    Returns:
+        int: The number of pitches written.
+    """
+
+    games = iter_range_games(start_date, end_date, team_id, opponent_id)
+    return write_trajectories(path, iter_game_tables(games), dt, from_release)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export the sampled trajectory of every pitch in a date range.')
+    parser.add_argument('start_date', help='YYYY-MM-DD')
+    parser.add_argument('end_date', help='YYYY-MM-DD')
+    parser.add_argument('output', help='The trajectory file to write.')
+    parser.add_argument('--team', help='Only games with this team.')
+    parser.add_argument('--opponent', help='Only games against this team. Requires --team.')
+    parser.add_argument('--dt', type=float, default=DEFAULT_DT, help=f'Seconds between samples (default {DEFAULT_DT:.5f}).')
+    parser.add_argument('--from-y50', action='store_true', help='Start each path at y=50 ft instead of at release.')
+    args = parser.parse_args()
+
+    if args.opponent and not args.team:
+        parser.error('--opponent requires --team')
+
+    season = args.start_date[:4]
+    team = fetch_team_by_name(args.team, season) if args.team else None
+    opponent = fetch_team_by_name(args.opponent, season) if args.opponent else None
+    if (args.team and team is None) or (args.opponent and opponent is None):
+        parser.error('team not found')
+
+    count = export_date_range(args.output, args.start_date, args.end_date, team.id if team else None, opponent.id if opponent else None, args.dt, not args.from_y50)
+    print(f"Wrote {count} pitches to {args.output}.")